@@ -0,0 +1,129 @@
+"""
+Đo độ trễ của một thao tác "lọc lại" điển hình (groupby trên 200k dòng) trong khi một
+session khác đang đọc & trích xuất một workbook lớn: chạy trực tiếp trong thread (không pool)
+so với chạy trong process pool.
+
+Phần thứ hai đo job pivot (bảng long -> wide) theo số dòng: chạy trực tiếp so với gửi bảng sang
+pool (pickle bảng đi và kết quả về). Cột 'pickle' là phần việc vẫn giữ GIL của tiến trình chính
+khi dùng pool; pool chỉ đáng dùng khi phần này nhỏ hơn hẳn thời gian pivot trực tiếp. Dùng để chọn
+ngưỡng DASHBOARD_POOL_MIN_ROWS: dưới ngưỡng `run_frame_job` chạy trực tiếp.
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.bench_executor --days 365 --sheets 4 --pivot-rows 10000 100000 1000000
+"""
+import argparse
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_ads_sheet, workbook_bytes
+from utils import executor
+from utils.jobs import extract_camp_workbook
+from utils.reshape import pivot_wide
+
+
+def _probe(df, stop, latencies):
+    """Lặp lại thao tác tương tác và ghi lại độ trễ của từng lần."""
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        df.groupby('k')['v'].sum()
+        latencies.append(time.perf_counter() - t0)
+        time.sleep(0.005)
+
+
+def _ads_long(n_rows, seed=0):
+    """Bảng long giống kết quả trích xuất ads: (sheet, campaign, date, criteria, value)."""
+    rng = np.random.default_rng(seed)
+    criteria = np.array(["Doanh số", "Đầu tư ngân sách", "Mess mới", "Số đơn"], dtype=object)
+    n_keys = max(1, n_rows // len(criteria))
+    keys = np.arange(n_keys)
+    return pd.DataFrame({
+        'sheet': np.repeat(np.array([f"s{k % 4}" for k in keys], dtype=object), len(criteria)),
+        'campaign': np.repeat(np.array([f"camp_{k // 365:05d}" for k in keys], dtype=object), len(criteria)),
+        'date': np.repeat(pd.Timestamp("2024-01-01") + pd.to_timedelta(keys % 365, unit="D"), len(criteria)),
+        'criteria': np.tile(criteria, n_keys),
+        'value': rng.integers(0, 5_000, n_keys * len(criteria)) * 1000.0,
+    })
+
+
+def _timed(fn, repeat=3):
+    """Thời gian chạy (giây, trung vị của `repeat` lần) và kết quả của lần cuối."""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times)), result
+
+
+def bench_pivot(row_counts, workers):
+    """Pivot trực tiếp so với qua pool, theo số dòng của bảng long."""
+    os.environ[executor.WORKERS_ENV_VAR] = str(workers)
+    executor.run_job(sum, [0])  # khởi động pool trước khi đo
+    kwargs = dict(index=['sheet', 'campaign', 'date'], columns='criteria', values='value')
+    print(f"\npivot (ngưỡng hiện tại: {executor.pool_min_rows():,} dòng)")
+    print(f"{'dòng':>10} {'trực tiếp':>10} {f'pool x{workers}':>10} {'pickle':>10}")
+    for n_rows in row_counts:
+        df = _ads_long(n_rows)
+        inline, expected = _timed(lambda: pivot_wide(df, **kwargs))
+        pooled, result = _timed(lambda: executor.run_job(pivot_wide, df, **kwargs))
+        pd.testing.assert_frame_equal(expected, result)
+        # Phần việc vẫn giữ GIL của tiến trình chính khi dùng pool: pickle bảng gửi đi, đọc kết quả về
+        pickling, _ = _timed(lambda: (pickle.dumps(df), pickle.loads(pickle.dumps(result))))
+        print(f"{len(df):>10,} {inline * 1000:>8.1f}ms {pooled * 1000:>8.1f}ms {pickling * 1000:>8.1f}ms")
+
+
+def _percentile(values, q):
+    return float(np.percentile(values, q)) * 1000 if values else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--sheets", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=executor.DEFAULT_WORKERS)
+    parser.add_argument("--pivot-rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="Số dòng bảng long cho phần đo pivot.")
+    args = parser.parse_args()
+
+    data = workbook_bytes({
+        f"s{i}": make_ads_sheet(n_campaigns=60, n_days=args.days, seed=i) for i in range(args.sheets)
+    })
+    sheets = [f"s{i}" for i in range(args.sheets)]
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'k': rng.integers(0, 400, 200_000).astype(str), 'v': rng.random(200_000)})
+
+    print(f"workbook {len(data) / 1024:,.0f} KB, {os.cpu_count()} CPU")
+    print(f"{'chế độ':<12} {'job':>8} {'p50':>9} {'p95':>9} {'max':>9}")
+    reference = None
+    for workers in (0, args.workers):
+        os.environ[executor.WORKERS_ENV_VAR] = str(workers)
+        if workers:
+            executor.run_job(sum, [0])  # khởi động pool trước khi đo
+        stop, latencies = threading.Event(), []
+        probe = threading.Thread(target=_probe, args=(df, stop, latencies))
+        probe.start()
+        t0 = time.perf_counter()
+        result = executor.run_job(extract_camp_workbook, data, sheets)
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        probe.join()
+
+        if reference is None:
+            reference = result
+        else:
+            for sheet in sheets:
+                pd.testing.assert_frame_equal(reference[sheet], result[sheet])
+        label = "trực tiếp" if workers == 0 else f"pool x{workers}"
+        print(f"{label:<12} {elapsed:>7.2f}s {_percentile(latencies, 50):>7.1f}ms "
+              f"{_percentile(latencies, 95):>7.1f}ms {max(latencies) * 1000:>7.1f}ms")
+
+    bench_pivot(args.pivot_rows, max(1, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Đo lợi ích của việc lọc khoảng ngày ngay khi trích xuất (`date_range` của extract_camp_blocks /
+extract_social_data: bỏ cột ngoài khoảng từ header, trước khi đọc từng ô) so với trích xuất
+toàn bộ rồi lọc theo ngày, trên sheet thô tổng hợp dài một năm, theo độ dài khoảng ngày.
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.bench_pushdown --days 365 --ranges 365 90 30 7
+
+Trước khi đo, script kiểm tra hai cách cho cùng kết quả.
+"""
+import argparse
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from benchmarks.synthetic import make_ads_sheet, make_social_sheet
+from utils.data_processing import extract_camp_blocks, extract_social_data, parse_week
+from utils.datasets import METRIC_MAPPING
+
+KEY_CELLS = ["FB", "TT", "OA", "YT", "ZL"]
+
+
+def _timeit(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def _in_range(dates, date_range):
+    dates = pd.to_datetime(pd.Series(dates), dayfirst=True).dt.date
+    return ((dates >= date_range[0]) & (dates <= date_range[1])).to_numpy()
+
+
+def _check(pushed, full, date_col, date_range):
+    expected = full[_in_range(full[date_col], date_range)].reset_index(drop=True)
+    pd.testing.assert_frame_equal(pushed.reset_index(drop=True), expected, check_dtype=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=365, help="số ngày dữ liệu của sheet ads")
+    parser.add_argument("--campaigns", type=int, default=200)
+    parser.add_argument("--ranges", type=int, nargs="+", default=[365, 90, 30, 7], help="độ dài khoảng ngày cần nạp")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    ads = make_ads_sheet(n_campaigns=args.campaigns, n_days=args.days)
+    social = make_social_sheet(n_weeks=max(2, args.days // 7))
+    ads_last = pd.Timestamp("2024-01-01") + pd.Timedelta(days=args.days - 1)
+    social_last = max(parse_week(label, datetime.now().year)[0] for label in social.iloc[1, 3:])
+
+    full_ads_s, full_ads = _timeit(lambda: extract_camp_blocks(ads), args.repeat)
+    full_social_s, full_social = _timeit(
+        lambda: extract_social_data(social, KEY_CELLS, METRIC_MAPPING), args.repeat)
+    print(f"sheet ads {ads.shape}, social {social.shape}")
+    print(f"{'khoảng':>8} {'ads: lọc sau':>14} {'ads: lọc sớm':>14} {'social: lọc sau':>16} {'social: lọc sớm':>16}")
+    for days in args.ranges:
+        ads_range = ((ads_last - pd.Timedelta(days=days - 1)).date(), ads_last.date())
+        social_range = ((social_last - pd.Timedelta(days=days - 1)).date(), social_last.date())
+        ads_s, pushed_ads = _timeit(lambda: extract_camp_blocks(ads, date_range=ads_range), args.repeat)
+        social_s, pushed_social = _timeit(
+            lambda: extract_social_data(social, KEY_CELLS, METRIC_MAPPING, date_range=social_range), args.repeat)
+        _check(pushed_ads, full_ads, 'date', ads_range)
+        _check(pushed_social, full_social, 'Ngày Bắt Đầu', social_range)
+        print(f"{days:>6}ng {full_ads_s * 1000:>12.1f}ms {ads_s * 1000:>12.1f}ms "
+              f"{full_social_s * 1000:>14.1f}ms {social_s * 1000:>14.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+So sánh engine pandas với DuckDB / Polars (nếu đã cài) cho các bước lọc/tổng hợp của dashboard,
+cùng với engine pandas dùng chỉ mục bitmap (cột "bitmap"; thời gian dựng chỉ mục in riêng).
+Polars chạy đa luồng: nên so sánh trên máy nhiều nhân (số luồng: biến môi trường POLARS_MAX_THREADS).
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.bench_query_engine --sizes 100000 1000000
+
+Trước khi đo, script kiểm tra kết quả của các engine phải trùng khớp.
+"""
+import argparse
+import time
+from datetime import date
+
+import pandas as pd
+
+from benchmarks.synthetic import make_ads_wide, make_social_wide
+from utils import query_engine as qe
+from utils.filter_index import FilterIndex
+
+
+def _timeit(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def _ads_pipeline(df, backend, index=None):
+    sheets = sorted(df['sheet'].unique())[:-1]
+    campaigns = sorted(df['campaign'].unique())[::2]
+    df_f = qe.filter_ads(df, date(2024, 2, 1), date(2024, 10, 31), sheets, campaigns, backend=backend, index=index)
+    return {
+        'filtered': df_f,
+        'kpis': qe.ads_kpi_totals(df_f, backend=backend),
+        'by_sheet': qe.ads_by_sheet(df_f, backend=backend),
+        'by_campaign': qe.ads_by_campaign(df_f, backend=backend),
+        'by_date': qe.ads_by_date(df_f, backend=backend),
+    }
+
+
+def _social_pipeline(df, backend, index=None):
+    channels = sorted(df['Tên kênh'].unique())[::2]
+    df_f = qe.filter_social(df, channels, date(2021, 1, 1), date(2023, 12, 31), backend=backend, index=index)
+    return {
+        'filtered': df_f,
+        'kpis': qe.social_kpi_totals(df_f, backend=backend),
+        'by_channel': qe.social_by_channel(df_f, backend=backend),
+        'content_mix': qe.content_mix(df_f, ["Video/ clips/ Reels", "Text + Ảnh", "Back + text"], backend=backend),
+    }
+
+
+def _assert_same(a, b):
+    for key in a:
+        if isinstance(a[key], pd.DataFrame):
+            pd.testing.assert_frame_equal(a[key], b[key], check_exact=False, rtol=1e-9)
+        else:
+            assert a[key].keys() == b[key].keys()
+            for k in a[key]:
+                assert abs(a[key][k] - b[key][k]) <= 1e-9 * max(1.0, abs(a[key][k])), (key, k)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    backends = qe.available_backends()
+    for backend in (qe.BACKEND_DUCKDB, qe.BACKEND_POLARS):
+        if backend not in backends:
+            print(f"{backend} chưa được cài đặt: bỏ qua engine {backend}.")
+
+    columns = backends + ["bitmap"]
+    print(f"{'dataset':<8} {'rows':>10} " + " ".join(f"{c:>10}" for c in columns) + f" {'dựng index':>12}")
+    for n in args.sizes:
+        for name, make, pipeline, dims, date_col in (
+            ("ads", make_ads_wide, _ads_pipeline, ['sheet', 'campaign'], 'date'),
+            ("social", make_social_wide, _social_pipeline, ['Tên kênh'], 'Ngày Bắt Đầu'),
+        ):
+            df = make(n)
+            timings, results = {}, {}
+            for backend in backends:
+                timings[backend], results[backend] = _timeit(lambda: pipeline(df, backend), args.repeat)
+            t0 = time.perf_counter()
+            # cache_size=0: không ghi nhớ mặt nạ, để mỗi lần đo đều tính lại phép giao bitmap
+            index = FilterIndex(df, dims=dims, date_col=date_col, cache_size=0)
+            build_ms = (time.perf_counter() - t0) * 1000
+            timings["bitmap"], results["bitmap"] = _timeit(
+                lambda: pipeline(df, qe.BACKEND_PANDAS, index=index), args.repeat
+            )
+            for column in columns[1:]:
+                _assert_same(results[qe.BACKEND_PANDAS], results[column])
+            print(f"{name:<8} {n:>10} " + " ".join(f"{timings[c] * 1000:>8.1f}ms" for c in columns)
+                  + f" {build_ms:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
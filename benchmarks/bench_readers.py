@@ -0,0 +1,51 @@
+"""
+Đo thời gian đọc workbook tổng hợp với từng engine đọc Excel đã cài đặt.
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.bench_readers --days 90 365
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import make_ads_sheet, make_social_sheet, workbook_bytes
+from utils.readers import available_engines, open_excel, read_excel
+
+
+def _best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _read_all_sheets(data, engine):
+    xls = open_excel(data, engine=engine)
+    return [xls.parse(name, header=None) for name in xls.sheet_names]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, nargs="+", default=[90, 365], help="Số cột ngày của mỗi sheet ads.")
+    parser.add_argument("--sheets", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    engines = available_engines()
+    print(f"Engine đã cài đặt: {', '.join(engines)}")
+    print(f"{'workbook':<22} {'size':>9} " + " ".join(f"{e:>10}" for e in engines))
+    for days in args.days:
+        cases = [
+            (f"ads {args.sheets}x{days}d", workbook_bytes(
+                {f"runner_{i}": make_ads_sheet(n_days=days, seed=i) for i in range(args.sheets)}), _read_all_sheets),
+            (f"social {days // 7}w", workbook_bytes({"social": make_social_sheet(n_weeks=max(days // 7, 1))}),
+             lambda data, engine: read_excel(data, engine=engine, header=None)),
+        ]
+        for name, data, reader in cases:
+            timings = [_best_of(lambda: reader(data, e), args.repeat) for e in engines]
+            print(f"{name:<22} {len(data) / 1024:>7.0f}KB " + " ".join(f"{t * 1000:>8.0f}ms" for t in timings))
+
+
+if __name__ == "__main__":
+    main()
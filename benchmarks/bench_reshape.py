@@ -0,0 +1,75 @@
+"""
+So sánh `pivot_table` với `utils.reshape.pivot_wide` trên dữ liệu long tổng hợp,
+cho cả hai kiểu reshape của dashboard ('first' của trang Quảng cáo, 'sum' của trang Social).
+Nếu đã cài polars, đo thêm `pivot_wide` với bước mã hóa khóa bằng Polars (cột "polars", chạy
+đa luồng: nên so sánh trên máy nhiều nhân) và kiểm tra kết quả giống hệt engine pandas.
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.bench_reshape --sizes 100000 1000000
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import AD_METRICS, make_ads_wide, make_social_wide
+from utils import polars_engine
+from utils.reshape import pivot_wide
+
+SOCIAL_INDEX = ['Kênh', 'Tên kênh', 'Ngày Bắt Đầu', 'Ngày Kết Thúc', 'Mốc thời gian', 'Loại thời gian']
+SOCIAL_METRICS = ["Follower", "Lượt xem (views)", "Engagement (like/ cmt/ share)",
+                  "Video/ clips/ Reels", "Text + Ảnh", "Back + text"]
+
+
+def _ads_long(n_rows):
+    wide = make_ads_wide(max(n_rows // len(AD_METRICS), 1))
+    long = wide.melt(id_vars=['sheet', 'campaign', 'date'], value_vars=AD_METRICS, var_name='criteria')
+    long['value'] = long['value'].astype(object)  # giá trị thô đọc từ Excel là cột object
+    return long
+
+
+def _social_long(n_rows):
+    wide = make_social_wide(max(n_rows // len(SOCIAL_METRICS), 1))
+    return wide.melt(id_vars=SOCIAL_INDEX, value_vars=SOCIAL_METRICS, var_name='Chỉ số chuẩn', value_name='Giá trị')
+
+
+def _best_of(fn, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with_polars = polars_engine.available()
+    print(f"{'case':<12} {'rows':>10} {'pivot_table':>12} {'pivot_wide':>12} {'speedup':>8}"
+          + (f" {'polars':>10}" if with_polars else ""))
+    for n in args.sizes:
+        for name, make, index, columns, values, agg in (
+            ("ads/first", _ads_long, ['sheet', 'campaign', 'date'], 'criteria', 'value', 'first'),
+            ("social/sum", _social_long, SOCIAL_INDEX, 'Chỉ số chuẩn', 'Giá trị', 'sum'),
+        ):
+            long = make(n)
+            t_old, expected = _best_of(lambda: long.pivot_table(
+                index=index, columns=columns, values=values, aggfunc=agg).reset_index(), args.repeat)
+            t_new, result = _best_of(lambda: pivot_wide(long, index, columns, values, agg, engine='pandas'),
+                                     args.repeat)
+            pd.testing.assert_frame_equal(expected, result)
+            line = f"{name:<12} {len(long):>10} {t_old * 1000:>10.0f}ms {t_new * 1000:>10.0f}ms {t_old / t_new:>7.1f}x"
+            if with_polars:
+                t_pl, result_pl = _best_of(lambda: pivot_wide(long, index, columns, values, agg,
+                                                              engine=polars_engine.ENGINE_POLARS), args.repeat)
+                pd.testing.assert_frame_equal(expected, result_pl)
+                line += f" {t_pl * 1000:>8.0f}ms"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
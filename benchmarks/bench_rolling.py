@@ -0,0 +1,61 @@
+"""
+So sánh cách tính chỉ số trượt của utils/rolling.py (cộng dồn + searchsorted, một lượt cho mọi
+chuỗi) với cách làm thông thường `groupby(...).rolling('7D')` của pandas, theo số chiến dịch.
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.bench_rolling --campaigns 400 4000
+
+Trước khi đo, script kiểm tra hai cách cho cùng kết quả.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_ads_wide
+from utils.rolling import ROLLING_WINDOWS, window_col, rolling_sums
+
+KEYS = ['sheet', 'campaign']
+COLS = ['Doanh số', 'Đầu tư ngân sách', 'Số Lượng Khách Hàng']
+
+
+def _timeit(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def _pandas_rolling(df):
+    daily = df.groupby(KEYS + ['date'], sort=True)[COLS].sum().reset_index()
+    indexed = daily.set_index('date')
+    for w in ROLLING_WINDOWS:
+        rolled = indexed.groupby(KEYS, sort=True)[COLS].rolling(f'{w}D').sum()
+        for col in COLS:
+            daily[window_col(col, w)] = rolled[col].to_numpy()
+    return daily
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--campaigns", type=int, nargs="+", default=[400, 4000])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'chiến dịch':>10} {'rows':>10} {'cumsum':>10} {'pandas':>10}")
+    for n_campaigns in args.campaigns:
+        df = make_ads_wide(args.rows, n_campaigns=n_campaigns)
+        fast_s, fast = _timeit(lambda: rolling_sums(df, 'date', KEYS, COLS), args.repeat)
+        slow_s, slow = _timeit(lambda: _pandas_rolling(df), args.repeat)
+        for w in ROLLING_WINDOWS:
+            for col in COLS:
+                np.testing.assert_allclose(fast[window_col(col, w)], slow[window_col(col, w)], rtol=1e-9)
+        print(f"{n_campaigns:>10} {args.rows:>10} {fast_s * 1000:>8.1f}ms {slow_s * 1000:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Đo thời gian import (dựa trên `python -X importtime`) của các module mà trang đăng nhập
+và các trang dashboard nạp khi khởi động, rồi so với ngân sách cho phép.
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --scale 2   # nới ngân sách cho máy chậm
+    python -m benchmarks.import_time --runs 9    # đo nhiều lần hơn khi máy đang bận
+
+Mỗi module được đo trong `--runs` tiến trình mới và lấy trung vị, nên một lần đo bị chậm do
+máy bận không làm hỏng kết quả. Ngân sách được đặt với khoảng dư (khoảng gấp đôi trung vị đo
+trên máy phát triển) để script chỉ báo lỗi khi có thay đổi thật sự làm import chậm đi.
+
+Trả về mã thoát 1 nếu có module vượt ngân sách thời gian hoặc kéo theo một
+thư viện nặng không được phép nạp ở giai đoạn đó.
+"""
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# streamlit tự nạp gói `plotly` gốc (nhẹ) để đăng ký theme, nên chỉ chặn các module con nặng.
+PLOTLY_HEAVY = ("plotly.express", "plotly.graph_objs", "plotly.subplots")
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "xlsxwriter", "duckdb") + PLOTLY_HEAVY
+
+# module -> (ngân sách ms cho thời gian import tích lũy, các thư viện nặng không được nạp).
+# Ngân sách ≈ gấp đôi trung vị đo được (`--runs 7`, máy 1 CPU), làm tròn lên.
+BUDGETS = {
+    # Trang chào mừng và form đăng nhập: chỉ streamlit
+    "utils.auth": (1500, HEAVY_MODULES),
+    # Các module tiện ích phải nạp được mà không kéo theo plotly / engine xlsx
+    "utils.plotting": (30, HEAVY_MODULES),
+    "utils.helpers": (10, HEAVY_MODULES),
+    "utils.readers": (10, HEAVY_MODULES),
+    "utils.gsheets": (30, HEAVY_MODULES),
+    "utils.memory": (20, HEAVY_MODULES),
+    "utils.executor": (60, HEAVY_MODULES),
+    "utils.snapshots": (70, HEAVY_MODULES),
+    "utils.api": (50, HEAVY_MODULES),
+    "utils.progressive": (60, HEAVY_MODULES),
+    "utils.ingest": (70, HEAVY_MODULES),
+    "utils.dataset_cache": (30, HEAVY_MODULES),
+    "utils.dag": (20, HEAVY_MODULES),
+    "utils.data_processing": (1200, ("openpyxl", "xlsxwriter", "duckdb") + PLOTLY_HEAVY),
+    "utils.query_engine": (1200, ("openpyxl", "xlsxwriter", "duckdb") + PLOTLY_HEAVY),
+    "utils.filter_index": (1200, ("openpyxl", "xlsxwriter", "duckdb") + PLOTLY_HEAVY),
+    "utils.jobs": (1200, ("openpyxl", "xlsxwriter", "duckdb") + PLOTLY_HEAVY),
+    "utils.datasets": (1200, ("openpyxl", "xlsxwriter", "duckdb") + PLOTLY_HEAVY),
+    "utils.rollups": (1200, ("openpyxl", "xlsxwriter", "duckdb") + PLOTLY_HEAVY),
+    "utils.rolling": (1200, ("openpyxl", "xlsxwriter", "duckdb") + PLOTLY_HEAVY),
+    "utils.polars_engine": (1200, ("openpyxl", "xlsxwriter", "duckdb", "polars") + PLOTLY_HEAVY),
+}
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def measure(module):
+    """
+    Import `module` trong một tiến trình Python mới với `-X importtime`.
+    Trả về (thời gian tích lũy tính bằng ms, tập tên các module đã được nạp).
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Không import được {module}:\n{proc.stderr[-2000:]}")
+
+    cumulative_us = 0
+    loaded = set()
+    for line in proc.stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if not m:
+            continue
+        name = m.group(4)
+        loaded.add(name)
+        if name == module:
+            cumulative_us = int(m.group(2))
+    return cumulative_us / 1000, loaded
+
+
+def measure_median(module, runs):
+    """Trung vị thời gian import của `runs` lần đo `measure`, cùng các module đã nạp ở mọi lần."""
+    timings, loaded = [], set()
+    for _ in range(runs):
+        elapsed_ms, names = measure(module)
+        timings.append(elapsed_ms)
+        loaded |= names
+    return statistics.median(timings), loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1.0, help="Hệ số nhân cho mọi ngân sách thời gian.")
+    parser.add_argument("--runs", type=int, default=5, help="Số lần đo mỗi module (lấy trung vị).")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'module':<24} {'ms':>9} {'budget':>9}  status")
+    for module, (budget_ms, forbidden) in BUDGETS.items():
+        elapsed_ms, loaded = measure_median(module, max(1, args.runs))
+        budget_ms *= args.scale
+        leaked = sorted(f for f in forbidden if any(n == f or n.startswith(f + ".") for n in loaded))
+        problems = []
+        if elapsed_ms > budget_ms:
+            problems.append("vượt ngân sách")
+        if leaked:
+            problems.append("nạp thư viện nặng: " + ", ".join(leaked))
+        failed = failed or bool(problems)
+        print(f"{module:<24} {elapsed_ms:>9.1f} {budget_ms:>9.0f}  {'; '.join(problems) or 'OK'}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
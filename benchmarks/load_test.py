@@ -0,0 +1,187 @@
+"""
+Thử tải nhiều session cùng lúc cho cả hai trang dashboard bằng `AppTest` của Streamlit: mỗi
+session là một AppTest riêng (session_state riêng, bộ nhớ đệm st.cache_* dùng chung như trên
+server thật) chạy trong một thread. Mỗi session đăng nhập qua form của `check_password`, upload
+workbook tổng hợp rồi thực hiện một loạt thao tác lọc (ở chế độ gom thay đổi bộ lọc mặc định, mỗi
+thao tác được áp dụng bằng nút 'Áp dụng bộ lọc'); script đo độ trễ từng lần chạy lại trang
+(p50 / p95 / max) và bộ nhớ (RSS của tiến trình chính) theo số session.
+
+Chạy từ thư mục gốc của repo (tài khoản là tài khoản đăng nhập của dashboard):
+    python -m benchmarks.load_test --sessions 1 4 8 --username <tài khoản> --password <mật khẩu> 2>/dev/null
+
+Kết quả in ra stdout; stderr chỉ có các cảnh báo của streamlit khi chạy trang ngoài server.
+
+Tài khoản cũng có thể đặt qua biến môi trường DASHBOARD_LOADTEST_USERNAME / _PASSWORD.
+`--sessions N`: N session cho mỗi trang trong `--pages` (cột "session/trang"); tổng số session chạy
+đồng thời là N × số trang, và cột "RSS/session" là phần RSS tăng thêm chia cho tổng số đó.
+`--distinct-data`: mỗi session upload một workbook khác nhau (không dùng chung bộ nhớ đệm).
+RSS chỉ gồm tiến trình chính; các tiến trình của process pool không được tính.
+"""
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_ads_sheet, make_social_sheet, workbook_bytes
+from utils.memory import current_rss_mb
+
+USERNAME_ENV_VAR = "DASHBOARD_LOADTEST_USERNAME"
+PASSWORD_ENV_VAR = "DASHBOARD_LOADTEST_PASSWORD"
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _toggle(widget, first, second):
+    """Đổi giá trị widget qua lại giữa hai giá trị để mỗi lượt thao tác đều thay đổi bộ lọc."""
+    return widget.set_value(second if widget.value == first else first)
+
+
+def _drop_last(widget):
+    """Bỏ lựa chọn cuối của multiselect; khi chỉ còn một lựa chọn thì chọn lại tất cả."""
+    return widget.set_value(widget.value[:-1] if len(widget.value) > 1 else widget.options)
+
+
+def _apply_filters(at):
+    """Bấm nút 'Áp dụng bộ lọc' của form bộ lọc (nếu trang đang ở chế độ gom thay đổi)."""
+    for button in at.button:
+        if button.label == "Áp dụng bộ lọc":
+            button.click()
+
+
+def _ads_interactions(at):
+    """Các thao tác lọc trên trang Quảng cáo: mỗi phần tử là (tên, hàm thao tác trên widget)."""
+    preset = at.selectbox(key="ad_preset")
+    return [
+        ("mốc nhanh", lambda: preset.set_value(preset.options[2])),
+        ("tùy chọn", lambda: at.selectbox(key="ad_preset").set_value(preset.options[0])),
+        ("người chạy", lambda: _drop_last(at.multiselect[0])),
+        ("top N", lambda: _toggle(at.number_input(key="ad_top_n"), 5, 15)),
+        ("độ chi tiết", lambda: _toggle(at.selectbox(key="ad_granularity"), "Tuần", "Ngày")),
+        ("chỉ số trượt", lambda: _toggle(at.radio(key="ad_rolling_by"), "Chiến dịch", "Người chạy")),
+    ]
+
+
+def _social_interactions(at):
+    """Các thao tác lọc trên trang Social."""
+    preset = at.selectbox(key="social_preset")
+    return [
+        ("mốc nhanh", lambda: preset.set_value(preset.options[2])),
+        ("tùy chọn", lambda: at.selectbox(key="social_preset").set_value(preset.options[0])),
+        ("kênh", lambda: _drop_last(at.multiselect(key="social_channels"))),
+        ("độ chi tiết", lambda: _toggle(at.selectbox(key="social_granularity"), "Tháng", "Tuần")),
+        ("chỉ số tăng trưởng", lambda: _toggle(at.selectbox(key="growth_metric_select"), "Follower",
+                                               "Lượt xem (views)")),
+    ]
+
+
+PAGES = {
+    "ads": ("pages/2_Phan_tich_Quang_cao.py", "ad_progressive", "ad_uploader", _ads_interactions),
+    "social": ("pages/1_Phan_tich_Social_Media.py", "social_progressive", "social_uploader", _social_interactions),
+}
+
+
+def make_workbooks(page, count, days, seed=0):
+    """`count` workbook tổng hợp (bytes) cho trang `page`."""
+    if page == "ads":
+        return [workbook_bytes({f"runner_{i}": make_ads_sheet(n_campaigns=40, n_days=days, seed=seed + s * 10 + i)
+                                for i in range(3)}) for s in range(count)]
+    return [workbook_bytes({"Social": make_social_sheet(n_weeks=max(2, days // 7), seed=seed + s)})
+            for s in range(count)]
+
+
+def _timed_run(at, latencies, phase):
+    t0 = time.perf_counter()
+    at.run()
+    latencies.append((phase, time.perf_counter() - t0))
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+
+
+def run_session(page, workbook, username, password, rounds, timeout, start, latencies, errors):
+    """Một session: đăng nhập, upload workbook, rồi lặp lại các thao tác lọc `rounds` lần."""
+    from streamlit.testing.v1 import AppTest
+    path, progressive_key, uploader_key, interactions = PAGES[page]
+    start.wait()
+    try:
+        at = AppTest.from_file(os.path.join(REPO_ROOT, path), default_timeout=timeout)
+        _timed_run(at, latencies, "đăng nhập")
+        at.text_input(key="username").input(username)
+        at.text_input(key="password").input(password)
+        at.button[0].click()
+        _timed_run(at, latencies, "đăng nhập")
+        if not at.session_state["password_correct"]:
+            raise RuntimeError("Đăng nhập không thành công: kiểm tra tài khoản / mật khẩu.")
+        # Đo trạng thái ổn định: tắt xem trước (nạp nền) để mỗi lần chạy dùng dữ liệu đầy đủ
+        at.checkbox(key=progressive_key).uncheck()
+        at.file_uploader(key=uploader_key).set_value([(f"{page}.xlsx", workbook, XLSX_MIME)])
+        _timed_run(at, latencies, "nạp dữ liệu")
+        for _ in range(rounds):
+            for name, action in interactions(at):
+                action()
+                _apply_filters(at)
+                _timed_run(at, latencies, f"lọc: {name}")
+    except Exception as e:
+        errors.append(f"{page}: {e}")
+
+
+def _percentiles(values):
+    values = np.asarray(values) * 1000
+    return np.percentile(values, 50), np.percentile(values, 95), values.max()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--pages", nargs="+", choices=sorted(PAGES), default=sorted(PAGES))
+    parser.add_argument("--rounds", type=int, default=2, help="số lượt lặp lại chuỗi thao tác lọc")
+    parser.add_argument("--days", type=int, default=180, help="số ngày dữ liệu của workbook tổng hợp")
+    parser.add_argument("--distinct-data", action="store_true")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--username", default=os.environ.get(USERNAME_ENV_VAR))
+    parser.add_argument("--password", default=os.environ.get(PASSWORD_ENV_VAR))
+    args = parser.parse_args()
+    if not args.username or not args.password:
+        parser.error(f"cần --username/--password (hoặc {USERNAME_ENV_VAR} / {PASSWORD_ENV_VAR})")
+
+    max_sessions = max(args.sessions)
+    workbooks = {page: make_workbooks(page, max_sessions if args.distinct_data else 1, args.days)
+                 for page in args.pages}
+    print(f"{os.cpu_count()} CPU, workbook: " + ", ".join(
+        f"{page} {len(books[0]) / 1024:,.0f} KB" for page, books in workbooks.items()))
+    print(f"{'session/trang':>13} {'giai đoạn':<12} {'lần chạy':>8} {'p50':>9} {'p95':>9} {'max':>9} "
+          f"{'RSS':>9} {'RSS/session':>12}")
+
+    baseline = current_rss_mb()
+    for n in args.sessions:
+        # Mỗi trang nhận n session, xen kẽ giữa các trang
+        plan = [(page, workbooks[page][i % len(workbooks[page])]) for i in range(n) for page in args.pages]
+        start = threading.Barrier(len(plan))
+        results = [[] for _ in plan]
+        errors = []
+        threads = [
+            threading.Thread(target=run_session, args=(page, workbook, args.username, args.password,
+                                                      args.rounds, args.timeout, start, results[i], errors))
+            for i, (page, workbook) in enumerate(plan)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        rss = current_rss_mb()
+        latencies = [item for session in results for item in session]
+        for label, match in (("đăng nhập", "đăng nhập"), ("nạp dữ liệu", "nạp dữ liệu"), ("lọc", "lọc")):
+            values = [t for phase, t in latencies if phase.startswith(match)]
+            if not values:
+                continue
+            p50, p95, worst = _percentiles(values)
+            memory = f"{rss:>7.0f}MB {(rss - baseline) / len(plan):>10.1f}MB" if rss is not None and baseline is not None else ""
+            print(f"{n:>13} {label:<12} {len(values):>8} {p50:>7.0f}ms {p95:>7.0f}ms {worst:>7.0f}ms {memory}")
+        for error in errors:
+            print(f"  lỗi: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Sinh dữ liệu tổng hợp (synthetic) có cùng cấu trúc với dữ liệu thật của dashboard,
+dùng cho các script benchmark trong thư mục này.
+"""
+import numpy as np
+import pandas as pd
+
+AD_METRICS = ['Doanh số', 'Đầu tư ngân sách', 'KH Tiềm Năng (Mess)', 'Số Lượng Khách Hàng', 'Số đơn hàng']
+SOCIAL_CHANNELS = ["FB", "TT", "OA", "YT", "ZL"]
+
+
+def make_ads_wide(n_rows, n_sheets=8, n_campaigns=400, n_days=365, seed=0):
+    """DataFrame giống `df_pivot` của trang Quảng cáo (sheet, campaign, date + các chỉ số)."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2024-01-01", periods=n_days, freq="D")
+    df = pd.DataFrame({
+        'sheet': np.array([f"runner_{i}" for i in range(n_sheets)], dtype=object)[rng.integers(0, n_sheets, n_rows)],
+        'campaign': np.array([f"camp_{i:04d}" for i in range(n_campaigns)], dtype=object)[rng.integers(0, n_campaigns, n_rows)],
+        'date': dates[rng.integers(0, n_days, n_rows)],
+    })
+    for col in AD_METRICS:
+        df[col] = rng.integers(0, 5_000_000, n_rows).astype('float64')
+    df.loc[rng.random(n_rows) < 0.05, 'Đầu tư ngân sách'] = 0
+    return df
+
+
+def make_social_wide(n_rows, n_channels=50, n_weeks=260, seed=0):
+    """DataFrame giống `df_wide` của trang Social (mỗi dòng là một kênh trong một tuần)."""
+    rng = np.random.default_rng(seed)
+    starts = pd.date_range("2020-01-06", periods=n_weeks, freq="W-MON")
+    idx = rng.integers(0, n_weeks, n_rows)
+    ch = rng.integers(0, n_channels, n_rows)
+    labels = np.array([f"{d.day}/{d.month} - {e.day}/{e.month}" for d, e in zip(starts, starts + pd.Timedelta(days=6))], dtype=object)
+    df = pd.DataFrame({
+        'Kênh': np.array(SOCIAL_CHANNELS, dtype=object)[ch % len(SOCIAL_CHANNELS)],
+        'Tên kênh': np.array([f"Kênh {i:03d}" for i in range(n_channels)], dtype=object)[ch],
+        'Ngày Bắt Đầu': starts[idx],
+        'Ngày Kết Thúc': starts[idx] + pd.Timedelta(days=6),
+        'Mốc thời gian': labels[idx],
+        'Loại thời gian': 'Tuần',
+    })
+    for col in ["Follower", "Lượt xem (views)", "Engagement (like/ cmt/ share)",
+                "Video/ clips/ Reels", "Text + Ảnh", "Back + text"]:
+        df[col] = rng.integers(0, 100_000, n_rows).astype('float64')
+    df['Total content publish'] = df[["Video/ clips/ Reels", "Text + Ảnh", "Back + text"]].sum(axis=1)
+    return df
+
+
+def make_ads_sheet(n_campaigns=50, n_days=365, seed=0):
+    """Sheet thô của một người chạy ads: các block 'camp' (ngày trên dòng đầu, cột 'Tổng' ở cuối)."""
+    rng = np.random.default_rng(seed)
+    dates = list(pd.date_range("2024-01-01", periods=n_days, freq="D").to_pydatetime())
+    rows = []
+    for c in range(n_campaigns):
+        rows.append(['camp', f"camp_{seed}_{c:04d}"] + dates + ['Tổng'])
+        for criteria in AD_METRICS:
+            rows.append([None, criteria] + list(rng.integers(0, 5_000, n_days) * 1000) + [None])
+        rows.append([None] * (n_days + 3))
+    return pd.DataFrame(rows)
+
+
+def make_social_sheet(n_weeks=104, n_channels=20, seed=0):
+    """Sheet thô của báo cáo Social: dòng header 'Chỉ số' + các section kênh bắt đầu bằng key cell."""
+    rng = np.random.default_rng(seed)
+    starts = pd.date_range("2023-01-02", periods=n_weeks, freq="W-MON")
+    labels = [f"{s.day:02d}/{s.month:02d} - {(s + pd.Timedelta(days=6)).day:02d}/{(s + pd.Timedelta(days=6)).month:02d}"
+              for s in starts]
+    rows = [[None, None, "Báo cáo Social"] + [None] * n_weeks, [None, None, "Chỉ số"] + labels]
+    for c in range(n_channels):
+        rows.append([SOCIAL_CHANNELS[c % len(SOCIAL_CHANNELS)], f"Kênh {c:03d}", None] + [None] * n_weeks)
+        for metric in ["Follower", "Lượt xem (views)", "Engagement", "video clip", "Text + Ảnh", "Back + text"]:
+            rows.append([None, None, metric] + list(rng.integers(0, 100_000, n_weeks)))
+    return pd.DataFrame(rows)
+
+
+def workbook_bytes(sheets):
+    """Ghi dict {tên sheet: DataFrame thô} thành file .xlsx trong bộ nhớ."""
+    from io import BytesIO
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, sheet_name=name, header=False, index=False)
+    return output.getvalue()
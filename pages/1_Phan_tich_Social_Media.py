@@ -1,43 +1,75 @@
 import streamlit as st
-import pandas as pd
-from datetime import datetime
 import os
 from utils.auth import check_password
+st.set_page_config(layout="wide")
+check_password()
+
+# Các thư viện nặng (pandas, ...) chỉ được nạp sau khi đăng nhập thành công;
+# plotly được nạp bên trong các hàm vẽ biểu đồ.
+import gc
+import pandas as pd
 # Nhập các hàm đã được tách ra từ module utils
-from utils.data_processing import extract_social_data
 from utils.plotting import (
     plot_trends_interactive_line_charts,
     plot_follower_growth_interactive_line_chart,
     plot_comparison_bar_chart,
     plot_content_pie_chart,
-    plot_content_distribution_bar_chart # <-- THÊM HÀM MỚI
+    plot_content_distribution_bar_chart, # <-- THÊM HÀM MỚI
+    plot_week_over_week_chart,
+    reset_payload_log,
+    render_payload_report
 )
-from utils.helpers import to_excel
-st.set_page_config(layout="wide")
-# ========================== CÁC HẰNG SỐ CẤU HÌNH ==========================
-METRIC_MAPPING = {
-    "Follower": "Follower",
-    "Lượt xem (views)": "Lượt xem (views)",
-    "Engagement": "Engagement (like/ cmt/ share)",
-    "Engagement (like/ cmt/ share)": "Engagement (like/ cmt/ share)",
-    "Total content put": "Total content publish",
-    "Total content publish": "Total content publish",
-    "video clip": "Video/ clips/ Reels",
-    "Video/ clips/ Reels": "Video/ clips/ Reels",
-    "Reel Text + Ảnh": "Text + Ảnh",
-    "Text + Ảnh": "Text + Ảnh",
-    "Back - text": "Back + text",
-    "Back + text": "Back + text"
-}
-
-REQUIRED_METRICS = [
-    "Follower", "Lượt xem (views)", "Engagement (like/ cmt/ share)",
-    "Total content publish", "Video/ clips/ Reels", "Text + Ảnh", "Back + text"
-]
-
-CONTENT_METRICS = ["Video/ clips/ Reels", "Text + Ảnh", "Back + text"]
-check_password()
-st.set_page_config(layout="wide")
+from utils.helpers import to_excel, social_kpi_cards, render_kpi_cards, filter_container, applied_filters
+from utils.reshape import pivot_wide
+from utils.datasets import (
+    METRIC_MAPPING, REQUIRED_METRICS, CONTENT_METRICS, SOCIAL_PIVOT_COLS, DEFAULT_KEY_CELLS,
+    SOCIAL_DEDUP_KEYS, SCHEMA_VERSION, LOAD_WINDOWS, gsheet_export_url, merge_sources, normalize_social_wide,
+    recent_date_range
+)
+from utils.executor import run_job, run_frame_job, render_pool_status
+from utils.jobs import extract_social_excel, extract_social_csv
+from utils.ingest import content_key, fetch_all, run_cached
+from utils.dataset_cache import dataset_key, load_dataset, store_dataset
+from utils.readers import read_bytes
+from utils.progressive import (
+    background_load, background_result, load_token, preview_columns, should_preview, watch_progress
+)
+from utils.filter_index import FilterIndex
+from utils.memory import MemoryTracker, memory_settings, render_memory_report
+from utils.query_engine import (
+    available_backends, default_backend, filter_social, social_kpi_totals, social_by_channel,
+    social_rollups, social_by_period, social_growth, SOCIAL_TREND_LEVELS, SOCIAL_GROWTH_COLS
+)
+from utils.rollups import AUTO, point_budget, resolve_level
+from utils.rolling import growth_col
+from utils.snapshots import (
+    PRESETS, CUSTOM_PRESET, preset_range, data_fingerprint,
+    ensure_snapshots, load_snapshot, render_snapshot, build_social_snapshot
+)
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def build_social_filter_index(data_token, _df):
+    """
+    Dựng chỉ mục bitmap cho bộ lọc kênh/khoảng ngày một lần cho mỗi bộ dữ liệu (nhớ theo khóa bộ
+    dữ liệu `data_token`: chỉ mục của bảng khác cùng kích thước sẽ chọn sai dòng).
+    """
+    return FilterIndex(_df, dims=['Tên kênh'], date_col='Ngày Bắt Đầu')
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def build_social_rollups(data_token, _df):
+    """
+    Tổng hợp sẵn theo tuần / tháng cho biểu đồ xu hướng, một lần cho mỗi bộ dữ liệu (nhớ theo khóa
+    bộ dữ liệu `data_token`, không theo mã băm lấy mẫu của bảng).
+    """
+    return social_rollups(_df)
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def social_snapshot_key(data_token, _df):
+    """
+    Khóa ảnh chụp báo cáo dựng sẵn (mã băm toàn bộ nội dung) của một bộ dữ liệu. Nhớ theo khóa bộ
+    dữ liệu `data_token`: mã băm đối số của streamlit chỉ lấy mẫu các bảng lớn.
+    """
+    return data_fingerprint(_df, CONTENT_METRICS, point_budget())
 
 # Vị trí file tạm để lưu link Google Sheet cho trang Social
 LINK_FILE_SOCIAL = "temp_social_gsheet_link.txt"
@@ -60,11 +92,134 @@ def load_link_social():
             st.sidebar.warning(f"Không thể đọc link đã lưu: {e}")
     return ""
 
+def render_data_download(df_filtered, pivot_cols, start_date, end_date, low_memory, filter_token):
+    """
+    Bảng dữ liệu chi tiết đã lọc và nút tải xuống Excel. File Excel được tạo nền theo
+    `filter_token`; khi xong chỉ phần nút tải xuống được vẽ lại (không chạy lại cả trang), job của
+    bộ lọc cũ bị hủy nếu còn chờ trong hàng đợi khi bộ lọc đổi.
+    """
+    st.markdown("---")
+    st.subheader("Bảng Dữ Liệu Chi Tiết")
+    # Sắp xếp lại cột để dễ đọc hơn
+    display_cols = pivot_cols + [col for col in REQUIRED_METRICS if col in df_filtered.columns]
+    st.dataframe(df_filtered[display_cols])
+
+    def download_button(excel_data):
+        st.download_button(
+            label="📥 Tải xuống dữ liệu đã lọc (Excel)",
+            data=excel_data,
+            file_name=f"social_filtered_data_{start_date.strftime('%Y%m%d')}_to_{end_date.strftime('%Y%m%d')}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+
+    try:
+        # Chế độ tiết kiệm bộ nhớ: chỉ tạo file Excel khi người dùng bấm tải xuống
+        if low_memory:
+            download_button(lambda: run_job(to_excel, df_filtered))
+        else:
+            background_result(st, "social_excel_export", filter_token, "Tạo file Excel", to_excel,
+                              (df_filtered,), download_button)
+    except Exception as e:
+        st.error(f"Lỗi khi tạo file Excel để tải xuống: {e}")
+
+def extract_social_wide(sources, source_keys, key_cells, date_range, progressive, low_memory, tracker):
+    """
+    Trích xuất, gộp các nguồn và pivot dữ liệu social. `sources`: [(tên nguồn, job, nội dung)],
+    `source_keys`: khóa nội dung tương ứng; `date_range`: khoảng ngày cần trích xuất. Trả về (bảng wide đã chuẩn hóa, đang là bản xem trước
+    hay không, mọi nguồn đều đọc được hay không).
+    """
+    results, is_preview = [], False
+    if len(sources) == 1 and sources[0][1] is extract_social_excel and progressive and not low_memory \
+            and should_preview(sources[0][2]):
+        # Một file lớn: trích xuất đầy đủ chạy nền, trong lúc đó hiển thị bản xem trước
+        data = sources[0][2]
+        background = background_load(
+            st, "social_background_load", load_token(data, key_cells, date_range),
+            lambda: [(extract_social_excel, (data, key_cells, METRIC_MAPPING), {"date_range": date_range})]
+        )
+        if background.is_done():
+            results = background.results
+        else:
+            is_preview = True
+            try:
+                if background.preview is None:
+                    background.preview = run_job(extract_social_excel, data, key_cells, METRIC_MAPPING,
+                                                 recent_cols=preview_columns(), date_range=date_range)
+                results = [background.preview]
+            except Exception as e:
+                results = [e]
+    else:
+        # Kết quả được ghi nhớ theo nội dung từng nguồn: chỉ các nguồn thay đổi mới phải trích xuất lại
+        results, reused = run_cached(
+            [(key, job, (data, key_cells, METRIC_MAPPING), {"date_range": date_range})
+             for key, (_, job, data) in zip(source_keys, sources)],
+            use_cache=not low_memory
+        )
+        if reused:
+            st.sidebar.caption(f"♻️ Dùng lại kết quả của {reused}/{len(sources)} nguồn không thay đổi.")
+
+    long_frames, engines, unparsed_cells, complete = [], [], 0, True
+    for (name, job, _), result in zip(sources, results):
+        if isinstance(result, Exception):
+            complete = False
+            where = f" '{name}'" if len(sources) > 1 else ""
+            if job is extract_social_excel:
+                st.error(f"Lỗi khi xử lý file Excel{where}: {result}")
+            else:
+                st.error(f"Lỗi khi đọc Google Sheet{where}. Hãy chắc chắn link là public. Lỗi: {result}")
+            continue
+        if job is extract_social_excel:
+            result, engine = result
+            engines.append(engine)
+        unparsed_cells += result.attrs.get('unparsed_cells', 0)
+        long_frames.append([result])
+    if engines:
+        st.sidebar.caption(f"Engine đọc file: {', '.join(dict.fromkeys(engines))}")
+    if low_memory:
+        sources.clear()
+    del results
+
+    if not long_frames:
+        st.stop()
+    # Gộp các nguồn: khi trùng (kênh, chỉ số, kỳ) thì nguồn sau ghi đè nguồn trước
+    df_long = merge_sources(long_frames, SOCIAL_DEDUP_KEYS)
+    del long_frames
+    tracker.checkpoint("Đọc & trích xuất")
+    if is_preview:
+        st.info(f"👀 Đang hiển thị bản xem trước ({preview_columns()} cột thời gian gần nhất). "
+                "Toàn bộ lịch sử đang được nạp nền và sẽ tự cập nhật khi xong.")
+        watch_progress(st, background, "Đang nạp toàn bộ lịch sử")
+
+    # Pivot & chuẩn hóa
+    if df_long.empty and date_range is not None and complete:
+        st.warning(f"Không có dữ liệu từ ngày {date_range[0]:%d/%m/%Y} trở đi. Hãy chọn phạm vi nạp dữ liệu rộng hơn.")
+        st.stop()
+    if df_long.empty:
+        st.warning("Không trích xuất được dữ liệu hợp lệ. Vui lòng kiểm tra lại file đầu vào và các key cell.")
+        st.stop()
+    if unparsed_cells:
+        st.sidebar.warning(f"⚠️ {unparsed_cells:,} ô có dữ liệu nhưng không đọc được thành số và đã bị bỏ qua.")
+
+    # Chỉ gửi các cột cần cho pivot; bảng nhỏ được pivot trực tiếp (xem run_frame_job)
+    df_wide = run_frame_job(pivot_wide, df_long[SOCIAL_PIVOT_COLS + ['Chỉ số chuẩn', 'Giá trị']],
+                            index=SOCIAL_PIVOT_COLS, columns='Chỉ số chuẩn', values='Giá trị', aggfunc='sum')
+    if low_memory:
+        del df_long
+        gc.collect()
+
+    df_wide = normalize_social_wide(df_wide)
+    df_wide.attrs['unparsed_cells'] = unparsed_cells
+    return df_wide, is_preview, complete
+
 def render_social_dashboard():
     """
     Hàm chính để render toàn bộ giao diện và logic của dashboard Social Media.
     """
     st.header("📊 Phân Tích Hiệu Suất Kênh Social Media")
+    low_memory, memory_budget_mb, use_tracemalloc = memory_settings(st, "social")
+    tracker = MemoryTracker(use_tracemalloc)
+    reset_payload_log(st)
+    render_pool_status(st)
 
     # ========================== NHẬP DỮ LIỆU (SIDEBAR) ==========================
     st.sidebar.header("Nhập Dữ Liệu Social")
@@ -74,117 +229,179 @@ def render_social_dashboard():
         horizontal=True,
         key="social_source"
     )
+    progressive = st.sidebar.checkbox(
+        "Xem trước khi nạp file lớn", value=True, key="social_progressive",
+        help="Với file lớn: hiển thị ngay các mốc thời gian gần nhất, toàn bộ lịch sử được nạp nền rồi tự "
+             "cập nhật. Không áp dụng ở chế độ tiết kiệm bộ nhớ."
+    )
+    load_window = st.sidebar.selectbox(
+        "Phạm vi nạp dữ liệu:", options=list(LOAD_WINDOWS), key="social_load_window",
+        help="Chỉ trích xuất các kỳ bắt đầu gần đây (tính đến hôm nay): sheet dài nhiều năm nạp nhanh hơn."
+    )
+    date_range = recent_date_range(LOAD_WINDOWS[load_window])
 
     key_cell_input = st.sidebar.text_input(
-        "Nhập danh sách key cell (phân tách bởi dấu phẩy):", value="FB,TT,OA,YT,ZL",
+        "Nhập danh sách key cell (phân tách bởi dấu phẩy):", value=DEFAULT_KEY_CELLS,
         key="social_keys"
     )
     key_cells = [s.strip().upper() for s in key_cell_input.split(",") if s.strip()]
 
-    df_raw = None
+    # Đọc và trích xuất chạy trong process pool: dữ liệu thô không quay về tiến trình chính
+    sources = []  # [(tên nguồn, job trích xuất, nội dung file)], theo thứ tự: nguồn sau ghi đè nguồn trước
+    is_preview = False
     if data_source == 'Upload file Excel':
-        uploaded_file = st.sidebar.file_uploader("Chọn file Excel của bạn", type=["xlsx", "xls"], key="social_uploader")
-        if uploaded_file:
-            try:
-                df_raw = pd.read_excel(uploaded_file, header=None, engine='openpyxl')
-            except Exception as e:
-                st.error(f"Lỗi khi xử lý file Excel: {e}")
+        uploaded_files = st.sidebar.file_uploader(
+            "Chọn file Excel của bạn (có thể chọn nhiều file)", type=["xlsx", "xls"], key="social_uploader",
+            accept_multiple_files=True
+        )
+        for uploaded_file in uploaded_files or []:
+            sources.append((uploaded_file.name, extract_social_excel, uploaded_file.getvalue()))
                 
     elif data_source == 'Google Sheet (link public share)':
         saved_link = load_link_social()
-        sheet_url = st.sidebar.text_input(
-            "Dán link Google Sheet đã share:", 
+        links_input = st.sidebar.text_area(
+            "Dán link Google Sheet đã share (mỗi dòng một link):", 
             value=saved_link, 
             key="social_gsheet"
         )
-        
-        if sheet_url:
-            if sheet_url != saved_link:
-                save_link_social(sheet_url)
-            
-            try:
-                csv_export_url = sheet_url.replace('/edit?usp=sharing', '/export?format=csv').replace('/edit', '/export?format=csv')
-                df_raw = pd.read_csv(csv_export_url, header=None)
-            except Exception as e:
-                st.error(f"Lỗi khi đọc Google Sheet. Hãy chắc chắn link là public. Lỗi: {e}")
+        sheet_urls = list(dict.fromkeys(line.strip() for line in links_input.splitlines() if line.strip()))
+        if sheet_urls:
+            if "\n".join(sheet_urls) != saved_link:
+                save_link_social("\n".join(sheet_urls))
+            # Tải song song nội dung CSV của các link
+            downloaded = fetch_all(lambda url: read_bytes(gsheet_export_url(url, 'csv')), sheet_urls)
+            for sheet_url, data in zip(sheet_urls, downloaded):
+                if isinstance(data, Exception):
+                    st.error(f"Lỗi khi đọc Google Sheet. Hãy chắc chắn link là public. Lỗi: {data}")
+                    continue
+                sources.append((sheet_url, extract_social_csv, data))
 
-    if df_raw is None:
+    if not sources:
         st.info("💡 Vui lòng nhập dữ liệu cho dashboard Social Media để bắt đầu.")
         st.stop()
 
-    # ========================== XỬ LÝ & CHUẨN HÓA DATA ==========================
-    df_long = extract_social_data(df_raw, key_cells=key_cells, metric_mapping=METRIC_MAPPING)
-    if df_long.empty:
-        st.warning("Không trích xuất được dữ liệu hợp lệ. Vui lòng kiểm tra lại file đầu vào và các key cell.")
-        st.stop()
-
-    pivot_cols = ['Kênh', 'Tên kênh', 'Ngày Bắt Đầu', 'Ngày Kết Thúc', 'Mốc thời gian', 'Loại thời gian']
-    df_wide = df_long.pivot_table(index=pivot_cols, columns='Chỉ số chuẩn', values='Giá trị', aggfunc='sum').reset_index()
-
-    for col in REQUIRED_METRICS:
-        if col not in df_wide.columns:
-            df_wide[col] = 0
-        else:
-            df_wide[col] = pd.to_numeric(df_wide[col], errors='coerce').fillna(0)
-            
-    # Tính tổng số nội dung được đăng (Total content publish) từ các loại nội dung chi tiết
-    df_wide['Total content publish'] = df_wide[CONTENT_METRICS].sum(axis=1)
-
-    df_wide = df_wide[pivot_cols + REQUIRED_METRICS]
+    # Bảng đã chuẩn hóa của đúng các nguồn này còn trên đĩa (kể cả sau khi khởi động lại server)
+    source_keys = [content_key(data, key_cells, job.__name__, date_range) for _, job, data in sources]
+    cache_key = dataset_key(source_keys)
+    df_wide = load_dataset("social", cache_key, SCHEMA_VERSION, use_memory=not low_memory)
+    complete = df_wide is not None
+    if df_wide is not None:
+        st.sidebar.caption("💾 Dùng lại dữ liệu đã xử lý từ bộ nhớ đệm trên đĩa.")
+        if low_memory:
+            sources.clear()
+        tracker.checkpoint("Đọc & trích xuất")
+        unparsed_cells = df_wide.attrs.get('unparsed_cells', 0)
+        if unparsed_cells:
+            st.sidebar.warning(f"⚠️ {unparsed_cells:,} ô có dữ liệu nhưng không đọc được thành số và đã bị bỏ qua.")
+    else:
+        df_wide, is_preview, complete = extract_social_wide(
+            sources, source_keys, key_cells, date_range, progressive, low_memory, tracker
+        )
+        # Chỉ lưu dữ liệu đầy đủ, không lỗi (bản xem trước / nguồn lỗi sẽ được đọc lại lần sau)
+        if complete and not is_preview:
+            store_dataset("social", cache_key, SCHEMA_VERSION, df_wide, use_memory=not low_memory)
+    pivot_cols = SOCIAL_PIVOT_COLS
+    # Khóa của đúng bảng đang dùng (bản xem trước / thiếu nguồn lỗi có khóa riêng), dùng cho các
+    # bước dựng sẵn được nhớ theo bộ dữ liệu
+    data_token = (cache_key, is_preview, complete)
+    if not low_memory:
+        build_social_rollups(data_token, df_wide)  # dựng sẵn khi nạp dữ liệu, dùng lại ở mọi lần đổi bộ lọc
+    tracker.checkpoint("Pivot & chuẩn hóa")
 
     # ========================== BỘ LỌC (SIDEBAR) ==========================
     st.sidebar.header("Bộ Lọc Social:")
     unique_channel_names = sorted(df_wide['Tên kênh'].unique())
-    selected_channel_names = st.sidebar.multiselect(
-        "Chọn Tên Kênh:",
-        options=unique_channel_names,
-        default=list(unique_channel_names),
-        key="social_channels"
-    )
-
     valid_dates = pd.to_datetime(df_wide['Ngày Bắt Đầu'], errors='coerce').dropna()
     if valid_dates.empty:
         st.error("Không có dữ liệu ngày hợp lệ trong file.")
         st.stop()
 
     min_date, max_date = valid_dates.min().date(), valid_dates.max().date()
-    selected_date_range = st.sidebar.date_input(
-        "Chọn khoảng thời gian:",
-        value=(min_date, max_date),
-        min_value=min_date, max_value=max_date,
-        format="DD/MM/YYYY",
-        key="social_daterange"
+    batch = st.sidebar.toggle(
+        "Gom thay đổi bộ lọc", value=True, key="social_batch_filters",
+        help="Chọn kênh, ngày... rồi bấm 'Áp dụng bộ lọc' để tính lại một lần."
     )
+    with filter_container(st, "social_filter_form", batch):
+        preset = st.selectbox(
+            "Khoảng thời gian nhanh:", options=[CUSTOM_PRESET, *PRESETS], key="social_preset",
+            help="Các mốc nhanh với toàn bộ kênh được dựng sẵn, hiển thị tức thì."
+        )
+        selected_channel_names = st.multiselect(
+            "Chọn Tên Kênh:",
+            options=unique_channel_names,
+            default=list(unique_channel_names),
+            key="social_channels"
+        )
+        # Trong form ô chọn ngày luôn hiện (widget trong form chỉ hiện / ẩn sau khi bấm Áp dụng)
+        if preset == CUSTOM_PRESET or batch:
+            custom_range = st.date_input(
+                "Chọn khoảng thời gian:",
+                value=(min_date, max_date),
+                min_value=min_date, max_value=max_date,
+                format="DD/MM/YYYY",
+                key="social_daterange",
+                help=f"Dùng khi khoảng thời gian nhanh là '{CUSTOM_PRESET}'." if batch else None
+            )
+        if preset == CUSTOM_PRESET:
+            selected_date_range = custom_range
+        else:
+            selected_date_range = preset_range(preset, min_date, max_date)
+            st.caption(f"📅 {selected_date_range[0]:%d/%m/%Y} – {selected_date_range[1]:%d/%m/%Y}")
+        backend = st.selectbox(
+            "Engine truy vấn:", options=available_backends(), key="social_backend",
+            index=available_backends().index(default_backend()),
+            help="DuckDB / Polars chỉ xuất hiện khi đã cài đặt thư viện duckdb / polars."
+        )
+        submitted = batch and st.form_submit_button("Áp dụng bộ lọc", type="primary")
+
+    # Chế độ gom thay đổi: trang dùng bộ lọc đã áp dụng cho tới khi bấm nút
+    filters, pending = applied_filters(
+        st, "social_applied_filters",
+        {"preset": preset, "dates": tuple(selected_date_range), "channels": selected_channel_names,
+         "backend": backend},
+        cache_key, batch, submitted
+    )
+    if pending:
+        st.sidebar.caption("✏️ Có thay đổi bộ lọc chưa áp dụng: bấm 'Áp dụng bộ lọc'.")
+    preset, selected_date_range = filters["preset"], filters["dates"]
+    selected_channel_names, backend = filters["channels"], filters["backend"]
+    filter_token = (cache_key, is_preview, repr(filters))
 
     if len(selected_date_range) != 2:
         st.warning("Vui lòng chọn đủ ngày bắt đầu và ngày kết thúc.")
         st.stop()
     start_date, end_date = selected_date_range
 
-    df_filtered = df_wide[
-        (df_wide['Tên kênh'].isin(selected_channel_names)) &
-        (pd.to_datetime(df_wide['Ngày Bắt Đầu']).dt.date >= start_date) &
-        (pd.to_datetime(df_wide['Ngày Bắt Đầu']).dt.date <= end_date)
-    ].copy()
+    df_filtered = filter_social(
+        df_wide, selected_channel_names, start_date, end_date,
+        backend=backend, index=build_social_filter_index(data_token, df_wide)
+    )
 
     if df_filtered.empty:
         st.warning("Không có dữ liệu cho lựa chọn của bạn.")
         st.stop()
+    tracker.checkpoint("Lọc")
+
+    # ========================== BÁO CÁO DỰNG SẴN (MỐC NHANH) ==========================
+    # Bản xem trước không được dựng / phục vụ báo cáo dựng sẵn
+    snapshot_key = None if is_preview else social_snapshot_key(data_token, df_wide)
+    if snapshot_key and ensure_snapshots("social", snapshot_key, build_social_snapshot, df_wide, content_metrics=CONTENT_METRICS):
+        st.sidebar.caption("⏳ Đang dựng sẵn báo cáo cho các mốc thời gian nhanh...")
+    all_selected = set(selected_channel_names) == set(unique_channel_names)
+    snapshot = load_snapshot("social", snapshot_key, preset) if snapshot_key and preset != CUSTOM_PRESET and all_selected else None
+    if snapshot is not None:
+        render_snapshot(st, "social", snapshot_key, snapshot)
+        tracker.checkpoint("Báo cáo dựng sẵn")
+        render_data_download(df_filtered, pivot_cols, start_date, end_date, low_memory, filter_token)
+        tracker.checkpoint("Bảng & Excel")
+        render_payload_report(st)
+        render_memory_report(st, tracker, memory_budget_mb, low_memory)
+        return
 
     # ========================== KPI TỔNG QUAN ==========================
     st.subheader("Tổng Quan Hiệu Suất (Performance KPIs)")
-    total_views = int(df_filtered["Lượt xem (views)"].sum())
-    total_engagement = int(df_filtered["Engagement (like/ cmt/ share)"].sum())
-    total_content = int(df_filtered["Total content publish"].sum())
-
-    latest_followers_per_channel = df_filtered.sort_values(by='Ngày Bắt Đầu').groupby('Tên kênh').tail(1)
-    total_followers_end_period = int(latest_followers_per_channel['Follower'].sum())
-
-    col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Tổng Lượt xem (Views)", f"{total_views:,}")
-    col2.metric("Tổng Tương tác (Engagement)", f"{total_engagement:,}")
-    col3.metric("Follower (Cuối kỳ)", f"{total_followers_end_period:,}")
-    col4.metric("Tổng số bài đăng", f"{total_content:,}")
+    kpis = social_kpi_totals(df_filtered, backend=backend)
+    render_kpi_cards(st, social_kpi_cards(kpis))
     st.markdown("---")
 
     # ========================== BIỂU ĐỒ ==========================
@@ -193,47 +410,52 @@ def render_social_dashboard():
 
     with c1:
         st.write("#### 📈 Xu Hướng Theo Thời Gian")
-        plot_trends_interactive_line_charts(st, df_filtered)
+        granularity = st.selectbox(
+            "Độ chi tiết thời gian:", options=[AUTO, *SOCIAL_TREND_LEVELS], key="social_granularity",
+            help="'Tự động' chọn mức chi tiết nhất mà biểu đồ vẫn gọn với khoảng thời gian đã chọn."
+        )
+        level = resolve_level(granularity, start_date, end_date, SOCIAL_TREND_LEVELS)
+        if granularity == AUTO:
+            st.caption(f"Đang hiển thị theo: {level}")
+        # Chế độ tiết kiệm bộ nhớ không giữ bảng tổng hợp sẵn: gộp trực tiếp từ dữ liệu đã lọc
+        rollups = social_rollups(df_filtered) if low_memory else build_social_rollups(data_token, df_wide)
+        df_trend = social_by_period(rollups, level, start_date, end_date, selected_channel_names)
+        plot_trends_interactive_line_charts(st, df_trend, level)
     # Thay thế hàm cũ bằng hàm tương tác mới
-        plot_follower_growth_interactive_line_chart(st, df_filtered)
+        plot_follower_growth_interactive_line_chart(st, df_trend, level)
 
     with c2:
         st.write("#### 📊 So Sánh Hiệu Suất Giữa Các Kênh")
-        df_grouped = df_filtered.groupby('Tên kênh').agg({
-            "Lượt xem (views)": 'sum',
-            "Engagement (like/ cmt/ share)": 'sum'
-        }).reset_index()
+        df_grouped = social_by_channel(df_filtered, backend=backend)
         plot_comparison_bar_chart(st, df_grouped, 'Tên kênh', "Lượt xem (views)", "Tổng Lượt Xem Theo Tên Kênh")
         plot_comparison_bar_chart(st, df_grouped, 'Tên kênh', "Engagement (like/ cmt/ share)", "Tổng Tương Tác Theo Tên Kênh")
     
     st.markdown("---") # Thêm đường kẻ ngang phân tách
 
+    # ========================== TĂNG TRƯỞNG SO VỚI TUẦN TRƯỚC ==========================
+    st.subheader("Tăng Trưởng So Với Tuần Trước")
+    if (df_filtered['Loại thời gian'] == 'Tuần').any():
+        df_growth = social_growth(rollups, start_date, end_date, selected_channel_names)
+        plot_week_over_week_chart(st, df_growth, SOCIAL_GROWTH_COLS, {c: growth_col(c) for c in SOCIAL_GROWTH_COLS})
+    else:
+        st.info("Dữ liệu không có mốc theo tuần nên không tính được tăng trưởng so với tuần trước.")
+    st.markdown("---")
+
     # ======================= PHÂN TÍCH CƠ CẤU NỘI DUNG (CẬP NHẬT) =======================
     st.subheader("Phân Tích Cơ Cấu Nội Dung")
     # Biểu đồ tròn thể hiện cơ cấu nội dung tổng thể
     plot_content_pie_chart(st, df_filtered, CONTENT_METRICS)
     
     # Biểu đồ cột thể hiện tỷ trọng nội dung theo từng kênh (phần mới)
-    plot_content_distribution_bar_chart(st, df_filtered, CONTENT_METRICS)
+    plot_content_distribution_bar_chart(st, df_filtered, CONTENT_METRICS, backend)
+    tracker.checkpoint("KPI & biểu đồ")
 
 
     # ========================== BẢNG CHI TIẾT & DOWNLOAD ==========================
-    st.markdown("---")
-    st.subheader("Bảng Dữ Liệu Chi Tiết")
-    # Sắp xếp lại cột để dễ đọc hơn
-    display_cols = pivot_cols + [col for col in REQUIRED_METRICS if col in df_filtered.columns]
-    st.dataframe(df_filtered[display_cols])
-
-    try:
-        excel_data = to_excel(df_filtered)
-        st.download_button(
-            label="📥 Tải xuống dữ liệu đã lọc (Excel)",
-            data=excel_data,
-            file_name=f"social_filtered_data_{start_date.strftime('%Y%m%d')}_to_{end_date.strftime('%Y%m%d')}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
-    except Exception as e:
-        st.error(f"Lỗi khi tạo file Excel để tải xuống: {e}")
+    render_data_download(df_filtered, pivot_cols, start_date, end_date, low_memory, filter_token)
+    tracker.checkpoint("Bảng & Excel")
+    render_payload_report(st)
+    render_memory_report(st, tracker, memory_budget_mb, low_memory)
 
 # Chạy hàm render chính
 if __name__ == "__main__":
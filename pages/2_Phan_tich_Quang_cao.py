@@ -1,8 +1,4 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import os # Thêm thư viện os để làm việc với file
 from io import BytesIO # Thêm thư viện io
 from utils.auth import check_password
@@ -11,6 +7,45 @@ from utils.auth import check_password
 st.set_page_config(layout="wide")
 check_password()
 
+# Các thư viện nặng chỉ được nạp sau khi đăng nhập thành công;
+# plotly được nạp ngay trước khi vẽ biểu đồ.
+import gc
+import pandas as pd
+from utils.readers import open_excel, read_bytes
+from utils.gsheets import GoogleSheetSource
+from utils.reshape import pivot_wide
+from utils.datasets import (
+    AD_PIVOT_INDEX, AD_DEDUP_KEYS, SCHEMA_VERSION, LOAD_WINDOWS, gsheet_export_url, merge_sources,
+    normalize_ads_pivot, recent_date_range
+)
+from utils.filter_index import FilterIndex, ValueSearch
+from utils.helpers import ads_kpi_cards, render_kpi_cards, filter_container, applied_filters
+from utils.memory import MemoryTracker, memory_settings, render_memory_report
+from utils.plotting import (
+    show_chart, reset_payload_log, render_payload_report,
+    build_runner_scatter, build_runner_bar, build_revenue_treemap, build_budget_treemap,
+    build_campaign_bubble, build_ads_trend_chart, build_rolling_chart
+)
+from utils.executor import run_job, run_frame_job, render_pool_status
+from utils.jobs import extract_camp_workbook, extract_camp_frames
+from utils.ingest import content_key, frame_key, fetch_all, run_cached
+from utils.dataset_cache import dataset_key, load_dataset, store_dataset
+from utils.dag import StageGraph, render_stage_report
+from utils.progressive import (
+    background_load, background_result, load_token, preview_columns, should_preview, watch_progress
+)
+from utils.snapshots import (
+    PRESETS, CUSTOM_PRESET, preset_range, data_fingerprint,
+    ensure_snapshots, load_snapshot, render_snapshot, build_ads_snapshot
+)
+from utils.query_engine import (
+    available_backends, default_backend, filter_ads, ads_kpi_totals,
+    ads_by_sheet, ads_by_campaign, ads_rollups, ads_by_period, top_campaigns_per_sheet, OTHER_LABEL,
+    AD_TREND_LEVELS, ads_rolling, rolling_lookback
+)
+from utils.rollups import AUTO, point_budget, resolve_level
+from utils.rolling import ROLLING_WINDOWS, window_col, last_per_period
+
 # ========================== CÁC HÀM PHỤ TRỢ (FALLBACK & HELPERS) ==========================
 # Giữ nguyên các hàm của bạn, đảm bảo code chạy độc lập
 try:
@@ -43,6 +78,38 @@ except ImportError:
             df.to_excel(writer, index=False, sheet_name='FilteredData')
         return output.getvalue()
 
+@st.cache_resource(max_entries=4, show_spinner=False)
+def build_ad_filter_index(data_token, _df):
+    """
+    Dựng chỉ mục bitmap cho bộ lọc sidebar một lần cho mỗi bộ dữ liệu (nhớ theo khóa bộ dữ liệu
+    `data_token`: chỉ mục của bảng khác cùng kích thước sẽ chọn sai dòng).
+    """
+    return FilterIndex(_df, dims=['sheet', 'campaign'], date_col='date')
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def build_campaign_search(data_token, _df):
+    """
+    Danh sách chiến dịch đã sắp xếp (kèm theo từng người chạy) để tìm kiếm, một lần cho mỗi bộ dữ
+    liệu (nhớ theo khóa bộ dữ liệu `data_token`, không theo mã băm lấy mẫu của bảng).
+    """
+    return ValueSearch(_df, 'campaign', group_dim='sheet')
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def build_ad_rollups(data_token, _df):
+    """
+    Tổng hợp sẵn theo ngày / tuần / tháng cho biểu đồ xu hướng, một lần cho mỗi bộ dữ liệu (nhớ
+    theo khóa bộ dữ liệu `data_token`, không theo mã băm lấy mẫu của bảng).
+    """
+    return ads_rollups(_df)
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def ad_snapshot_key(data_token, _df):
+    """
+    Khóa ảnh chụp báo cáo dựng sẵn (mã băm toàn bộ nội dung) của một bộ dữ liệu. Nhớ theo khóa bộ
+    dữ liệu `data_token`: mã băm đối số của streamlit chỉ lấy mẫu các bảng lớn.
+    """
+    return data_fingerprint(_df, DEFAULT_TOP_N, point_budget())
+
 # --- BẮT ĐẦU PHẦN CẢI TIẾN: HÀM LƯU/TẢI LINK ---
 LINK_FILE_AD = "temp_ad_gsheet_link.txt"
 
@@ -54,6 +121,21 @@ def save_link_ad(link):
     except Exception as e:
         st.sidebar.warning(f"Không thể lưu link: {e}")
 
+def open_ad_link(sheet_url, per_sheet_fetch):
+    """
+    Mở một link Google Sheet: theo từng sheet (CSV) nếu được chọn, nếu không hoặc lỗi thì tải cả
+    file .xlsx. Trả về (nguồn, nội dung .xlsx hoặc None, lỗi của cách tải theo từng sheet nếu có).
+    """
+    fallback_error = None
+    if per_sheet_fetch:
+        try:
+            return GoogleSheetSource(sheet_url), None, None
+        except Exception as e:
+            fallback_error = e
+    # Tự chọn engine nhanh nhất hiện có (calamine), fallback sang openpyxl
+    workbook_bytes = read_bytes(gsheet_export_url(sheet_url, 'xlsx'))
+    return open_excel(workbook_bytes), workbook_bytes, fallback_error
+
 def load_link_ad():
     """Đọc link đã lưu từ file tạm nếu có."""
     if os.path.exists(LINK_FILE_AD):
@@ -68,12 +150,220 @@ def load_link_ad():
 
 # ========================== CÁC HẰNG SỐ CẤU HÌNH ==========================
 DEFAULT_SHEETS = "duyanh,duc"
+DEFAULT_TOP_N = 15  # Số chiến dịch hiển thị cho mỗi người chạy trên treemap / bubble chart
+MAX_CAMPAIGN_OPTIONS = 100  # Số kết quả tìm kiếm chiến dịch tối đa gửi xuống trình duyệt
+ALL_CAMPAIGNS = "Tất cả chiến dịch"
+ROLLING_CHART_SERIES = 10  # Số chiến dịch (doanh số cao nhất) trên biểu đồ chỉ số trượt
+
+def picked_campaigns():
+    """Lựa chọn hiện trên bộ chọn chiến dịch (None: tất cả chiến dịch), đọc từ session_state."""
+    if st.session_state.get("ad_campaign_mode", ALL_CAMPAIGNS) == ALL_CAMPAIGNS:
+        return None
+    return list(st.session_state.get("ad_campaigns", []))
+
+def render_campaign_picker(campaign_search, selected_sheets, batch=False):
+    """
+    Chọn chiến dịch ở sidebar. Trả về None khi chọn tất cả (không lọc theo chiến dịch), hoặc danh
+    sách chiến dịch được chọn. Danh sách lựa chọn chỉ gồm các chiến dịch đã chọn và kết quả tìm
+    kiếm (trong các người chạy đang lọc), không phải toàn bộ chiến dịch.
+    """
+    mode = st.sidebar.radio(
+        "Lọc theo chiến dịch:", options=[ALL_CAMPAIGNS, "Chọn chiến dịch"], horizontal=True, key="ad_campaign_mode"
+    )
+    if mode == ALL_CAMPAIGNS:
+        return None
+
+    query = st.sidebar.text_input(
+        "Tìm chiến dịch (gõ tên hoặc phần đầu tên, không cần dấu):", key="ad_campaign_search"
+    )
+    selected = list(st.session_state.get("ad_campaigns", []))
+    matches = campaign_search.search(query, MAX_CAMPAIGN_OPTIONS, groups=selected_sheets)
+    options = selected + [c for c in matches if c not in set(selected)]
+    selected = st.sidebar.multiselect(
+        f"Chiến dịch ({len(matches)} kết quả hiển thị, tối đa {MAX_CAMPAIGN_OPTIONS}):",
+        options=options, key="ad_campaigns"
+    )
+
+    if not selected:
+        st.sidebar.info("Tìm và chọn ít nhất một chiến dịch.")
+    elif batch:
+        st.sidebar.caption("Chiến dịch được áp dụng cùng các bộ lọc khác khi bấm 'Áp dụng bộ lọc'.")
+
+    # Các chiến dịch đã chọn, nhóm theo người chạy
+    chosen = set(selected)
+    with st.sidebar.expander(f"Đã chọn {len(chosen)} chiến dịch"):
+        for sheet in selected_sheets:
+            in_sheet = [c for c in campaign_search.groups.get(sheet, ()) if c in chosen]
+            if in_sheet:
+                st.markdown(f"**{sheet}** ({len(in_sheet)}): " + ", ".join(in_sheet))
+    return selected
+
+def render_data_download(df_filtered, low_memory, filter_token):
+    """
+    Bảng dữ liệu đã lọc và nút tải xuống Excel. File Excel được tạo nền theo `filter_token`: trang
+    không phải chờ, khi xong chỉ phần nút tải xuống được vẽ lại (không chạy lại cả trang), và khi
+    bộ lọc đổi thì job của bộ lọc cũ bị hủy nếu còn chờ trong hàng đợi.
+    """
+    st.subheader("Bảng Dữ liệu chi tiết (đã lọc)")
+    st.dataframe(df_filtered)
+
+    def download_button(excel_data):
+        st.download_button(
+            label="📥 Tải xuống dữ liệu đã lọc (.xlsx)",
+            data=excel_data,
+            file_name="filtered_ad_campaign_data.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+
+    # Chế độ tiết kiệm bộ nhớ: chỉ tạo file Excel khi người dùng bấm tải xuống
+    if low_memory:
+        download_button(lambda: run_job(to_excel, df_filtered))
+    else:
+        background_result(st, "ad_excel_export", filter_token, "Tạo file Excel", to_excel, (df_filtered,),
+                          download_button)
+
+def render_rolling_kpis(graph, df_pivot, filter_index, start_date, end_date, sheets, campaigns, backend, level):
+    """ROAS và CAC trượt 7/14/30 ngày theo người chạy hoặc chiến dịch (biểu đồ + bảng giá trị mới nhất)."""
+    st.markdown("##### ROAS và CAC trượt")
+    col_by, col_window = st.columns(2)
+    rolling_by = col_by.radio("Theo:", options=["Người chạy", "Chiến dịch"], horizontal=True, key="ad_rolling_by")
+    window = col_window.selectbox("Cửa sổ:", options=ROLLING_WINDOWS, format_func=lambda w: f"{w} ngày",
+                                  key="ad_rolling_window")
+    by = ['sheet'] if rolling_by == "Người chạy" else ['sheet', 'campaign']
+    # Lọc thêm các ngày trước khoảng đã chọn để cửa sổ của những ngày đầu khoảng đủ dữ liệu
+    df_rolling = graph.stage(
+        "Chỉ số trượt",
+        lambda: ads_rolling(filter_ads(df_pivot, rolling_lookback(start_date), end_date, sheets, campaigns,
+                                       backend=backend, index=filter_index), start_date, end_date, by),
+        deps=["Dữ liệu"], params=(start_date, end_date, sheets, campaigns, backend, by)
+    )
+    if df_rolling.empty:
+        st.info("Không có dữ liệu để tính chỉ số trượt với bộ lọc hiện tại.")
+        return
+
+    def build_figures():
+        df_chart = df_rolling
+        if by != ['sheet']:
+            # Chỉ vẽ các chiến dịch có doanh số cao nhất; bảng bên dưới có đủ mọi chiến dịch
+            top = df_rolling.groupby('campaign')['Doanh số'].sum().nlargest(ROLLING_CHART_SERIES).index
+            df_chart = df_rolling[df_rolling['campaign'].isin(top)]
+        df_chart = last_per_period(df_chart, 'date', by, level)
+        return tuple(build_rolling_chart(df_chart, window_col(m, window), by[-1], level) for m in ('ROAS', 'CAC'))
+
+    fig_roas, fig_cac = graph.stage("Biểu đồ chỉ số trượt", build_figures, deps=["Chỉ số trượt"],
+                                    params=(window, level))
+    show_chart(st, fig_roas, use_container_width=True)
+    show_chart(st, fig_cac, use_container_width=True)
+    latest_cols = [window_col(m, w) for m in ('ROAS', 'CAC') for w in ROLLING_WINDOWS]
+    with st.expander("📋 Chỉ số trượt mới nhất của từng " + rolling_by.lower()):
+        st.dataframe(df_rolling.groupby(by, sort=False).tail(1)[by + ['date'] + latest_cols],
+                     hide_index=True, use_container_width=True)
+
+def extract_ads_pivot(sources, parts, extracted_by_source, date_range, progressive, low_memory, tracker):
+    """
+    Trích xuất, gộp các nguồn và pivot dữ liệu quảng cáo. `parts`: [(chỉ số nguồn, khóa, job)];
+    `extracted_by_source`: các lỗi đã gặp khi tải sheet; `date_range`: khoảng ngày cần trích xuất. Trả về (bảng wide đã chuẩn hóa, đang là
+    bản xem trước hay không, mọi sheet đều đọc được hay không).
+    """
+    # Đọc & trích xuất chạy trong process pool để không chặn session của người dùng khác.
+    # File Excel: mỗi workbook một job; Google Sheet: mỗi sheet (đã tải) một job. Kết quả được ghi
+    # nhớ theo nội dung nguồn nên chỉ các nguồn thay đổi mới phải trích xuất lại.
+    is_preview = False
+    if progressive and not low_memory and len(sources) == 1 and sources[0][2] is not None \
+            and len(parts) == 1 and should_preview(sources[0][2]):
+        # Một file lớn: trích xuất đầy đủ từng sheet chạy nền, trong lúc đó hiển thị bản xem trước
+        _, _, (_, (workbook_bytes, sheets_found), job_kwargs) = parts[0]
+        engine = job_kwargs["engine"]
+        background = background_load(
+            st, "ad_background_load", load_token(workbook_bytes, sheets_found, date_range),
+            lambda: [(extract_camp_workbook, (workbook_bytes, [sheet]), job_kwargs) for sheet in sheets_found]
+        )
+        if background.is_done():
+            extracted = {}
+            for sheet, result in zip(sheets_found, background.results):
+                extracted.update({sheet: result} if isinstance(result, Exception) else result)
+        else:
+            is_preview = True
+            try:
+                if background.preview is None:
+                    background.preview = run_job(extract_camp_workbook, workbook_bytes, sheets_found,
+                                                 engine=engine, recent_cols=preview_columns(),
+                                                 date_range=date_range)
+                extracted = dict(background.preview)
+            except Exception as e:
+                extracted = {sheet: e for sheet in sheets_found}
+        extracted_by_source.append((0, extracted))
+    else:
+        calls = [(key, *job) for _, key, job in parts]
+        results, reused = run_cached(calls, use_cache=not low_memory)
+        for (src, _, _), result in zip(parts, results):
+            extracted_by_source.append((src, result if not isinstance(result, Exception) else
+                                        {"(toàn bộ file)": result}))
+        if reused:
+            st.sidebar.caption(f"♻️ Dùng lại kết quả của {reused}/{len(calls)} phần dữ liệu không thay đổi.")
+
+    frames_by_source = [[] for _ in sources]  # theo thứ tự nguồn: nguồn sau ghi đè nguồn trước khi trùng
+    unparsed_cells = 0
+    complete = True
+    for src, extracted in extracted_by_source:
+        for sheet, df_extracted in extracted.items():
+            if isinstance(df_extracted, Exception):
+                complete = False
+                where = f" ({sources[src][0]})" if len(sources) > 1 else ""
+                st.error(f"Lỗi khi đọc hoặc xử lý sheet '{sheet}'{where}: {df_extracted}")
+                continue
+            unparsed_cells += df_extracted.attrs.get('unparsed_cells', 0)
+            if not df_extracted.empty:
+                # Không sửa trực tiếp: kết quả trích xuất có thể đang nằm trong bộ nhớ đệm dùng chung
+                frames_by_source[src].append(df_extracted.assign(sheet=sheet))
+    del extracted_by_source
+
+    if not any(frames_by_source) and date_range is not None and complete:
+        st.warning(f"Không có dữ liệu từ ngày {date_range[0]:%d/%m/%Y} trở đi. Hãy chọn phạm vi nạp dữ liệu rộng hơn.")
+        st.stop()
+    if not any(frames_by_source):
+        st.error("Không trích xuất được dữ liệu từ bất kỳ sheet nào. Vui lòng kiểm tra tên sheet và định dạng file.")
+        st.stop()
+    if low_memory:
+        # Các sheet thô (trong file Excel / bộ nhớ đệm Google Sheet) không còn cần nữa
+        for _, xls, _ in sources:
+            if hasattr(xls, 'close'):
+                xls.close()
+        sources.clear()
+        parts.clear()
+        gc.collect()
+    tracker.checkpoint("Trích xuất")
+    if is_preview:
+        st.info(f"👀 Đang hiển thị bản xem trước ({preview_columns()} cột ngày gần nhất của mỗi sheet). "
+                "Toàn bộ lịch sử đang được nạp nền và sẽ tự cập nhật khi xong.")
+        watch_progress(st, background, "Đang nạp toàn bộ lịch sử")
+
+    if unparsed_cells:
+        st.sidebar.warning(f"⚠️ {unparsed_cells:,} ô có dữ liệu nhưng không đọc được thành số (tính là 0).")
+
+    # Gộp các nguồn: khi trùng (sheet, chiến dịch, ngày, tiêu chí) thì nguồn sau ghi đè nguồn trước
+    df_full = merge_sources(frames_by_source, AD_DEDUP_KEYS, date_col='date')
+    if low_memory:
+        frames_by_source.clear()
+    # Chỉ gửi các cột cần cho pivot; bảng nhỏ được pivot trực tiếp (xem run_frame_job)
+    df_pivot = run_frame_job(pivot_wide, df_full[AD_DEDUP_KEYS + ['value']], index=AD_PIVOT_INDEX,
+                             columns='criteria', values='value', aggfunc='first')
+    if low_memory:
+        del df_full
+        gc.collect()
+    df_pivot = normalize_ads_pivot(df_pivot)
+    df_pivot.attrs['unparsed_cells'] = unparsed_cells
+    return df_pivot, is_preview, complete
 
 def render_campaign_dashboard():
     """
     Hàm chính để render toàn bộ giao diện và logic của dashboard Quảng cáo.
     """
     st.header("📈 Phân Tích Hiệu Suất Chiến Dịch Quảng Cáo")
+    low_memory, memory_budget_mb, use_tracemalloc = memory_settings(st, "ad")
+    tracker = MemoryTracker(use_tracemalloc)
+    reset_payload_log(st)
+    render_pool_status(st)
 
     # ========================== NHẬP DỮ LIỆU (SIDEBAR) - ĐÃ CẬP NHẬT ==========================
     st.sidebar.header("Nhập Dữ Liệu Quảng Cáo")
@@ -84,42 +374,67 @@ def render_campaign_dashboard():
         horizontal=True,
         key="ad_source"
     )
+    progressive = st.sidebar.checkbox(
+        "Xem trước khi nạp file lớn", value=True, key="ad_progressive",
+        help="Với file lớn: hiển thị ngay các ngày gần nhất, toàn bộ lịch sử được nạp nền rồi tự cập nhật. "
+             "Không áp dụng ở chế độ tiết kiệm bộ nhớ."
+    )
+    load_window = st.sidebar.selectbox(
+        "Phạm vi nạp dữ liệu:", options=list(LOAD_WINDOWS), key="ad_load_window",
+        help="Chỉ trích xuất các ngày gần đây (tính đến hôm nay): sheet dài nhiều năm nạp nhanh hơn."
+    )
+    date_range = recent_date_range(LOAD_WINDOWS[load_window])
 
-    xls = None # Khởi tạo biến chung để chứa dữ liệu Excel
+    sources = []  # [(tên nguồn, workbook / GoogleSheetSource, nội dung .xlsx hoặc None)]
 
     if data_source == 'Upload file Excel':
-        uploaded_file = st.sidebar.file_uploader(
-            "Chọn file Excel của bạn", 
+        uploaded_files = st.sidebar.file_uploader(
+            "Chọn file Excel của bạn (có thể chọn nhiều file)", 
             type=["xlsx", "xls"], 
-            key="ad_uploader"
+            key="ad_uploader",
+            accept_multiple_files=True
         )
-        if uploaded_file:
-            xls = pd.ExcelFile(uploaded_file)
+        for uploaded_file in uploaded_files or []:
+            try:
+                workbook_bytes = read_bytes(uploaded_file)
+                sources.append((uploaded_file.name, open_excel(workbook_bytes), workbook_bytes))
+            except Exception as e:
+                st.error(f"Lỗi khi mở file '{uploaded_file.name}': {e}")
 
     elif data_source == 'Google Sheet (link public)':
         saved_link = load_link_ad()
-        sheet_url = st.sidebar.text_input(
-            "Dán link Google Sheet đã public:", 
+        links_input = st.sidebar.text_area(
+            "Dán link Google Sheet đã public (mỗi dòng một link):", 
             value=saved_link, 
             key="ad_gsheet"
         )
-        if sheet_url:
-            if sheet_url != saved_link:
-                save_link_ad(sheet_url)
-            try:
-                xlsx_export_url = sheet_url.replace('/edit?usp=sharing', '/export?format=xlsx').replace('/edit', '/export?format=xlsx')
-                # Dùng engine='openpyxl' để đọc file .xlsx từ URL
-                xls = pd.ExcelFile(xlsx_export_url, engine='openpyxl')
-            except Exception as e:
-                st.error(f"Lỗi khi đọc Google Sheet. Hãy chắc chắn link là public và đúng định dạng. Lỗi: {e}")
-
-    if xls is None:
+        per_sheet_fetch = st.sidebar.checkbox(
+            "Chỉ tải các sheet được chọn (nhanh hơn)", value=True, key="ad_gsheet_per_sheet",
+            help="Tải song song từng sheet dưới dạng CSV thay vì tải cả file .xlsx."
+        )
+        sheet_urls = list(dict.fromkeys(line.strip() for line in links_input.splitlines() if line.strip()))
+        if sheet_urls:
+            if "\n".join(sheet_urls) != saved_link:
+                save_link_ad("\n".join(sheet_urls))
+            # Mở các link song song (tải danh sách sheet hoặc cả file .xlsx)
+            opened = fetch_all(lambda url: open_ad_link(url, per_sheet_fetch), sheet_urls)
+            for sheet_url, result in zip(sheet_urls, opened):
+                if isinstance(result, Exception):
+                    st.error(f"Lỗi khi đọc Google Sheet. Hãy chắc chắn link là public và đúng định dạng. Lỗi: {result}")
+                    continue
+                xls, workbook_bytes, fallback_error = result
+                if fallback_error is not None:
+                    st.sidebar.warning(f"Không tải được theo từng sheet, chuyển sang tải cả file. Lỗi: {fallback_error}")
+                sources.append((sheet_url, xls, workbook_bytes))
+
+    if not sources:
         st.info("💡 Vui lòng cung cấp dữ liệu (từ File Excel hoặc Google Sheet) để bắt đầu.")
         st.stop()
         
-    # --- Phần chọn sheet giữ nguyên, nhưng sẽ lấy sheet từ `xls` object ---
-    all_sheets_in_file = xls.sheet_names
-    st.sidebar.write(f"File có {len(all_sheets_in_file)} sheet:")
+    # --- Chọn sheet: gộp danh sách sheet của mọi nguồn ---
+    st.sidebar.caption(f"Engine đọc file: {', '.join(dict.fromkeys(xls.engine for _, xls, _ in sources))}")
+    all_sheets_in_file = list(dict.fromkeys(s for _, xls, _ in sources for s in xls.sheet_names))
+    st.sidebar.write(f"{len(sources)} nguồn, có {len(all_sheets_in_file)} sheet:")
     st.sidebar.write(all_sheets_in_file)
 
     sheets_input = st.sidebar.text_input(
@@ -130,47 +445,68 @@ def render_campaign_dashboard():
     sheets_to_read = [s.strip() for s in sheets_input.split(',') if s.strip()]
     st.sidebar.success(f"Sẽ phân tích các sheet: {sheets_to_read}")
 
+    # Tải song song các sheet được chọn của mọi Google Sheet; sheet không được chọn không tốn chi phí
+    gsheet_sources = [xls for _, xls, _ in sources if isinstance(xls, GoogleSheetSource)]
+    for error in fetch_all(lambda xls: xls.prefetch(sheets_to_read), gsheet_sources):
+        if isinstance(error, Exception):
+            st.error(f"Lỗi khi tải các sheet từ Google Sheet: {error}")
+    tracker.checkpoint("Đọc dữ liệu")
+
 
     # ========================== ĐỌC & XỬ LÝ DỮ LIỆU - ĐÃ CẬP NHẬT ==========================
-    all_df = []
+    is_preview = False
     for sheet in sheets_to_read:
-        if sheet not in xls.sheet_names:
+        if sheet not in all_sheets_in_file:
             st.warning(f"Sheet '{sheet}' không tồn tại trong file. Bỏ qua...")
-            continue
-        try:
-            # Sửa lại: Đọc từ object `xls` thay vì `uploaded_file`
-            df_raw = xls.parse(sheet, header=None) 
-            df_extracted = extract_camp_blocks(df_raw)
-            if not df_extracted.empty:
-                df_extracted['sheet'] = sheet
-                all_df.append(df_extracted)
-        except Exception as e:
-            st.error(f"Lỗi khi đọc hoặc xử lý sheet '{sheet}': {e}")
-
-    if not all_df:
-        st.error("Không trích xuất được dữ liệu từ bất kỳ sheet nào. Vui lòng kiểm tra tên sheet và định dạng file.")
-        st.stop()
 
-    df_full = pd.concat(all_df, ignore_index=True)
-    df_pivot = df_full.pivot_table(
-        index=['sheet', 'campaign', 'date'],
-        columns='criteria',
-        values='value',
-        aggfunc='first'
-    ).reset_index()
-    
-    df_pivot['date'] = pd.to_datetime(df_pivot['date'], errors='coerce')
-    df_pivot.dropna(subset=['date'], inplace=True) # Loại bỏ các dòng có ngày không hợp lệ
-
-    numeric_cols = [
-        'Doanh số', 'Đầu tư ngân sách', 'KH Tiềm Năng (Mess)', 
-        'Số Lượng Khách Hàng', 'Số đơn hàng'
-    ]
-    for col in numeric_cols:
-        if col in df_pivot.columns:
-            df_pivot[col] = pd.to_numeric(df_pivot[col], errors='coerce').fillna(0)
-        else:
-            df_pivot[col] = 0
+    # Khóa nội dung của từng phần dữ liệu nguồn: File Excel mỗi workbook một phần (một job),
+    # Google Sheet mỗi sheet (đã tải) một phần.
+    parts = []  # [(chỉ số nguồn, khóa nội dung, job trích xuất)]
+    extracted_by_source = []  # [(chỉ số nguồn, {sheet: DataFrame hoặc Exception})]
+    for src, (_, xls, workbook_bytes) in enumerate(sources):
+        sheets_found = [s for s in sheets_to_read if s in xls.sheet_names]
+        if isinstance(xls, GoogleSheetSource):
+            for sheet in sheets_found:
+                try:
+                    df_raw = xls.parse(sheet, header=None)
+                except Exception as e:
+                    extracted_by_source.append((src, {sheet: e}))
+                    continue
+                parts.append((src, frame_key(df_raw, sheet, date_range),
+                              (extract_camp_frames, ({sheet: df_raw},), {"date_range": date_range})))
+        elif sheets_found:
+            parts.append((src, content_key(workbook_bytes, sheets_found, xls.engine, date_range),
+                          (extract_camp_workbook, (workbook_bytes, sheets_found),
+                           {"engine": xls.engine, "date_range": date_range})))
+
+    # Bảng đã chuẩn hóa của đúng các nguồn này còn trên đĩa (kể cả sau khi khởi động lại server)
+    cache_key = dataset_key([key for _, key, _ in parts])
+    df_pivot = None if extracted_by_source else load_dataset("ads", cache_key, SCHEMA_VERSION, use_memory=not low_memory)
+    complete = df_pivot is not None
+    if df_pivot is not None:
+        st.sidebar.caption("💾 Dùng lại dữ liệu đã xử lý từ bộ nhớ đệm trên đĩa.")
+        if low_memory:
+            for _, xls, _ in sources:
+                if hasattr(xls, 'close'):
+                    xls.close()
+            sources.clear()
+            parts.clear()
+            gc.collect()
+        tracker.checkpoint("Trích xuất")
+        unparsed_cells = df_pivot.attrs.get('unparsed_cells', 0)
+        if unparsed_cells:
+            st.sidebar.warning(f"⚠️ {unparsed_cells:,} ô có dữ liệu nhưng không đọc được thành số (tính là 0).")
+    else:
+        df_pivot, is_preview, complete = extract_ads_pivot(
+            sources, parts, extracted_by_source, date_range, progressive, low_memory, tracker
+        )
+        # Chỉ lưu dữ liệu đầy đủ, không lỗi (bản xem trước / sheet lỗi sẽ được đọc lại lần sau)
+        if complete and not is_preview:
+            store_dataset("ads", cache_key, SCHEMA_VERSION, df_pivot, use_memory=not low_memory)
+    tracker.checkpoint("Pivot & chuẩn hóa")
+    # Khóa của đúng bảng đang dùng (bản xem trước / thiếu sheet lỗi có khóa riêng), dùng cho các
+    # bước dựng sẵn được nhớ theo bộ dữ liệu
+    data_token = (cache_key, is_preview, complete)
             
     # ========================== BỘ LỌC DỮ LIỆU (SIDEBAR) ==========================
     st.sidebar.header("Bộ lọc Dữ liệu")
@@ -178,66 +514,110 @@ def render_campaign_dashboard():
     # --- Lấy giá trị cho bộ lọc ---
     min_date = df_pivot['date'].min().date()
     max_date = df_pivot['date'].max().date()
-    unique_sheets = sorted(df_pivot['sheet'].unique())
-    unique_campaigns = sorted(df_pivot['campaign'].unique())
+    filter_index = build_ad_filter_index(data_token, df_pivot)
+    if not low_memory:
+        build_ad_rollups(data_token, df_pivot)  # dựng sẵn khi nạp dữ liệu, dùng lại ở mọi lần đổi bộ lọc
+    unique_sheets = filter_index.values('sheet')
 
     # --- Tạo các widget lọc ---
-    selected_date_range = st.sidebar.date_input(
-        "Lọc theo khoảng thời gian:",
-        value=(min_date, max_date),
-        min_value=min_date,
-        max_value=max_date,
-        format="DD/MM/YYYY"
+    batch = st.sidebar.toggle(
+        "Gom thay đổi bộ lọc", value=True, key="ad_batch_filters",
+        help="Chọn ngày, người chạy, chiến dịch... rồi bấm 'Áp dụng bộ lọc' để tính lại một lần."
     )
-    
-    selected_sheets = st.sidebar.multiselect("Lọc theo người chạy:", options=unique_sheets, default=unique_sheets)
-    selected_campaigns = st.sidebar.multiselect("Lọc theo chiến dịch:", options=unique_campaigns, default=unique_campaigns)
-    
+    with filter_container(st, "ad_filter_form", batch):
+        preset = st.selectbox(
+            "Khoảng thời gian nhanh:", options=[CUSTOM_PRESET, *PRESETS], key="ad_preset",
+            help="Các mốc nhanh với toàn bộ người chạy và chiến dịch được dựng sẵn, hiển thị tức thì."
+        )
+        # Trong form, widget chỉ hiện / ẩn sau khi bấm Áp dụng: luôn hiện ô chọn ngày để có thể
+        # chuyển sang "Tùy chọn" và chọn ngày trong cùng một lần áp dụng
+        if preset == CUSTOM_PRESET or batch:
+            custom_range = st.date_input(
+                "Lọc theo khoảng thời gian:",
+                value=(min_date, max_date),
+                min_value=min_date,
+                max_value=max_date,
+                format="DD/MM/YYYY",
+                help=f"Dùng khi khoảng thời gian nhanh là '{CUSTOM_PRESET}'." if batch else None
+            )
+        if preset == CUSTOM_PRESET:
+            selected_date_range = custom_range
+        else:
+            selected_date_range = preset_range(preset, min_date, max_date)
+            st.caption(f"📅 {selected_date_range[0]:%d/%m/%Y} – {selected_date_range[1]:%d/%m/%Y}")
+
+        selected_sheets = st.multiselect("Lọc theo người chạy:", options=unique_sheets, default=unique_sheets)
+        backend = st.selectbox(
+            "Engine truy vấn:", options=available_backends(), key="ad_backend",
+            index=available_backends().index(default_backend()),
+            help="DuckDB / Polars chỉ xuất hiện khi đã cài đặt thư viện duckdb / polars."
+        )
+        submitted = batch and st.form_submit_button("Áp dụng bộ lọc", type="primary")
+    if batch:
+        # Bộ chọn chiến dịch chạy như một fragment: tìm / chọn chỉ chạy lại phần này, lựa chọn được
+        # đọc từ session_state và áp dụng cùng các bộ lọc khác khi bấm nút
+        st.fragment(render_campaign_picker)(build_campaign_search(data_token, df_pivot), selected_sheets, batch)
+        selected_campaigns = picked_campaigns()
+    else:
+        selected_campaigns = render_campaign_picker(build_campaign_search(data_token, df_pivot), selected_sheets, batch)
+
     # --- Áp dụng bộ lọc ---
+    # Chế độ gom thay đổi: trang dùng bộ lọc đã áp dụng cho tới khi bấm nút, các bước phía sau
+    # (đồ thị tính toán) được dùng lại nguyên vẹn trong lúc người dùng còn đang chọn
+    filters, pending = applied_filters(
+        st, "ad_applied_filters",
+        {"preset": preset, "dates": tuple(selected_date_range), "sheets": selected_sheets,
+         "campaigns": selected_campaigns, "backend": backend},
+        cache_key, batch, submitted
+    )
+    if pending:
+        st.sidebar.caption("✏️ Có thay đổi bộ lọc chưa áp dụng: bấm 'Áp dụng bộ lọc'.")
+    preset, selected_date_range = filters["preset"], filters["dates"]
+    selected_sheets, selected_campaigns, backend = filters["sheets"], filters["campaigns"], filters["backend"]
+    filter_token = (cache_key, is_preview, repr(filters))
+
     if len(selected_date_range) != 2:
         st.warning("Vui lòng chọn đủ ngày bắt đầu và kết thúc.")
         st.stop()
 
     start_date, end_date = selected_date_range
-    
-    df_filtered = df_pivot[
-        (df_pivot['date'].dt.date >= start_date) &
-        (df_pivot['date'].dt.date <= end_date) &
-        (df_pivot['sheet'].isin(selected_sheets)) &
-        (df_pivot['campaign'].isin(selected_campaigns))
-    ]
+
+    # Các bước phía sau được ghi nhớ theo đầu vào: đổi một widget chỉ tính lại những bước phụ thuộc vào nó
+    graph = StageGraph(st, "ad_stage_graph", enabled=not low_memory)
+    graph.source("Dữ liệu", df_pivot, (cache_key, is_preview))
+    df_filtered = graph.stage(
+        "Lọc", lambda: filter_ads(df_pivot, start_date, end_date, selected_sheets, selected_campaigns,
+                                  backend=backend, index=filter_index),
+        deps=["Dữ liệu"], params=(start_date, end_date, selected_sheets, selected_campaigns, backend),
+        hash_output=True
+    )
+    tracker.checkpoint("Lọc")
 
     if df_filtered.empty:
         st.warning("Không có dữ liệu nào phù hợp với bộ lọc của bạn. Vui lòng thử lại.")
         st.stop()
 
+    # ========================== BÁO CÁO DỰNG SẴN (MỐC NHANH) ==========================
+    # Bản xem trước không được dựng / phục vụ báo cáo dựng sẵn
+    snapshot_key = None if is_preview else ad_snapshot_key(data_token, df_pivot)
+    if snapshot_key and ensure_snapshots("ads", snapshot_key, build_ads_snapshot, df_pivot, top_n=DEFAULT_TOP_N):
+        st.sidebar.caption("⏳ Đang dựng sẵn báo cáo cho các mốc thời gian nhanh...")
+    all_selected = set(selected_sheets) == set(unique_sheets) and selected_campaigns is None
+    snapshot = load_snapshot("ads", snapshot_key, preset) if snapshot_key and preset != CUSTOM_PRESET and all_selected else None
+    if snapshot is not None:
+        render_snapshot(st, "ads", snapshot_key, snapshot)
+        tracker.checkpoint("Báo cáo dựng sẵn")
+        render_data_download(df_filtered, low_memory, filter_token)
+        tracker.checkpoint("Bảng & Excel")
+        render_payload_report(st)
+        render_stage_report(st, graph)
+        render_memory_report(st, tracker, memory_budget_mb, low_memory)
+        return
+
     # ========================== KPI TỔNG QUAN (DỰA TRÊN DỮ LIỆU ĐÃ LỌC) ==========================
     st.subheader("KPI Tổng quan (từ dữ liệu đã lọc)")
-    tong_doanh_so = df_filtered['Doanh số'].sum()
-    tong_ngan_sach = df_filtered['Đầu tư ngân sách'].sum()
-    tong_kh_tiem_nang = df_filtered['KH Tiềm Năng (Mess)'].sum()
-    tong_kh_moi = df_filtered['Số Lượng Khách Hàng'].sum()
-    tong_don_hang = tong_kh_moi 
-    roas = tong_doanh_so / tong_ngan_sach if tong_ngan_sach > 0 else 0
-    chi_phi_tren_mess = tong_ngan_sach / tong_kh_tiem_nang if tong_kh_tiem_nang > 0 else 0
-    chi_phi_tren_kh_moi = tong_ngan_sach / tong_kh_moi if tong_kh_moi > 0 else 0
-    ty_le_chuyen_doi = (tong_kh_moi / tong_kh_tiem_nang) * 100 if tong_kh_tiem_nang > 0 else 0
-    gia_tri_tb_don = tong_doanh_so / tong_don_hang if tong_don_hang > 0 else 0
-    giao_dich_tb_moi_kh = tong_don_hang / tong_kh_moi if tong_kh_moi > 0 else 0
-
-    row1_col1, row1_col2, row1_col3, row1_col4, row1_col5 = st.columns(5)
-    row1_col1.metric("Doanh số", f"{tong_doanh_so:,.0f} VNĐ")
-    row1_col2.metric("Đầu tư ngân sách", f"{tong_ngan_sach:,.0f} VNĐ")
-    row1_col3.metric("ROAS", f"{roas:.2f}")
-    row1_col4.metric("KH Tiềm Năng (Mess)", f"{tong_kh_tiem_nang:,.0f}")
-    row1_col5.metric("Chi phí / mess mới", f"{chi_phi_tren_mess:,.0f} VNĐ")
-
-    row2_col1, row2_col2, row2_col3, row2_col4, row2_col5 = st.columns(5)
-    row2_col1.metric("Số Lượng Khách Hàng", f"{tong_kh_moi:,.0f}")
-    row2_col2.metric("Chi phí / KH mới (CAC)", f"{chi_phi_tren_kh_moi:,.0f} VNĐ")
-    row2_col3.metric("Tỷ lệ chuyển đổi", f"{ty_le_chuyen_doi:.2f}%")
-    row2_col4.metric("Giá Trị TB đơn (AOV)", f"{gia_tri_tb_don:,.0f} VNĐ")
-    row2_col5.metric("Số GD TB / KH", f"{giao_dich_tb_moi_kh:.2f}")
+    kpis = graph.stage("KPI", lambda: ads_kpi_totals(df_filtered, backend=backend), deps=["Lọc"], params=(backend,))
+    render_kpi_cards(st, ads_kpi_cards(kpis))
     st.divider()
 
     # ========================== SO SÁNH HIỆU SUẤT ==========================
@@ -246,54 +626,65 @@ def render_campaign_dashboard():
 
     with tab1:
         st.markdown("#### Phân tích tổng quan theo người chạy")
-        df_sheet_sum = df_filtered.groupby('sheet').agg({
-            'Doanh số': 'sum', 'Đầu tư ngân sách': 'sum', 'Số Lượng Khách Hàng': 'sum'
-        }).reset_index()
-        df_sheet_sum['ROAS'] = df_sheet_sum.apply(lambda r: r['Doanh số'] / r['Đầu tư ngân sách'] if r['Đầu tư ngân sách'] > 0 else 0, axis=1)
-        df_sheet_sum['CAC'] = df_sheet_sum.apply(lambda r: r['Đầu tư ngân sách'] / r['Số Lượng Khách Hàng'] if r['Số Lượng Khách Hàng'] > 0 else 0, axis=1)
+        df_sheet_sum = graph.stage("Theo người chạy", lambda: ads_by_sheet(df_filtered, backend=backend),
+                                   deps=["Lọc"], params=(backend,), hash_output=True)
         if not df_sheet_sum.empty:
-            fig_scatter = px.scatter(
-                df_sheet_sum, x='CAC', y='ROAS', size='Doanh số', color='sheet',
-                hover_name='sheet', size_max=50, title='Phân Tích Hiệu Quả Người Chạy (CAC vs. ROAS)',
-                labels={'CAC': 'Chi phí / Khách hàng mới (VNĐ)', 'ROAS': 'Lợi nhuận trên chi tiêu quảng cáo'}
+            fig_scatter, fig_bar = graph.stage(
+                "Biểu đồ người chạy",
+                lambda: (build_runner_scatter(df_sheet_sum), build_runner_bar(df_sheet_sum)),
+                deps=["Theo người chạy"]
             )
-            fig_scatter.add_annotation(text="<b>Góc lý tưởng</b><br>(Chi phí thấp, Lợi nhuận cao)",
-                align='left', showarrow=False, xref='paper', yref='paper', x=0.05, y=0.95)
-            st.plotly_chart(fig_scatter, use_container_width=True)
+            show_chart(st, fig_scatter, use_container_width=True)
             with st.expander("📘 Hướng dẫn đọc biểu đồ Phân Tích Hiệu Quả"):
                 st.write("""...""") # Nội dung hướng dẫn của bạn
-            fig_bar = px.bar(df_sheet_sum, x='sheet', y=['Doanh số', 'Đầu tư ngân sách'], barmode='group',
-                                 title="Tổng Doanh số và Ngân sách theo Người chạy", text_auto=True)
-            st.plotly_chart(fig_bar, use_container_width=True)
+            show_chart(st, fig_bar, use_container_width=True)
         else:
             st.info("Không có dữ liệu của người chạy ads để hiển thị với bộ lọc hiện tại.")
 
     # ========================= TAB 2 - ĐÃ CẬP NHẬT =========================
     with tab2:
         st.markdown("#### Phân tích tổng quan theo chiến dịch")
-        df_camp_sum = df_filtered.groupby(['sheet', 'campaign']).agg({
-            'Doanh số': 'sum', 'Đầu tư ngân sách': 'sum'
-        }).reset_index()
-        df_camp_sum['ROAS'] = df_camp_sum.apply(lambda r: r['Doanh số'] / r['Đầu tư ngân sách'] if r['Đầu tư ngân sách'] > 0 else 0, axis=1)
+        df_camp_sum = graph.stage("Theo chiến dịch", lambda: ads_by_campaign(df_filtered, backend=backend),
+                                  deps=["Lọc"], params=(backend,), hash_output=True)
 
-        # Tách dataframe để xử lý các trường hợp khác nhau
-        df_camp_sum_revenue = df_camp_sum[df_camp_sum['Doanh số'] > 0]
-        df_camp_sum_budget = df_camp_sum[df_camp_sum['Đầu tư ngân sách'] > 0]
+        top_n = st.number_input(
+            "Số chiến dịch hiển thị cho mỗi người chạy (0 = tất cả):",
+            min_value=0, value=DEFAULT_TOP_N, step=5, key="ad_top_n",
+            help=f"Các chiến dịch còn lại được gộp thành ô '{OTHER_LABEL}' để biểu đồ gọn và tải nhanh hơn."
+        )
+
+        # Tách dataframe để xử lý các trường hợp khác nhau, mỗi biểu đồ chỉ giữ top N theo chỉ số của nó
+        def split_top_n():
+            df_revenue, df_rest = top_campaigns_per_sheet(df_camp_sum[df_camp_sum['Doanh số'] > 0], 'Doanh số', top_n)
+            df_budget, _ = top_campaigns_per_sheet(
+                df_camp_sum[df_camp_sum['Đầu tư ngân sách'] > 0], 'Đầu tư ngân sách', top_n)
+            df_bubble, _ = top_campaigns_per_sheet(df_camp_sum, 'Doanh số', top_n)
+            return df_revenue, df_rest, df_budget, df_bubble
+
+        df_camp_sum_revenue, df_rest_revenue, df_camp_sum_budget, df_camp_sum_bubble = graph.stage(
+            "Top N", split_top_n, deps=["Theo chiến dịch"], params=(top_n,), hash_output=True
+        )
 
         if not df_camp_sum.empty:
             # --- Biểu đồ Treemap Doanh số ---
             st.markdown("##### Cơ cấu Doanh số và Hiệu quả ROAS")
             if not df_camp_sum_revenue.empty:
-                fig_treemap = px.treemap(
-                    df_camp_sum_revenue, path=[px.Constant("Tất cả chiến dịch"), 'sheet', 'campaign'],
-                    values='Doanh số', color='ROAS', color_continuous_scale='RdYlGn',
-                    hover_data={'ROAS': ':.2f', 'Đầu tư ngân sách': ':,.0f'},
-                    title='Cơ Cấu Doanh Số & Hiệu Quả ROAS Theo Từng Chiến Dịch'
-                )
-                fig_treemap.update_traces(textinfo='label+value', textfont_size=14)
-                st.plotly_chart(fig_treemap, use_container_width=True)
+                fig_treemap = graph.stage("Treemap doanh số", lambda: build_revenue_treemap(df_camp_sum_revenue),
+                                          deps=["Top N"])
+                show_chart(st, fig_treemap, use_container_width=True)
                 with st.expander("📘 Hướng dẫn đọc biểu đồ Treemap (Doanh số)"):
                     st.write("""Mỗi ô chữ nhật đại diện cho một chiến dịch. Kích thước của ô tương ứng với **Doanh số**. Màu sắc thể hiện **ROAS** (xanh lá = cao, đỏ = thấp).""")
+                if not df_rest_revenue.empty:
+                    # --- Xem chi tiết các chiến dịch đã gộp vào nhóm "Khác" ---
+                    other_label = df_camp_sum_revenue.loc[df_camp_sum_revenue['is_other'], 'campaign'].iloc[0]
+                    with st.expander(f"🔎 Xem chi tiết nhóm '{other_label}'"):
+                        drill_sheet = st.selectbox(
+                            "Người chạy:", options=list(df_rest_revenue['sheet'].unique()), key="ad_other_drilldown"
+                        )
+                        st.dataframe(
+                            df_rest_revenue[df_rest_revenue['sheet'] == drill_sheet],
+                            hide_index=True, use_container_width=True
+                        )
             else:
                 st.info("Không có dữ liệu doanh số để hiển thị treemap.")
             
@@ -302,15 +693,9 @@ def render_campaign_dashboard():
             # --- Biểu đồ Treemap Ngân sách (MỚI) ---
             st.markdown("##### Cơ cấu Phân bổ Ngân sách")
             if not df_camp_sum_budget.empty:
-                fig_treemap_budget = px.treemap(
-                    df_camp_sum_budget, path=[px.Constant("Tất cả chiến dịch"), 'sheet', 'campaign'],
-                    values='Đầu tư ngân sách', color='Đầu tư ngân sách',
-                    color_continuous_scale='Oranges',
-                    hover_data={'ROAS': ':.2f', 'Doanh số': ':,.0f'},
-                    title='Cơ Cấu Phân Bổ Ngân Sách Theo Từng Chiến Dịch'
-                )
-                fig_treemap_budget.update_traces(textinfo='label+value', textfont_size=14)
-                st.plotly_chart(fig_treemap_budget, use_container_width=True)
+                fig_treemap_budget = graph.stage("Treemap ngân sách", lambda: build_budget_treemap(df_camp_sum_budget),
+                                                 deps=["Top N"])
+                show_chart(st, fig_treemap_budget, use_container_width=True)
                 with st.expander("📘 Hướng dẫn đọc biểu đồ Treemap (Ngân sách)"):
                     st.write("""Mỗi ô chữ nhật đại diện cho một chiến dịch. Kích thước và màu sắc của ô tương ứng với **Ngân sách đã đầu tư** (càng lớn/đậm là càng nhiều).""")
             else:
@@ -320,11 +705,9 @@ def render_campaign_dashboard():
 
             # --- Biểu đồ Bubble chart ---
             st.markdown("##### Phân nhóm hiệu suất chiến dịch")
-            fig_bubble = px.scatter(
-                df_camp_sum, x='Đầu tư ngân sách', y='Doanh số', size='ROAS',
-                color='sheet', hover_name='campaign', title="Phân Nhóm Hiệu Suất Chiến Dịch", size_max=60
-            )
-            st.plotly_chart(fig_bubble, use_container_width=True)
+            fig_bubble = graph.stage("Bubble chiến dịch", lambda: build_campaign_bubble(df_camp_sum_bubble),
+                                     deps=["Top N"])
+            show_chart(st, fig_bubble, use_container_width=True)
         else:
             st.info("Không có dữ liệu chiến dịch để hiển thị với bộ lọc hiện tại.")
 
@@ -332,37 +715,40 @@ def render_campaign_dashboard():
     # ========================== PHÂN TÍCH XU HƯỚNG ==========================
     st.subheader("Phân tích Xu hướng theo thời gian")
     if not df_filtered.empty:
-        df_trend = df_filtered.groupby('date').agg({
-            'Doanh số': 'sum', 'Đầu tư ngân sách': 'sum'
-        }).reset_index()
-        df_trend['ROAS'] = df_trend.apply(lambda r: r['Doanh số'] / r['Đầu tư ngân sách'] if r['Đầu tư ngân sách'] > 0 else 0, axis=1)
-        df_trend = df_trend.sort_values('date')
+        granularity = st.selectbox(
+            "Độ chi tiết thời gian:", options=[AUTO, *AD_TREND_LEVELS], key="ad_granularity",
+            help="'Tự động' chọn mức chi tiết nhất mà biểu đồ vẫn gọn với khoảng thời gian đã chọn."
+        )
+        level = resolve_level(granularity, start_date, end_date, AD_TREND_LEVELS)
+        if granularity == AUTO:
+            st.caption(f"Đang hiển thị theo: {level}")
+        # Chế độ tiết kiệm bộ nhớ không giữ bảng tổng hợp sẵn: gộp trực tiếp từ dữ liệu đã lọc
+        df_trend = graph.stage(
+            "Xu hướng",
+            lambda: ads_by_period(ads_rollups(df_filtered) if low_memory else build_ad_rollups(data_token, df_pivot),
+                                  level, start_date, end_date, selected_sheets, selected_campaigns),
+            deps=["Lọc"], params=(level,), hash_output=True
+        )
         st.markdown("##### Xu hướng Doanh số, Ngân sách và ROAS")
-        fig_trend = make_subplots(specs=[[{"secondary_y": True}]])
-        fig_trend.add_trace(go.Bar(x=df_trend['date'], y=df_trend['Đầu tư ngân sách'], name='Ngân sách', marker_color='lightsalmon'), secondary_y=False)
-        fig_trend.add_trace(go.Scatter(x=df_trend['date'], y=df_trend['Doanh số'], name='Doanh số', mode='lines+markers', line=dict(color='royalblue', width=3)), secondary_y=False)
-        fig_trend.add_trace(go.Scatter(x=df_trend['date'], y=df_trend['ROAS'], name='ROAS', mode='lines', line=dict(color='lightgreen', dash='dot')), secondary_y=True)
-        fig_trend.update_layout(title_text='Xu Hướng Tổng Thể Theo Thời Gian', legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
-        fig_trend.update_xaxes(title_text="Ngày")
-        fig_trend.update_yaxes(title_text="<b>Số tiền (VNĐ)</b>", secondary_y=False)
-        fig_trend.update_yaxes(title_text="<b>ROAS</b>", secondary_y=True)
-        st.plotly_chart(fig_trend, use_container_width=True)
+        fig_trend = graph.stage("Biểu đồ xu hướng", lambda: build_ads_trend_chart(df_trend, level),
+                                deps=["Xu hướng"], params=(level,))
+        show_chart(st, fig_trend, use_container_width=True)
         with st.expander("📘 Hướng dẫn đọc biểu đồ Xu Hướng"):
             st.write("""...""") # Nội dung hướng dẫn của bạn
+        render_rolling_kpis(graph, df_pivot, filter_index, start_date, end_date,
+                            selected_sheets, selected_campaigns, backend, level)
     else:
         st.info("Không có dữ liệu xu hướng để hiển thị với bộ lọc hiện tại.")
 
 
+    tracker.checkpoint("KPI & biểu đồ")
+
     # ========================== TẢI XUỐNG DỮ LIỆU ==========================
-    st.subheader("Bảng Dữ liệu chi tiết (đã lọc)")
-    st.dataframe(df_filtered)
-    excel_data = to_excel(df_filtered)
-    st.download_button(
-        label="📥 Tải xuống dữ liệu đã lọc (.xlsx)",
-        data=excel_data,
-        file_name="filtered_ad_campaign_data.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
+    render_data_download(df_filtered, low_memory, filter_token)
+    tracker.checkpoint("Bảng & Excel")
+    render_payload_report(st)
+    render_stage_report(st, graph)
+    render_memory_report(st, tracker, memory_budget_mb, low_memory)
 
 # Chạy hàm render chính
 if __name__ == "__main__":
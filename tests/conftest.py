@@ -0,0 +1,67 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils import gsheets
+
+
+class _QuietServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        pass  # client đã bỏ kết nối (vd: test timeout): không in traceback
+
+
+class SheetStub:
+    """
+    HTTP server cục bộ giả lập Google Sheets. `routes`: {đường dẫn kèm query: danh sách phản hồi
+    (status, body bytes) hoặc (status, body, số giây chờ trước khi trả lời)}; mỗi lần gọi lấy phản
+    hồi kế tiếp, phản hồi cuối được lặp lại.
+    `requests` ghi lại các đường dẫn đã được gọi.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests.append(self.path)
+                responses = stub.routes.get(self.path)
+                if not responses:
+                    status, body, delay = 404, b"", 0
+                else:
+                    status, body, *rest = responses.pop(0) if len(responses) > 1 else responses[0]
+                    delay = rest[0] if rest else 0
+                if delay:
+                    time.sleep(delay)
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = _QuietServer(("127.0.0.1", 0), Handler)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    def sheet_url(self, sheet_id):
+        return f"{self.base}/spreadsheets/d/{sheet_id}/edit?usp=sharing"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def sheet_stub(monkeypatch):
+    # Không chờ giữa các lần thử lại; session và cache danh sách sheet được tạo mới cho mỗi test
+    monkeypatch.setattr(gsheets, "RETRY_BACKOFF", 0)
+    monkeypatch.setattr(gsheets, "_session", None)
+    monkeypatch.setattr(gsheets, "_sheet_list_cache", {})
+    stub = SheetStub()
+    yield stub
+    stub.close()
@@ -0,0 +1,114 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_ads_sheet
+from utils.api import ApiError, KpiService, etag_matches, make_handler
+from utils.data_processing import extract_camp_blocks
+from utils.datasets import AD_PIVOT_INDEX, normalize_ads_pivot
+from utils.filter_index import FilterIndex
+from utils.reshape import pivot_wide
+
+
+@pytest.fixture(scope="module")
+def ads():
+    frames = [extract_camp_blocks(make_ads_sheet(n_campaigns=4, n_days=30, seed=i)).assign(sheet=f"runner_{i}")
+              for i in range(2)]
+    df_long = pd.concat(frames, ignore_index=True)
+    return normalize_ads_pivot(pivot_wide(df_long, AD_PIVOT_INDEX, 'criteria', 'value', 'first'))
+
+
+@pytest.fixture
+def service(ads):
+    service = KpiService()
+    index = FilterIndex(ads, dims=['sheet', 'campaign'], date_col='date')
+    service.datasets["ads"] = (ads, index, "v1", time.time())
+    return service
+
+
+def test_query_is_cached_by_path_normalised_params_and_version(service, ads):
+    params = {"start": "2024-01-05", "end": "2024-01-20", "sheet": "runner_0"}
+    etag, body = service.query("/ads/kpis", params)
+    result = json.loads(body)
+    assert result["version"] == "v1" and result["start"] == "2024-01-05"
+    assert etag.startswith('"') and etag.endswith('"')
+
+    # Cùng tham số theo thứ tự khác: dùng lại kết quả đã ghi nhớ
+    assert service.query("/ads/kpis", dict(reversed(list(params.items())))) == (etag, body)
+    assert service.stats == {"hits": 1, "misses": 1, "not_modified": 0}
+
+    service.query("/ads/kpis", {**params, "sheet": "runner_1"})
+    assert service.stats["misses"] == 2
+
+    # Dữ liệu nạp lại (phiên bản mới) thì kết quả cũ không còn được dùng
+    service.datasets["ads"] = service.datasets["ads"][:2] + ("v2", time.time())
+    etag_v2, body_v2 = service.query("/ads/kpis", params)
+    assert service.stats["misses"] == 3
+    assert json.loads(body_v2)["version"] == "v2" and etag_v2 != etag
+
+
+@pytest.mark.parametrize("params", [{"start": "05/01/2024"}, {"end": "2024-13-01"}])
+def test_bad_date_is_a_400(service, params):
+    with pytest.raises(ApiError) as e:
+        service.query("/ads/kpis", params)
+    assert e.value.status == 400
+
+
+def test_unknown_path_and_missing_dataset(service):
+    with pytest.raises(ApiError) as e:
+        service.query("/ads/nope", {})
+    assert e.value.status == 404
+    with pytest.raises(ApiError) as e:
+        service.query("/social/kpis", {})
+    assert e.value.status == 503
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ('"abc"', True),
+    ('"xyz", "abc"', True),
+    ('"xyz","abc"', True),
+    ('W/"abc"', True),
+    ("*", True),
+    ('"ab"', False),
+    ('"abcd"', False),
+    ('"xyz", "abcd"', False),
+])
+def test_etag_matches(header, expected):
+    assert etag_matches(header, '"abc"') is expected
+
+
+@pytest.fixture
+def api(service):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(service))
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _get(url, if_none_match=None):
+    request = urllib.request.Request(url, headers={"If-None-Match": if_none_match} if if_none_match else {})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, response.headers.get("ETag"), response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers.get("ETag"), e.read()
+
+
+def test_http_etag_round_trip(api, service):
+    status, etag, body = _get(f"{api}/ads/by-sheet?start=2024-01-01")
+    assert status == 200 and json.loads(body)["data"]
+    assert _get(f"{api}/ads/by-sheet?start=2024-01-01", f'"other", {etag}')[:2] == (304, etag)
+    assert _get(f"{api}/ads/by-sheet?start=2024-01-01", etag[:-2] + '"')[0] == 200
+    assert service.stats["not_modified"] == 1
+
+    status, _, body = _get(f"{api}/ads/kpis?start=bad")
+    assert status == 400 and "error" in json.loads(body)
+    assert json.loads(_get(f"{api}/health")[2]) == {"status": "ok", "datasets": ["ads"]}
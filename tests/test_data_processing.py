@@ -0,0 +1,168 @@
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import data_processing
+from utils.data_processing import date_range_mask, extract_camp_blocks, extract_social_data, header_dates
+from utils.reshape import pivot_wide
+
+DAY = datetime(2024, 3, 1)
+
+
+def _ads_sheet(first_cell):
+    """Hai block trùng tên chiến dịch và ngày: block đầu có ô `first_cell`, block sau ô 5.000."""
+    return pd.DataFrame([
+        ["camp", "Camp A", DAY, "Tổng"],
+        [None, "Doanh số", first_cell, None],
+        [None, None, None, None],
+        ["camp", "Camp A", DAY, "Tổng"],
+        [None, "Doanh số", "5.000", None],
+    ])
+
+
+def _first_value(first_cell):
+    df = extract_camp_blocks(_ads_sheet(first_cell))
+    wide = pivot_wide(df, ["campaign", "date"], "criteria", "value")
+    return df, wide.loc[0, "Doanh số"]
+
+
+def test_unparsed_cell_counts_as_zero_and_keeps_first_position():
+    df, value = _first_value("không rõ")
+    assert df.attrs["unparsed_cells"] == 1
+    assert value == 0
+
+
+def test_blank_cell_counts_as_zero():
+    df, value = _first_value(None)
+    assert df.attrs["unparsed_cells"] == 0
+    assert value == 0
+
+
+def test_parsed_cell_wins_over_later_duplicate():
+    _, value = _first_value("1.200")
+    assert value == 1200
+
+
+def test_date_range_mask_bounds_are_inclusive_and_keep_unreadable_dates():
+    dates = np.array(["2024-02-29", "2024-03-01", "2024-03-05", "2024-03-06", "NaT"], dtype="datetime64[D]")
+    window = (date(2024, 3, 1), date(2024, 3, 5))
+    assert date_range_mask(dates, window).tolist() == [False, True, True, False, True]
+    assert date_range_mask(dates, (None, date(2024, 3, 1))).tolist() == [True, True, False, False, True]
+    assert date_range_mask(dates, (date(2024, 3, 5), None)).tolist() == [False, False, True, True, True]
+
+
+def _camp_sheet():
+    """Hai block, nhãn ngày vừa là datetime vừa là chuỗi dd/mm/yyyy, kèm một nhãn không phải ngày."""
+    labels = [datetime(2024, 2, 28), "29/02/2024", datetime(2024, 3, 1), "02/03/2024", "ghi chú", "Tổng"]
+    return pd.DataFrame([
+        ["camp", "Camp A", *labels],
+        [None, "Doanh số", "1.000", "2.000", "3.000", "4.000", "5.000", "15.000"],
+        [None, "Chi phí", 10, 20, 30, 40, 50, 150],
+        ["camp", "Camp B", *labels[:4], None, None],
+        [None, "Doanh số", "7", "8", "9", "10", None, None],
+    ])
+
+
+@pytest.mark.parametrize("window", [
+    (date(2024, 2, 29), date(2024, 3, 1)),
+    (None, date(2024, 2, 28)),
+    (date(2024, 3, 2), None),
+    (date(2025, 1, 1), None),
+])
+def test_camp_date_range_matches_filtering_after_extraction(window):
+    full = extract_camp_blocks(_camp_sheet())
+    expected = full[date_range_mask(header_dates(tuple(full["date"])), window)].reset_index(drop=True)
+    pushed = extract_camp_blocks(_camp_sheet(), date_range=window)
+    # Cột nhãn ngày thô được suy ra str hoặc object tùy các nhãn còn lại;
+    # bước chuẩn hóa luôn đọc lại bằng to_datetime nên chỉ so sánh giá trị
+    pd.testing.assert_frame_equal(pushed.reset_index(drop=True).astype({"date": object}),
+                                  expected.astype({"date": object}))
+    # Cột "ghi chú" không đọc được ngày luôn được giữ lại
+    assert "ghi chú" in set(pushed["date"])
+
+
+def _social_sheet():
+    """Một kênh FB, ba cột tuần và một cột tháng (không có ngày bắt đầu)."""
+    return pd.DataFrame([
+        ["FB", "Fanpage A", None, None, None, None, None],
+        [None, None, "Chỉ số", "26/02 - 03/03", "04/03 - 10/03", "11/03 - 17/03", "Tháng 3"],
+        [None, None, "Views", "1.000", "2.000", "3.000", "6.000"],
+        [None, None, "Reach", 10, 20, 30, 60],
+    ])
+
+
+def _social(window=None):
+    return extract_social_data(_social_sheet(), ["FB"], {"Views": "Lượt xem"}, date_range=window)
+
+
+def test_social_date_range_matches_filtering_after_extraction():
+    full = _social()
+    starts = full["Ngày Bắt Đầu"]
+    year = starts.dropna().iloc[0].year
+    for window in [(date(year, 3, 4), date(year, 3, 11)), (None, date(year, 2, 26)), (date(year, 3, 11), None)]:
+        keep = date_range_mask(pd.to_datetime(starts).to_numpy("datetime64[D]"), window)
+        expected = full[keep].reset_index(drop=True)
+        pushed = _social(window)
+        pd.testing.assert_frame_equal(pushed.reset_index(drop=True), expected)
+        assert "Tháng 3" in set(pushed["Mốc thời gian"])
+
+
+def test_social_date_range_bounds_are_inclusive():
+    year = _social()["Ngày Bắt Đầu"].dropna().iloc[0].year
+    pushed = _social((date(year, 3, 4), date(year, 3, 4)))
+    assert sorted(set(pushed["Mốc thời gian"])) == ["04/03 - 10/03", "Tháng 3"]
+
+
+@pytest.fixture
+def layout_cache():
+    data_processing.clear_layout_cache()
+    yield data_processing.layout_cache_stats
+    data_processing.clear_layout_cache()
+
+
+def _fresh(extract, sheet):
+    data_processing.clear_layout_cache()
+    return extract(sheet)
+
+
+@pytest.mark.parametrize("make_sheet, extract", [
+    (_camp_sheet, extract_camp_blocks),
+    (_social_sheet, lambda sheet: extract_social_data(sheet, ["FB"], {})),
+])
+def test_layout_cache_reuses_layout_for_same_template(layout_cache, make_sheet, extract):
+    first = extract(make_sheet())
+    again = extract(make_sheet())
+    assert layout_cache()["hits"] == 1 and layout_cache()["misses"] == 1
+    pd.testing.assert_frame_equal(again, first)
+
+
+def test_camp_layout_cache_hit_skips_per_block_header_scan(layout_cache, monkeypatch):
+    extract_camp_blocks(_camp_sheet())
+    monkeypatch.setattr(data_processing, "_camp_header_positions", lambda grid, i: pytest.fail("dò lại header"))
+    extract_camp_blocks(_camp_sheet())
+    assert layout_cache()["hits"] == 1
+
+
+def test_camp_layout_cache_detects_moved_header_cell(layout_cache):
+    extract_camp_blocks(_camp_sheet())
+    sheet = _camp_sheet()
+    # Cùng kích thước và cột nhãn (cùng khóa cache) nhưng block B có thêm một cột ngày
+    sheet.iloc[3, 6] = "ghi chú"
+    sheet.iloc[4, 6] = "11"
+    out = extract_camp_blocks(sheet)
+    assert layout_cache()["misses"] == 2
+    pd.testing.assert_frame_equal(out, _fresh(extract_camp_blocks, sheet))
+    assert len(out[out["campaign"] == "Camp B"]) == 5
+
+
+def test_social_layout_cache_detects_changed_time_columns(layout_cache):
+    extract = lambda sheet: extract_social_data(sheet, ["FB"], {})
+    extract(_social_sheet())
+    sheet = _social_sheet()
+    sheet.iloc[1, 6] = None
+    out = extract(sheet)
+    assert layout_cache()["misses"] == 2
+    pd.testing.assert_frame_equal(out, _fresh(extract, sheet))
+    assert "Tháng 3" not in set(out["Mốc thời gian"])
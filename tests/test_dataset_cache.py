@@ -0,0 +1,72 @@
+import os
+
+import pandas as pd
+import pytest
+
+from utils import dataset_cache
+
+pytestmark = pytest.mark.skipif(not dataset_cache.available(), reason="chưa cài pyarrow")
+
+
+@pytest.fixture
+def cache_root(tmp_path, monkeypatch):
+    monkeypatch.setenv(dataset_cache.DATASET_CACHE_DIR_ENV_VAR, str(tmp_path))
+    monkeypatch.setattr(dataset_cache, "_memory", type(dataset_cache._memory)())
+    return tmp_path
+
+
+def _wide(n=3, name="criteria"):
+    df = pd.DataFrame({"campaign": [f"c{i}" for i in range(n)], "Doanh số": [float(i) for i in range(n)]})
+    df.columns.name = name
+    return df
+
+
+def _age(page, key, version, seconds):
+    path = dataset_cache._path(page, key, version)
+    t = os.path.getmtime(path) - seconds
+    os.utime(path, (t, t))
+
+
+@pytest.mark.parametrize("use_memory", [True, False])
+def test_store_then_load_round_trips_with_column_axis_name(cache_root, use_memory):
+    df = _wide(name="Chỉ số chuẩn")
+    dataset_cache.store_dataset("social", "k", 1, df, use_memory=use_memory)
+    loaded = dataset_cache.load_dataset("social", "k", 1, use_memory=use_memory)
+    pd.testing.assert_frame_equal(loaded, df)
+    assert loaded.columns.name == "Chỉ số chuẩn"
+    assert not loaded.attrs
+    assert not df.attrs  # bảng gốc không bị sửa
+
+
+def test_missing_entry_loads_none(cache_root):
+    assert dataset_cache.load_dataset("ads", "nope", 1) is None
+
+
+def test_schema_version_change_drops_old_entries(cache_root):
+    dataset_cache.store_dataset("ads", "k", 1, _wide(), use_memory=False)
+    dataset_cache.store_dataset("ads", "k", 2, _wide(), use_memory=False)
+    assert not (cache_root / "v1").exists()
+    assert dataset_cache.load_dataset("ads", "k", 1) is None
+    assert dataset_cache.load_dataset("ads", "k", 2) is not None
+
+
+def test_prune_removes_least_recently_used_over_limit(cache_root):
+    for i, key in enumerate(["old", "used", "new"]):
+        dataset_cache.store_dataset("ads", key, 1, _wide(), use_memory=False)
+        _age("ads", key, 1, 100 - i)
+    dataset_cache.load_dataset("ads", "used", 1, use_memory=False)  # đọc lại: thành mới dùng nhất
+    size = os.path.getsize(dataset_cache._path("ads", "new", 1))
+    dataset_cache.prune(1, limit_bytes=2 * size)
+    assert sorted(os.listdir(cache_root / "v1" / "ads")) == ["new.parquet", "used.parquet"]
+
+
+def test_prune_evicts_pruned_entries_from_memory(cache_root):
+    dataset_cache.store_dataset("ads", "k", 1, _wide())
+    dataset_cache.prune(1, limit_bytes=0)
+    assert dataset_cache.load_dataset("ads", "k", 1) is None
+
+
+def test_dataset_key_depends_on_parts_order_and_params():
+    assert dataset_cache.dataset_key(["a", "b"], 1) == dataset_cache.dataset_key(["a", "b"], 1)
+    assert dataset_cache.dataset_key(["a", "b"], 1) != dataset_cache.dataset_key(["b", "a"], 1)
+    assert dataset_cache.dataset_key(["a", "b"], 1) != dataset_cache.dataset_key(["a", "b"], 2)
@@ -0,0 +1,47 @@
+import os
+import threading
+import time
+
+import pandas as pd
+
+from utils import executor
+
+
+def _pid(df):
+    return os.getpid(), len(df)
+
+
+def _slow_or_pid(delay):
+    time.sleep(delay)
+    return os.getpid()
+
+
+def test_jobs_cancelled_by_discarded_pool_run_inline(monkeypatch):
+    monkeypatch.setenv(executor.WORKERS_ENV_VAR, "1")
+    executor.run_job(sum, [0])  # khởi động pool
+    slow = {}
+    caller = threading.Thread(target=lambda: slow.update(r=executor.run_jobs([(_slow_or_pid, (5,), {})], timeout=1)))
+    caller.start()
+    time.sleep(0.2)
+    # Job của lần gọi khác xếp hàng sau job chậm; khi pool bị bỏ chúng bị hủy và phải chạy lại trực tiếp
+    results = executor.run_jobs([(_slow_or_pid, (0,), {})] * 6, timeout=30)
+    caller.join()
+    assert isinstance(slow["r"][0], executor.JobTimeout)
+    assert results == [os.getpid()] * 6
+
+
+def test_frame_job_below_threshold_runs_inline(monkeypatch):
+    monkeypatch.setenv(executor.POOL_MIN_ROWS_ENV_VAR, "100")
+    assert executor.run_frame_job(_pid, pd.DataFrame({"a": range(99)})) == (os.getpid(), 99)
+
+
+def test_frame_job_at_threshold_uses_pool(monkeypatch):
+    monkeypatch.setenv(executor.POOL_MIN_ROWS_ENV_VAR, "100")
+    monkeypatch.setenv(executor.WORKERS_ENV_VAR, "1")
+    pid, n_rows = executor.run_frame_job(_pid, pd.DataFrame({"a": range(100)}))
+    assert n_rows == 100 and pid != os.getpid()
+
+
+def test_pool_min_rows_falls_back_to_default(monkeypatch):
+    monkeypatch.setenv(executor.POOL_MIN_ROWS_ENV_VAR, "nhiều")
+    assert executor.pool_min_rows() == executor.DEFAULT_POOL_MIN_ROWS
@@ -0,0 +1,70 @@
+import pytest
+import requests
+
+from utils import gsheets
+from utils.gsheets import GoogleSheetSource, list_worksheets
+
+HTMLVIEW_JS = b'''<script>
+items.push({name: "Duy Anh", pageUrl: "x", gid: "0"});
+items.push({name: "Minh \\u0026 Co", pageUrl: "x", gid: "1523"});
+</script>'''
+HTMLVIEW_BUTTONS = b'''<ul>
+<li id="sheet-button-0"><a href="#">Social</a></li>
+<li id="sheet-button-77"><a href="#"><b>Ads &amp; Co</b></a></li>
+</ul>'''
+
+
+def _csv_path(sheet_id, gid):
+    return f"/spreadsheets/d/{sheet_id}/export?format=csv&gid={gid}"
+
+
+def test_list_worksheets_from_js_items(sheet_stub):
+    sheet_stub.routes["/spreadsheets/d/ABC/htmlview"] = [(200, HTMLVIEW_JS)]
+    assert list_worksheets(sheet_stub.sheet_url("ABC")) == [("Duy Anh", "0"), ("Minh & Co", "1523")]
+
+
+def test_list_worksheets_from_sheet_buttons(sheet_stub):
+    sheet_stub.routes["/spreadsheets/d/ABC/htmlview"] = [(200, HTMLVIEW_BUTTONS)]
+    assert list_worksheets(sheet_stub.sheet_url("ABC")) == [("Social", "0"), ("Ads & Co", "77")]
+
+
+def test_list_worksheets_is_cached(sheet_stub):
+    sheet_stub.routes["/spreadsheets/d/ABC/htmlview"] = [(200, HTMLVIEW_JS)]
+    list_worksheets(sheet_stub.sheet_url("ABC"))
+    list_worksheets(sheet_stub.sheet_url("ABC"))
+    assert sheet_stub.requests.count("/spreadsheets/d/ABC/htmlview") == 1
+
+
+def test_list_worksheets_without_sheets_raises(sheet_stub):
+    sheet_stub.routes["/spreadsheets/d/ABC/htmlview"] = [(200, b"<html>Sign in</html>")]
+    with pytest.raises(ValueError):
+        list_worksheets(sheet_stub.sheet_url("ABC"))
+
+
+def test_source_fetches_only_requested_sheets_by_gid(sheet_stub):
+    sheet_stub.routes["/spreadsheets/d/ABC/htmlview"] = [(200, HTMLVIEW_JS)]
+    sheet_stub.routes[_csv_path("ABC", 0)] = [(200, b"camp,A\n,Doanh so\n")]
+    sheet_stub.routes[_csv_path("ABC", 1523)] = [(200, b"camp,B\n")]
+    source = GoogleSheetSource(sheet_stub.sheet_url("ABC"))
+    assert source.sheet_names == ["Duy Anh", "Minh & Co"]
+
+    source.prefetch(["Duy Anh"])
+    df = source.parse("Duy Anh")
+    assert df.iloc[0].tolist() == ["camp", "A"]
+    assert _csv_path("ABC", 1523) not in sheet_stub.requests
+    source.parse("Duy Anh")
+    assert sheet_stub.requests.count(_csv_path("ABC", 0)) == 1
+
+
+def test_fetch_retries_server_errors(sheet_stub):
+    sheet_stub.routes[_csv_path("ABC", 0)] = [(503, b""), (500, b""), (200, b"a,b\n1,2\n")]
+    df = gsheets.fetch_worksheet(sheet_stub.sheet_url("ABC"), "0")
+    assert df.shape == (2, 2)
+    assert sheet_stub.requests.count(_csv_path("ABC", 0)) == 3
+
+
+def test_fetch_gives_up_after_max_retries(sheet_stub):
+    sheet_stub.routes[_csv_path("ABC", 0)] = [(500, b"")]
+    with pytest.raises(requests.RequestException):
+        gsheets.fetch_worksheet(sheet_stub.sheet_url("ABC"), "0")
+    assert sheet_stub.requests.count(_csv_path("ABC", 0)) == gsheets.MAX_RETRIES + 1
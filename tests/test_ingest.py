@@ -0,0 +1,32 @@
+import time
+
+from utils.ingest import fetch_all
+
+
+def test_fetch_all_keeps_order_and_returns_errors():
+    def fn(x):
+        if x == 2:
+            raise ValueError("hỏng")
+        return x * 10
+
+    results = fetch_all(fn, [1, 2, 3])
+    assert results[0] == 10 and results[2] == 30
+    assert isinstance(results[1], ValueError)
+
+
+def test_fetch_all_does_not_wait_for_stuck_source():
+    def fn(x):
+        if x == "treo":
+            time.sleep(3)
+        return x
+
+    start = time.monotonic()
+    results = fetch_all(fn, ["a", "treo", "b"], timeout=0.5)
+    assert time.monotonic() - start < 2
+    assert results[0] == "a" and results[2] == "b"
+    assert isinstance(results[1], TimeoutError)
+
+
+def test_fetch_all_times_out_a_single_source():
+    results = fetch_all(lambda x: time.sleep(3), ["treo"], timeout=0.3)
+    assert isinstance(results[0], TimeoutError)
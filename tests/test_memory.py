@@ -0,0 +1,28 @@
+import tracemalloc
+
+import pytest
+
+from utils import memory
+
+
+@pytest.fixture(autouse=True)
+def stop_tracing():
+    yield
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def test_tracemalloc_needs_server_opt_in(monkeypatch):
+    monkeypatch.delenv(memory.TRACEMALLOC_ENV_VAR, raising=False)
+    tracker = memory.MemoryTracker(use_tracemalloc=True)
+    assert not tracker.use_tracemalloc and not tracemalloc.is_tracing()
+
+
+def test_other_sessions_do_not_stop_tracing(monkeypatch):
+    monkeypatch.setenv(memory.TRACEMALLOC_ENV_VAR, "1")
+    tracing = memory.MemoryTracker(use_tracemalloc=True)
+    plain = memory.MemoryTracker(use_tracemalloc=False)
+    assert tracing.use_tracemalloc and not plain.use_tracemalloc
+    assert tracemalloc.is_tracing()
+    tracing.checkpoint("bước")
+    assert "Python đỉnh (MB)" in tracing.stages[0]
@@ -0,0 +1,71 @@
+"""Bảng ca kiểm thử cho `parse_vn_numbers` (định dạng số kiểu Việt Nam)."""
+import math
+
+import numpy as np
+import pytest
+
+from utils.numeric import parse_vn_numbers
+
+
+@pytest.mark.parametrize("raw, expected", [
+    # Dấu chấm phân cách hàng nghìn
+    ("1.234", 1234.0),
+    ("1.234.567", 1234567.0),
+    ("-2.500", -2500.0),
+    # Dấu chấm là dấu thập phân khi không có dạng nhóm nghìn
+    ("12.5", 12.5),
+    ("1.2345", 1.2345),
+    # Dấu phẩy thập phân
+    ("12,5", 12.5),
+    ("1.234,5", 1234.5),
+    ("1,234,567", 1234567.0),
+    ("1,234.5", 1234.5),
+    # Phần trăm
+    ("12,5%", 0.125),
+    ("100%", 1.0),
+    # Hậu tố tiền tệ và khoảng trắng (kể cả NBSP)
+    ("3.000.000 đ", 3000000.0),
+    ("3.000.000đ", 3000000.0),
+    ("1.500 VNĐ", 1500.0),
+    ("2.000 vnd", 2000.0),
+    ("5.000₫", 5000.0),
+    ("1 234 567", 1234567.0),
+    # Số âm trong ngoặc
+    ("(1.200)", -1200.0),
+    ("(1.200 đ)", -1200.0),
+    ("(12,5%)", -0.125),
+    # Giá trị đã là số
+    (42, 42.0),
+    (3.5, 3.5),
+])
+def test_parses_vietnamese_formats(raw, expected):
+    values, unparsed = parse_vn_numbers([raw])
+    assert values[0] == pytest.approx(expected)
+    assert unparsed == 0
+
+
+@pytest.mark.parametrize("raw", [None, np.nan, "", "   "])
+def test_empty_cells_are_nan_without_counting_as_errors(raw):
+    values, unparsed = parse_vn_numbers([raw])
+    assert math.isnan(values[0])
+    assert unparsed == 0
+
+
+@pytest.mark.parametrize("raw", ["abc", "1.2.3,4,5", "N/A", "12,5 usd"])
+def test_text_that_is_not_a_number_is_counted_as_unparsed(raw):
+    values, unparsed = parse_vn_numbers([raw])
+    assert math.isnan(values[0])
+    assert unparsed == 1
+
+
+def test_mixed_column_counts_only_unparsed_cells():
+    values, unparsed = parse_vn_numbers(["1.000", None, "abc", 7, "", "-", "12,5%"])
+    np.testing.assert_allclose(values, [1000, np.nan, np.nan, 7, np.nan, np.nan, 0.125])
+    assert values.dtype == np.float64
+    assert unparsed == 2
+
+
+def test_empty_input():
+    values, unparsed = parse_vn_numbers([])
+    assert values.shape == (0,) and values.dtype == np.float64
+    assert unparsed == 0
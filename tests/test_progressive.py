@@ -0,0 +1,43 @@
+import threading
+import time
+from concurrent.futures import CancelledError
+
+from utils import executor
+from utils.progressive import BackgroundLoad
+
+
+def _sleep(delay):
+    time.sleep(delay)
+    return delay
+
+
+def _wait(load, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not load.is_done() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert load.is_done()
+
+
+def test_cancel_drops_job_still_queued_in_pool(monkeypatch):
+    monkeypatch.setenv(executor.WORKERS_ENV_VAR, "1")
+    executor.run_job(sum, [0])  # khởi động pool
+    # Một tiến trình: một job đang chạy, hai job đã nằm trong hàng đợi gọi (không hủy được nữa)
+    busy = {}
+    caller = threading.Thread(target=lambda: busy.update(r=executor.run_jobs([(_sleep, (0.5,), {})] * 3)))
+    caller.start()
+    time.sleep(0.2)
+    # Job của lần nạp sau còn chờ trong pool nên hủy được, không chạy lại trực tiếp
+    stale = BackgroundLoad("stale", [(_sleep, (0,), {})])
+    time.sleep(0.2)
+    stale.cancel()
+    _wait(stale)
+    caller.join()
+    assert isinstance(stale.results[0], CancelledError)
+    assert busy["r"] == [0.5] * 3
+
+
+def test_cancel_before_start_skips_jobs():
+    load = BackgroundLoad("t", [])
+    load.cancel()
+    _wait(load)
+    assert load.fraction == 1.0
@@ -0,0 +1,147 @@
+"""
+Các engine truy vấn (duckdb / polars) phải cho cùng kết quả với pandas trên bảng wide đi qua
+đúng luồng của dashboard: sheet thô -> trích xuất -> pivot -> chuẩn hóa. Cuối file là các ca
+riêng cho việc gộp top N chiến dịch mỗi người chạy.
+"""
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_ads_sheet, make_social_sheet
+from utils import polars_engine, query_engine as qe
+from utils.data_processing import extract_camp_blocks, extract_social_data
+from utils.datasets import (
+    AD_PIVOT_INDEX, CONTENT_METRICS, DEFAULT_KEY_CELLS, METRIC_MAPPING, SOCIAL_PIVOT_COLS,
+    normalize_ads_pivot, normalize_social_wide
+)
+from utils.reshape import pivot_wide
+
+BACKENDS = [b for b in qe.available_backends() if b != qe.BACKEND_PANDAS]
+START, END = date(2024, 2, 1), date(2024, 3, 15)
+
+
+ADS_PIVOT = dict(index=AD_PIVOT_INDEX, columns='criteria', values='value', aggfunc='first')
+SOCIAL_PIVOT = dict(index=SOCIAL_PIVOT_COLS, columns='Chỉ số chuẩn', values='Giá trị', aggfunc='sum')
+
+
+@pytest.fixture(scope="module")
+def ads_long():
+    frames = []
+    for i, sheet in enumerate(["runner_a", "runner_b", "runner_c"]):
+        frames.append(extract_camp_blocks(make_ads_sheet(n_campaigns=8, n_days=90, seed=i)).assign(sheet=sheet))
+    return pd.concat(frames, ignore_index=True)
+
+
+@pytest.fixture(scope="module")
+def social_long():
+    return extract_social_data(make_social_sheet(n_weeks=20, n_channels=6), DEFAULT_KEY_CELLS.split(","),
+                               METRIC_MAPPING)
+
+
+@pytest.fixture(scope="module")
+def ads(ads_long):
+    return normalize_ads_pivot(pivot_wide(ads_long, engine='pandas', **ADS_PIVOT))
+
+
+@pytest.fixture(scope="module")
+def social(social_long):
+    return normalize_social_wide(pivot_wide(social_long, engine='pandas', **SOCIAL_PIVOT))
+
+
+def _social_range(df):
+    dates = pd.to_datetime(df['Ngày Bắt Đầu'])
+    return dates.min().date() + pd.Timedelta(days=14), dates.max().date() - pd.Timedelta(days=14)
+
+
+@pytest.mark.skipif(not polars_engine.available(), reason="chưa cài polars")
+@pytest.mark.parametrize("frame, kwargs", [("ads_long", ADS_PIVOT), ("social_long", SOCIAL_PIVOT)])
+def test_pivot_wide_polars_matches_pandas(request, frame, kwargs):
+    df_long = request.getfixturevalue(frame)
+    expected = pivot_wide(df_long, engine='pandas', **kwargs)
+    pd.testing.assert_frame_equal(pivot_wide(df_long, engine=polars_engine.ENGINE_POLARS, **kwargs), expected)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("sheets, campaigns", [
+    (None, None), (["runner_a", "runner_c"], None), (["runner_b"], ["camp_1_0001", "camp_1_0003"]),
+])
+def test_filter_ads(ads, backend, sheets, campaigns):
+    expected = qe.filter_ads(ads, START, END, sheets, campaigns)
+    pd.testing.assert_frame_equal(qe.filter_ads(ads, START, END, sheets, campaigns, backend=backend), expected)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_ads_kpi_totals(ads, backend):
+    assert qe.ads_kpi_totals(ads, backend=backend) == pytest.approx(qe.ads_kpi_totals(ads))
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("fn", [qe.ads_by_sheet, qe.ads_by_campaign, qe.ads_by_date])
+def test_ads_groupings(ads, backend, fn):
+    df = qe.filter_ads(ads, START, END, None, None)
+    pd.testing.assert_frame_equal(fn(df, backend=backend), fn(df))
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_filter_social(social, backend):
+    start, end = _social_range(social)
+    channels = sorted(social['Tên kênh'].unique())[::2]
+    expected = qe.filter_social(social, channels, start, end)
+    pd.testing.assert_frame_equal(qe.filter_social(social, channels, start, end, backend=backend), expected)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_social_kpi_totals(social, backend):
+    assert qe.social_kpi_totals(social, backend=backend) == pytest.approx(qe.social_kpi_totals(social))
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_social_by_channel(social, backend):
+    pd.testing.assert_frame_equal(qe.social_by_channel(social, backend=backend), qe.social_by_channel(social))
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_content_mix(social, backend):
+    pd.testing.assert_frame_equal(qe.content_mix(social, CONTENT_METRICS, backend=backend),
+                                  qe.content_mix(social, CONTENT_METRICS))
+
+
+def _camp_sum(rows):
+    df = pd.DataFrame(rows, columns=["sheet", "campaign", "Doanh số", "Đầu tư ngân sách"])
+    df["ROAS"] = df["Doanh số"] / df["Đầu tư ngân sách"]
+    return df
+
+
+def test_top_campaigns_rolls_up_the_rest_per_sheet():
+    camp = _camp_sum([
+        ("A", "a1", 50, 10), ("A", "a2", 30, 10), ("A", "a3", 20, 10), ("A", "a4", 10, 10), ("B", "b1", 5, 5),
+    ])
+    out, rest = qe.top_campaigns_per_sheet(camp, "Doanh số", 2)
+    other = out[out["is_other"]]
+    assert other[["sheet", "campaign", "Doanh số", "Số chiến dịch"]].values.tolist() == [["A", qe.OTHER_LABEL, 30, 2]]
+    assert other["ROAS"].tolist() == [1.5]
+    assert rest["campaign"].tolist() == ["a3", "a4"]
+    assert out.loc[~out["is_other"], "campaign"].tolist() == ["a1", "a2", "b1"]
+
+
+@pytest.mark.parametrize("n", [1, 3])
+def test_real_campaign_named_like_the_other_group_stays_separate(n):
+    label = qe.OTHER_LABEL
+    camp = _camp_sum([
+        ("A", "a1", 100, 10), ("A", label, 40, 10), ("A", "a3", 20, 10), ("A", "a4", 10, 10),
+        ("A", f"{label} (nhóm gộp)", 1, 1),
+    ])
+    out, rest = qe.top_campaigns_per_sheet(camp, "Doanh số", n)
+    assert not out.duplicated(["sheet", "campaign"]).any()
+    other = out[out["is_other"]]
+    assert other["campaign"].tolist() == [f"{label} (nhóm gộp 2)"]
+    assert other["Doanh số"].sum() == rest["Doanh số"].sum()
+    assert out["Doanh số"].sum() == camp["Doanh số"].sum()
+
+
+def test_top_campaigns_without_limit_keeps_every_row():
+    camp = _camp_sum([("A", "a1", 1, 1), ("A", qe.OTHER_LABEL, 2, 1)])
+    out, rest = qe.top_campaigns_per_sheet(camp, "Doanh số", 0)
+    assert rest.empty
+    assert not out["is_other"].any() and out["Số chiến dịch"].tolist() == [1, 1]
@@ -0,0 +1,22 @@
+import time
+
+import pytest
+import requests
+
+from utils import gsheets
+from utils.readers import read_bytes
+
+
+def test_read_bytes_downloads_url(sheet_stub):
+    sheet_stub.routes["/file.csv"] = [(503, b""), (200, b"a,b\n1,2\n")]
+    assert read_bytes(f"{sheet_stub.base}/file.csv") == b"a,b\n1,2\n"
+
+
+def test_read_bytes_times_out_on_stalled_server(sheet_stub, monkeypatch):
+    monkeypatch.setattr(gsheets, "REQUEST_TIMEOUT", (1, 0.2))
+    monkeypatch.setattr(gsheets, "MAX_RETRIES", 1)
+    sheet_stub.routes["/slow.csv"] = [(200, b"a,b\n", 2)]
+    start = time.monotonic()
+    with pytest.raises(requests.RequestException):
+        read_bytes(f"{sheet_stub.base}/slow.csv")
+    assert time.monotonic() - start < 1.5
@@ -0,0 +1,96 @@
+"""`pivot_wide` phải cho kết quả giống hệt `pivot_table(...).reset_index()` trên mọi nhánh mã hóa khóa."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import polars_engine
+from utils.reshape import pivot_wide
+
+
+def _expected(df, index, columns, values, aggfunc):
+    return df.pivot_table(index=index, columns=columns, values=values, aggfunc=aggfunc).reset_index()
+
+
+def _long(n_rows, n_index, uniques, seed=0, values=None):
+    """Bảng long ngẫu nhiên: `n_index` cột khóa (mỗi cột `uniques` giá trị), cột 'c' và 'v'."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({f"k{i}": rng.integers(0, uniques, n_rows).astype(str) for i in range(n_index)})
+    df["c"] = rng.choice(["a", "b", "c"], n_rows)
+    df["v"] = rng.integers(0, 100, n_rows) if values is None else values(rng, n_rows)
+    return df
+
+
+def _key_space(df, index):
+    return float(np.prod([df[k].nunique() for k in index], dtype="float64"))
+
+
+@pytest.mark.parametrize("aggfunc", ["first", "sum"])
+@pytest.mark.parametrize("n_index, uniques, path", [
+    (2, 20, "dense"),       # không gian khóa nhỏ: mảng dày đặc
+    (3, 300, "hash"),       # > 2^20 tổ hợp: bảng băm
+    (7, 900, "lexsort"),    # > 2^62 tổ hợp: sắp xếp theo từng cột
+])
+def test_matches_pivot_table_on_each_key_path(aggfunc, n_index, uniques, path):
+    df = _long(2000, n_index, uniques)
+    index = [f"k{i}" for i in range(n_index)]
+    space = _key_space(df, index)
+    assert {"dense": space <= 1 << 20, "hash": 1 << 20 < space < 2 ** 62, "lexsort": space >= 2 ** 62}[path]
+    pd.testing.assert_frame_equal(pivot_wide(df, index, "c", "v", aggfunc, engine="pandas"),
+                                  _expected(df, index, "c", "v", aggfunc))
+
+
+@pytest.mark.parametrize("aggfunc", ["first", "sum"])
+def test_float_values_with_missing_cells_and_nan(aggfunc):
+    df = _long(500, 2, 15, values=lambda rng, n: np.where(rng.random(n) < 0.2, np.nan, rng.random(n)))
+    pd.testing.assert_frame_equal(pivot_wide(df, ["k0", "k1"], "c", "v", aggfunc, engine="pandas"),
+                                  _expected(df, ["k0", "k1"], "c", "v", aggfunc))
+
+
+def test_first_takes_first_non_null_value_in_row_order():
+    df = pd.DataFrame({"k": ["x", "x", "x", "y"], "c": ["a", "a", "a", "a"], "v": [np.nan, 2.0, 3.0, 4.0]})
+    out = pivot_wide(df, ["k"], "c", "v", "first")
+    assert out["a"].tolist() == [2.0, 4.0]
+
+
+@pytest.mark.parametrize("dtype", [object, "str"])
+def test_first_keeps_text_value_dtype(dtype):
+    df = pd.DataFrame({"k": ["x", "x", "y"], "c": ["a", "b", "a"], "v": pd.Series(["1.000", None, "abc"], dtype=dtype)})
+    pd.testing.assert_frame_equal(pivot_wide(df, ["k"], "c", "v", "first", engine="pandas"),
+                                  _expected(df, ["k"], "c", "v", "first"))
+
+
+def test_complete_integer_sum_keeps_integer_dtype():
+    df = pd.DataFrame({"k": ["x", "x", "y", "y"], "c": ["a", "b", "a", "b"], "v": [1, 2, 3, 4]})
+    out = pivot_wide(df, ["k"], "c", "v", "sum")
+    assert out["a"].dtype == np.int64
+    pd.testing.assert_frame_equal(out, _expected(df, ["k"], "c", "v", "sum"))
+
+
+@pytest.mark.parametrize("aggfunc", ["first", "sum"])
+def test_rows_with_missing_keys_are_dropped(aggfunc):
+    df = pd.DataFrame({
+        "k": ["x", None, "y", "y", "z"], "c": ["a", "a", None, "b", "a"], "v": [1.0, 2.0, 3.0, 4.0, 5.0],
+    })
+    out = pivot_wide(df, ["k"], "c", "v", aggfunc, engine="pandas")
+    pd.testing.assert_frame_equal(out, _expected(df, ["k"], "c", "v", aggfunc))
+    assert out["k"].tolist() == ["x", "y", "z"]
+
+
+def test_mixed_type_keys_match_pivot_table():
+    df = pd.DataFrame({"k": [1, "a", 2, "b"], "c": ["x", "y", "x", "y"], "v": [1.0, 2.0, 3.0, 4.0]})
+    pd.testing.assert_frame_equal(pivot_wide(df, ["k"], "c", "v", "sum", engine="pandas"),
+                                  _expected(df, ["k"], "c", "v", "sum"))
+
+
+@pytest.mark.skipif(not polars_engine.available(), reason="chưa cài polars")
+def test_keys_arrow_cannot_encode_fall_back_to_pivot_table():
+    df = pd.DataFrame({"k": [1, "a", 2, "b"], "c": ["x", "y", "x", "y"], "v": [1.0, 2.0, 3.0, 4.0]})
+    with pytest.raises(TypeError):
+        polars_engine.encode_keys(df, ["k"], "c")
+    pd.testing.assert_frame_equal(pivot_wide(df, ["k"], "c", "v", "sum", engine=polars_engine.ENGINE_POLARS),
+                                  _expected(df, ["k"], "c", "v", "sum"))
+
+
+def test_rejects_unsupported_aggfunc():
+    with pytest.raises(ValueError):
+        pivot_wide(pd.DataFrame({"k": [1], "c": ["a"], "v": [1]}), ["k"], "c", "v", "mean")
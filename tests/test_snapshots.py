@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from utils import snapshots
+
+PRESET = "7 ngày gần nhất"
+
+
+@pytest.fixture
+def snapshot_root(tmp_path, monkeypatch):
+    monkeypatch.setenv(snapshots.SNAPSHOT_DIR_ENV_VAR, str(tmp_path))
+    return tmp_path
+
+
+def _make(key, age):
+    """Ảnh chụp đã dựng của bộ dữ liệu `key`, thư mục có thời điểm cách đây `age` giây."""
+    for preset in snapshots.PRESETS:
+        path = snapshots._path("ads", key, preset, "json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('{"key": "%s"}' % key)
+    folder = os.path.dirname(snapshots._path("ads", key, PRESET, "json"))
+    t = os.path.getmtime(folder) - age
+    os.utime(folder, (t, t))
+
+
+def _kept(root):
+    return sorted(os.listdir(root / "ads"))
+
+
+def test_prune_keeps_most_recently_used(snapshot_root):
+    for i in range(snapshots.MAX_DATASETS_PER_PAGE + 1):
+        _make(f"k{i}", age=100 - i)  # k0 được dựng sớm nhất
+    assert snapshots.load_snapshot("ads", "k0", PRESET) == {"key": "k0"}
+    snapshots._prune("ads")
+    assert _kept(snapshot_root) == ["k0", "k2", "k3", "k4"]
+
+
+def test_ensure_snapshots_marks_complete_dataset_as_used(snapshot_root):
+    for i in range(snapshots.MAX_DATASETS_PER_PAGE + 1):
+        _make(f"k{i}", age=100 - i)
+    assert snapshots.ensure_snapshots("ads", "k0", None, None) is False
+    snapshots._prune("ads")
+    assert "k0" in _kept(snapshot_root) and "k1" not in _kept(snapshot_root)
+
+
+def test_prune_skips_dataset_being_built(snapshot_root):
+    for i in range(snapshots.MAX_DATASETS_PER_PAGE + 1):
+        _make(f"k{i}", age=100 - i)
+    snapshots._building.add(("ads", "k0"))
+    try:
+        snapshots._prune("ads")
+    finally:
+        snapshots._building.discard(("ads", "k0"))
+    assert "k0" in _kept(snapshot_root)
@@ -0,0 +1,348 @@
+"""
+API JSON cục bộ trả về KPI quảng cáo / social cho các công cụ nội bộ khác, dùng chung code
+trích xuất và tính KPI với các trang dashboard nhưng không qua mô hình chạy lại của Streamlit.
+
+Chạy từ thư mục gốc của repo:
+    python -m utils.api --ads <link Google Sheet / file .xlsx> --social <link / file> --port 8502
+
+Các endpoint (GET, tham số ngày dạng YYYY-MM-DD, danh sách phân tách bởi dấu phẩy):
+    /ads/kpis?start=&end=&sheet=&campaign=        tổng KPI + ROAS, CAC, ...
+    /ads/by-sheet?...   /ads/by-campaign?...      KPI theo người chạy / chiến dịch
+    /social/kpis?start=&end=&channel=             tổng Lượt xem, Tương tác, Follower, Bài đăng
+    /social/by-channel?...                        theo kênh
+    /health   /metrics                            trạng thái dữ liệu, độ trễ theo endpoint
+`--days N`: chỉ nạp N ngày gần nhất (tính lại ở mỗi lần nạp lại), nhanh hơn với sheet dài nhiều năm.
+Phản hồi có ETag; gửi lại `If-None-Match` sẽ nhận 304 nếu kết quả không đổi.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import date
+from urllib.parse import parse_qs, urlsplit
+
+logger = logging.getLogger(__name__)
+
+HOST_ENV_VAR = "DASHBOARD_API_HOST"
+PORT_ENV_VAR = "DASHBOARD_API_PORT"
+REFRESH_ENV_VAR = "DASHBOARD_API_REFRESH"
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8502
+DEFAULT_REFRESH = 300  # giây giữa hai lần nạp lại dữ liệu nguồn (0 = không nạp lại)
+RESPONSE_CACHE_SIZE = 256
+LATENCY_WINDOW = 1000  # số lần gọi gần nhất được giữ để tính phân vị độ trễ
+
+
+class ApiError(Exception):
+    """Lỗi của yêu cầu (tham số sai, thiếu dữ liệu), trả về cho client kèm mã HTTP."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _parse_date(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ApiError(400, f"Tham số '{name}' phải có dạng YYYY-MM-DD.")
+
+
+def _parse_list(params, name):
+    value = params.get(name)
+    return None if value is None else [v.strip() for v in value.split(",") if v.strip()]
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Header `If-None-Match` (danh sách ETag phân tách bởi dấu phẩy, hoặc `*`) có khớp `etag` không.
+    So sánh yếu như HTTP quy định cho header này: bỏ tiền tố W/ ở cả hai phía.
+    """
+    if not if_none_match:
+        return False
+    strong = etag[2:] if etag.startswith("W/") else etag
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if (tag[2:] if tag.startswith("W/") else tag) == strong:
+            return True
+    return False
+
+
+def _records(df):
+    return json.loads(df.to_json(orient="records", date_format="iso", force_ascii=False))
+
+
+class KpiService:
+    """
+    Giữ các bộ dữ liệu đã chuẩn hóa (kèm FilterIndex) trong bộ nhớ và trả lời các truy vấn KPI.
+    Kết quả được ghi nhớ theo (endpoint, tham số, phiên bản dữ liệu); nạp lại dữ liệu sẽ đổi
+    phiên bản nên các kết quả cũ tự hết hiệu lực.
+    """
+
+    def __init__(self, ads_source=None, ads_sheets=None, social_source=None, key_cells=None, days=None):
+        self.sources = {"ads": (ads_source, ads_sheets), "social": (social_source, key_cells)}
+        self.days = days
+        self.datasets = {}  # tên -> (df, FilterIndex, phiên bản, thời điểm nạp)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._latency = {}
+        self.stats = {"hits": 0, "misses": 0, "not_modified": 0}
+
+    # ---------- Dữ liệu ----------
+    def load(self):
+        """Nạp (lại) mọi nguồn đã cấu hình; nguồn lỗi giữ nguyên dữ liệu cũ."""
+        from utils.datasets import load_ads_dataset, load_social_dataset, recent_date_range
+        from utils.filter_index import FilterIndex
+        from utils.snapshots import data_fingerprint
+        date_range = recent_date_range(self.days)
+        loaders = {
+            "ads": lambda src, opt: (load_ads_dataset(src, opt, date_range), ['sheet', 'campaign'], 'date'),
+            "social": lambda src, opt: (load_social_dataset(src, opt, date_range), ['Tên kênh'], 'Ngày Bắt Đầu'),
+        }
+        for name, (source, option) in self.sources.items():
+            if not source:
+                continue
+            t = time.perf_counter()
+            try:
+                df, dims, date_col = loaders[name](source, option)
+            except Exception:
+                logger.exception("Không nạp được dữ liệu %s từ %s", name, source)
+                continue
+            version = data_fingerprint(df)
+            with self._lock:
+                old = self.datasets.get(name)
+                if old is not None and old[2] == version:
+                    self.datasets[name] = old[:3] + (time.time(),)
+                    continue
+            index = FilterIndex(df, dims=dims, date_col=date_col)
+            with self._lock:
+                self.datasets[name] = (df, index, version, time.time())
+                self._cache.clear()
+            logger.info("Đã nạp %s: %s dòng trong %.2f s", name, f"{len(df):,}", time.perf_counter() - t)
+
+    def _dataset(self, name):
+        with self._lock:
+            entry = self.datasets.get(name)
+        if entry is None:
+            raise ApiError(503, f"Chưa có dữ liệu {name} (chưa cấu hình nguồn hoặc nạp lỗi).")
+        return entry
+
+    # ---------- Truy vấn ----------
+    def _ads(self, endpoint, params):
+        from utils.helpers import ads_kpi_values
+        from utils.query_engine import filter_ads, ads_kpi_totals, ads_by_sheet, ads_by_campaign
+        df, index, _, _ = self._dataset("ads")
+        start = _parse_date(params, "start") or df['date'].min().date()
+        end = _parse_date(params, "end") or df['date'].max().date()
+        # Không truyền tham số = mọi người chạy / chiến dịch (không cần lọc theo chiều đó)
+        sheets = _parse_list(params, "sheet") or None
+        campaigns = _parse_list(params, "campaign") or None
+        df = filter_ads(df, start, end, sheets, campaigns, index=index)
+        result = {"start": start.isoformat(), "end": end.isoformat(), "rows": len(df)}
+        if endpoint == "kpis":
+            result["kpis"] = ads_kpi_values(ads_kpi_totals(df))
+        elif endpoint == "by-sheet":
+            result["data"] = _records(ads_by_sheet(df))
+        else:
+            result["data"] = _records(ads_by_campaign(df))
+        return result
+
+    def _social(self, endpoint, params):
+        import pandas as pd
+        from utils.query_engine import filter_social, social_kpi_totals, social_by_channel
+        df, index, _, _ = self._dataset("social")
+        dates = pd.to_datetime(df['Ngày Bắt Đầu'], errors='coerce').dropna()
+        start = _parse_date(params, "start") or dates.min().date()
+        end = _parse_date(params, "end") or dates.max().date()
+        channels = _parse_list(params, "channel") or index.values('Tên kênh')
+        df = filter_social(df, channels, start, end, index=index)
+        result = {"start": start.isoformat(), "end": end.isoformat(), "rows": len(df)}
+        if endpoint == "kpis":
+            result["kpis"] = social_kpi_totals(df)
+        else:
+            result["data"] = _records(social_by_channel(df))
+        return result
+
+    _ROUTES = {
+        "/ads/kpis": ("ads", "kpis"),
+        "/ads/by-sheet": ("ads", "by-sheet"),
+        "/ads/by-campaign": ("ads", "by-campaign"),
+        "/social/kpis": ("social", "kpis"),
+        "/social/by-channel": ("social", "by-channel"),
+    }
+
+    def query(self, path, params):
+        """
+        Trả lời một truy vấn: (ETag, nội dung JSON dạng bytes). Kết quả được ghi nhớ theo
+        đường dẫn, tham số (đã chuẩn hóa thứ tự) và phiên bản dữ liệu.
+        """
+        if path not in self._ROUTES:
+            raise ApiError(404, f"Không có endpoint {path}.")
+        dataset, endpoint = self._ROUTES[path]
+        version = self._dataset(dataset)[2]
+        key = (path, tuple(sorted(params.items())), version)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.stats["hits"] += 1
+                return cached
+
+        handler = self._ads if dataset == "ads" else self._social
+        result = handler(endpoint, params)
+        result["version"] = version
+        body = json.dumps(result, ensure_ascii=False, default=str).encode("utf-8")
+        etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        with self._lock:
+            self._cache[key] = (etag, body)
+            while len(self._cache) > RESPONSE_CACHE_SIZE:
+                self._cache.popitem(last=False)
+            self.stats["misses"] += 1
+        return etag, body
+
+    def dataset_names(self):
+        """Tên các bộ dữ liệu đã nạp (đọc dưới khóa vì luồng nạp lại có thể đang ghi)."""
+        with self._lock:
+            return sorted(self.datasets)
+
+    # ---------- Đo độ trễ ----------
+    def record_latency(self, path, seconds):
+        with self._lock:
+            self._latency.setdefault(path, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+    def record_not_modified(self):
+        with self._lock:
+            self.stats["not_modified"] += 1
+
+    def metrics(self):
+        """Độ trễ (ms) theo endpoint trên LATENCY_WINDOW lần gọi gần nhất, và thống kê bộ nhớ đệm."""
+        with self._lock:
+            latency = {path: sorted(values) for path, values in self._latency.items()}
+            stats = dict(self.stats)
+            datasets = {
+                name: {"rows": len(df), "version": version, "loaded_at": loaded}
+                for name, (df, _, version, loaded) in self.datasets.items()
+            }
+
+        def pct(values, q):
+            return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2)
+
+        return {
+            "cache": stats,
+            "datasets": datasets,
+            "latency_ms": {
+                path: {"count": len(v), "p50": pct(v, 0.5), "p95": pct(v, 0.95), "max": round(v[-1] * 1000, 2)}
+                for path, v in latency.items()
+            },
+        }
+
+
+def make_handler(service):
+    """Lớp xử lý HTTP gắn với một KpiService."""
+    # http.server kéo theo email / mimetypes...: chỉ nạp khi thật sự phục vụ API
+    from http.server import BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "DashboardKpiApi/1.0"
+
+        def _send(self, status, body=b"", etag=None):
+            self.send_response(status)
+            if etag:
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", "no-cache")
+            if status != 304:
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if status != 304:
+                self.wfile.write(body)
+
+        def do_GET(self):
+            t = time.perf_counter()
+            url = urlsplit(self.path)
+            path = url.path.rstrip("/") or "/"
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            try:
+                if path == "/health":
+                    body = json.dumps({"status": "ok", "datasets": service.dataset_names()}).encode()
+                    self._send(200, body)
+                elif path == "/metrics":
+                    self._send(200, json.dumps(service.metrics(), ensure_ascii=False).encode("utf-8"))
+                else:
+                    etag, body = service.query(path, params)
+                    if etag_matches(self.headers.get("If-None-Match"), etag):
+                        service.record_not_modified()
+                        self._send(304, etag=etag)
+                    else:
+                        self._send(200, body, etag=etag)
+            except ApiError as e:
+                self._send(e.status, json.dumps({"error": str(e)}, ensure_ascii=False).encode("utf-8"))
+            except Exception as e:
+                logger.exception("Lỗi khi xử lý %s", self.path)
+                self._send(500, json.dumps({"error": str(e)}, ensure_ascii=False).encode("utf-8"))
+            finally:
+                # Chỉ đo các endpoint có thật để đường dẫn tùy ý không làm phình bảng đo
+                if path in KpiService._ROUTES or path in ("/health", "/metrics"):
+                    service.record_latency(path, time.perf_counter() - t)
+
+        def log_message(self, format, *args):
+            logger.debug("%s - %s", self.address_string(), format % args)
+
+    return Handler
+
+
+def _refresh_loop(service, interval, stop):
+    while not stop.wait(interval):
+        service.load()
+
+
+def serve(service, host=DEFAULT_HOST, port=DEFAULT_PORT, refresh=DEFAULT_REFRESH):
+    """Nạp dữ liệu rồi phục vụ API cho tới khi bị dừng (Ctrl+C)."""
+    from http.server import ThreadingHTTPServer
+    service.load()
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    stop = threading.Event()
+    if refresh > 0:
+        threading.Thread(target=_refresh_loop, args=(service, refresh, stop), daemon=True).start()
+    logger.info("API KPI đang chạy tại http://%s:%s", host, server.server_port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API JSON cục bộ cho KPI quảng cáo và social.")
+    parser.add_argument("--ads", help="Link Google Sheet, URL hoặc file .xlsx dữ liệu quảng cáo")
+    parser.add_argument("--ads-sheets", help="Các sheet cần đọc, phân tách bởi dấu phẩy (mặc định: tất cả)")
+    parser.add_argument("--social", help="Link Google Sheet, URL hoặc file Excel dữ liệu social")
+    parser.add_argument("--key-cells", help="Danh sách key cell của sheet social (mặc định như trang Social)")
+    parser.add_argument("--days", type=int, help="Chỉ nạp từng ấy ngày gần nhất (mặc định: toàn bộ lịch sử)")
+    parser.add_argument("--host", default=os.environ.get(HOST_ENV_VAR, DEFAULT_HOST))
+    parser.add_argument("--port", type=int, default=int(os.environ.get(PORT_ENV_VAR, DEFAULT_PORT)))
+    parser.add_argument("--refresh", type=int, default=int(os.environ.get(REFRESH_ENV_VAR, DEFAULT_REFRESH)),
+                        help="Số giây giữa hai lần nạp lại dữ liệu nguồn (0 = không nạp lại)")
+    args = parser.parse_args(argv)
+    if not args.ads and not args.social:
+        parser.error("Cần ít nhất một nguồn dữ liệu (--ads hoặc --social).")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    ads_sheets = [s.strip() for s in args.ads_sheets.split(",") if s.strip()] if args.ads_sheets else None
+    service = KpiService(args.ads, ads_sheets, args.social, args.key_cells, args.days)
+    serve(service, args.host, args.port, args.refresh)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import hashlib
+import time
+
+# Các bước tính toán của một trang (nạp → trích xuất → pivot → lọc → tổng hợp → biểu đồ → xuất
+# file) được mô hình hóa thành một đồ thị phụ thuộc. Mỗi bước được ghi nhớ trong session_state
+# theo mã băm các đầu vào của nó (mã của các bước phía trước + tham số widget), nên khi đổi một
+# widget chỉ những bước phía sau có đầu vào thật sự thay đổi mới bị tính lại.
+# Kết quả ghi nhớ được dùng chung giữa các lần chạy lại của session: không được sửa trực tiếp.
+
+
+def _digest(value):
+    return hashlib.sha1(repr(value).encode()).hexdigest()[:16]
+
+
+def content_token(value):
+    """Mã băm nội dung của kết quả một bước (DataFrame băm theo giá trị, còn lại theo repr)."""
+    import pandas as pd
+    if isinstance(value, pd.DataFrame):
+        h = hashlib.sha1(repr((list(value.columns), value.shape)).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        return h.hexdigest()[:16]
+    if isinstance(value, tuple):
+        return _digest(tuple(content_token(v) for v in value))
+    return _digest(value)
+
+
+class StageGraph:
+    """
+    Đồ thị các bước của một lần chạy trang, ghi nhớ trong session_state[key].
+    - `source(name, value, token)`: dữ liệu gốc đã có sẵn mã (vd: khóa nội dung các nguồn);
+    - `stage(name, fn, deps, params)`: chạy `fn()` khi mã của các bước `deps` hoặc `params` đổi,
+      ngược lại trả về kết quả đã ghi nhớ. `hash_output=True` lấy mã theo nội dung kết quả để
+      các bước phía sau không bị tính lại khi kết quả không đổi (vd: đổi bộ lọc nhưng cùng số dòng).
+    `enabled=False` (chế độ tiết kiệm bộ nhớ) không giữ kết quả: mọi bước đều được tính lại.
+    """
+
+    def __init__(self, st, key, enabled=True):
+        self.enabled = enabled
+        self._store = st.session_state.setdefault(key, {}) if enabled else {}
+        self._tokens = {}
+        self.stages = []
+
+    def source(self, name, value, token):
+        self._tokens[name] = _digest((name, token))
+        self.stages.append({"Bước": name, "Phụ thuộc": "", "Tính lại": "nguồn", "Thời gian (ms)": 0.0})
+        return value
+
+    def stage(self, name, fn, deps=(), params=(), hash_output=False):
+        key = _digest((name, [self._tokens[d] for d in deps], params))
+        entry = self._store.get(name)
+        start = time.perf_counter()
+        if entry is not None and entry[0] == key:
+            _, value, token = entry
+            recomputed = False
+        else:
+            value = fn()
+            token = content_token(value) if hash_output else key
+            if self.enabled:
+                self._store[name] = (key, value, token)
+            recomputed = True
+        self._tokens[name] = token
+        self.stages.append({
+            "Bước": name, "Phụ thuộc": ", ".join(deps), "Tính lại": "✅" if recomputed else "—",
+            "Thời gian (ms)": round((time.perf_counter() - start) * 1000, 1),
+        })
+        return value
+
+    def recomputed(self):
+        """Tên các bước phải tính lại trong lần chạy này."""
+        return [row["Bước"] for row in self.stages if row["Tính lại"] == "✅"]
+
+
+def render_stage_report(st, graph):
+    """Bảng các bước của lần chạy này (bước nào được tính lại / dùng lại) trong mục Chẩn đoán."""
+    stages = [row for row in graph.stages if row["Tính lại"] != "nguồn"]
+    with st.expander("🩺 Chẩn đoán: các bước được tính lại"):
+        st.caption(f"Tính lại {len(graph.recomputed())}/{len(stages)} bước ở lần chạy này"
+                   + ("" if graph.enabled else " (chế độ tiết kiệm bộ nhớ: không ghi nhớ kết quả)"))
+        st.dataframe(graph.stages, hide_index=True)
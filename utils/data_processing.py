@@ -1,7 +1,107 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
 import re
 from datetime import datetime
 
+from utils.numeric import parse_vn_numbers
+
+# Bộ nhớ đệm layout: dấu vân tay cấu trúc của sheet -> vị trí header, kênh, block campaign.
+# Template gần như không đổi giữa các tuần nên có thể bỏ qua bước dò tìm khi dấu vân tay khớp.
+_LAYOUT_CACHE_SIZE = 64
+_layout_cache = OrderedDict()
+_layout_lock = threading.Lock()
+_layout_stats = {"hits": 0, "misses": 0}
+# Ngày của các nhãn header được nhớ theo nội dung header: các block / lần nạp dùng chung header
+_HEADER_CACHE_SIZE = 256
+
+
+def _layout_fingerprint(grid, label_cols, *extra):
+    """
+    Tạo dấu vân tay cấu trúc của sheet từ kích thước và nội dung các cột nhãn
+    (các cột chứa 'camp', tên kênh, tên chỉ số...). Không dùng các cột giá trị/ngày
+    để số liệu thay đổi hằng tuần không làm mất cache.
+    """
+    h = hashlib.sha1()
+    h.update(repr((grid.shape, extra)).encode())
+    for j in range(min(label_cols, grid.shape[1])):
+        h.update("\x1f".join(map(str, grid[:, j])).encode("utf-8", "surrogatepass"))
+        h.update(b"\x1e")
+    return h.hexdigest()
+
+
+def _cache_get(key):
+    with _layout_lock:
+        layout = _layout_cache.get(key)
+        if layout is not None:
+            _layout_cache.move_to_end(key)
+        return layout
+
+
+def _cache_put(key, layout):
+    with _layout_lock:
+        _layout_cache[key] = layout
+        _layout_cache.move_to_end(key)
+        while len(_layout_cache) > _LAYOUT_CACHE_SIZE:
+            _layout_cache.popitem(last=False)
+
+
+def _count_layout(hit):
+    with _layout_lock:
+        _layout_stats["hits" if hit else "misses"] += 1
+
+
+def clear_layout_cache():
+    """Xóa toàn bộ cache layout (ví dụ khi đổi template)."""
+    with _layout_lock:
+        _layout_cache.clear()
+        _layout_stats.update(hits=0, misses=0)
+
+
+def layout_cache_stats():
+    """Trả về số lần dùng lại layout từ cache (hits) và số lần phải dò tìm lại (misses)."""
+    with _layout_lock:
+        return dict(_layout_stats, size=len(_layout_cache))
+
+
+def recent_columns(df, n, label_cols):
+    """
+    Bản thu gọn của sheet thô cho lần xem trước: giữ `label_cols` cột nhãn đầu tiên và `n` cột
+    cuối cùng (các mốc thời gian gần nhất, vì template xếp thời gian tăng dần từ trái sang phải).
+    """
+    if n is None or df.shape[1] <= label_cols + n:
+        return df
+    return df.iloc[:, list(range(label_cols)) + list(range(df.shape[1] - n, df.shape[1]))]
+
+
+@lru_cache(maxsize=_HEADER_CACHE_SIZE)
+def header_dates(labels):
+    """
+    Ngày (datetime64[D], NaT nếu không đọc được) của các nhãn cột ngày trong header (tuple), đọc
+    từng nhãn như bước chuẩn hóa (dayfirst). Kết quả được nhớ theo nội dung header.
+    """
+    dates = pd.to_datetime(pd.Series(labels, dtype=object), errors='coerce', dayfirst=True, format='mixed')
+    return dates.to_numpy('datetime64[D]')
+
+
+def date_range_mask(dates, date_range):
+    """
+    Các cột cần giữ khi trích xuất theo `date_range` = (từ ngày, đến ngày), hai đầu tính cả ngày
+    đó, None = không giới hạn. Cột có ngày không đọc được vẫn được giữ để bước chuẩn hóa xử lý như cũ.
+    """
+    start, end = date_range
+    keep = np.ones(len(dates), dtype=bool)
+    if start is not None:
+        keep &= dates >= np.datetime64(start, 'D')
+    if end is not None:
+        keep &= dates <= np.datetime64(end, 'D')
+    return keep | np.isnat(dates)
+
+
 def parse_week(week_str, year=None):
     """
     Hàm chuyển đổi chuỗi tuần 'dd/mm - dd/mm' thành datetime.
@@ -23,43 +123,103 @@ def parse_week(week_str, year=None):
             return None, None
     return None, None
 
-def extract_social_data(df, key_cells, metric_mapping):
-    """
-    Trích xuất và chuẩn hóa dữ liệu Social Media từ DataFrame thô.
-    """
-    rows = df.shape[0]
-    all_data = []
+def _detect_social_layout(grid, key_cells):
+    """Dò tìm dòng header 'Chỉ số', các cột thời gian và vị trí bắt đầu của từng kênh."""
+    rows, cols = grid.shape
 
-    # Tìm dòng header chứa 'Chỉ số'
+    # Tìm dòng header chứa 'Chỉ số' (cột thứ 3, index 2)
     header_row_idx = None
     for i in range(rows):
-        # Cột thứ 3 (index 2)
-        if str(df.iloc[i, 2]).strip().lower() == "chỉ số":
+        if str(grid[i, 2]).strip().lower() == "chỉ số":
             header_row_idx = i
             break
 
     if header_row_idx is None:
-        # Không tìm thấy header, không thể xử lý
-        return pd.DataFrame()
+        return None
 
-    header_row = df.iloc[header_row_idx]
     # Lấy các cột thời gian từ dòng header
-    time_cols = [j for j in range(3, df.shape[1]) if pd.notna(header_row[j])]
+    time_cols = [j for j in range(3, cols) if pd.notna(grid[header_row_idx, j])]
 
-    # Xác định vị trí bắt đầu của từng kênh dựa trên key_cells
-    channel_data = {}
+    # Xác định vị trí (dòng, cột) của ô key cell mở đầu mỗi kênh
+    channel_cells = []
     if key_cells:
         for i in range(rows):
-            for j in range(df.shape[1]):
-                cell_value = str(df.iloc[i, j]).strip().upper()
-                if cell_value in key_cells:
-                    channel_name = str(df.iloc[i, j + 1]).strip() if j + 1 < df.shape[1] and pd.notna(df.iloc[i, j + 1]) else cell_value
-                    channel_data[i] = {"Kênh": cell_value, "Tên kênh": channel_name}
+            for j in range(cols):
+                if str(grid[i, j]).strip().upper() in key_cells:
+                    channel_cells.append((i, j))
                     break
 
-    # Duyệt qua các dòng dữ liệu để trích xuất chỉ số
+    return {"header_row": header_row_idx, "time_cols": time_cols, "channel_cells": channel_cells}
+
+
+def _social_layout_valid(grid, layout, key_cells):
+    """Kiểm tra nhanh layout lấy từ cache còn khớp với sheet hiện tại hay không."""
+    h = layout["header_row"]
+    if str(grid[h, 2]).strip().lower() != "chỉ số":
+        return False
+    if [j for j in range(3, grid.shape[1]) if pd.notna(grid[h, j])] != layout["time_cols"]:
+        return False
+    return all(str(grid[i, j]).strip().upper() in key_cells for i, j in layout["channel_cells"])
+
+
+def _social_layout(grid, key_cells):
+    """Lấy layout của sheet Social từ cache theo dấu vân tay, dò tìm lại nếu không khớp."""
+    key = ("social", _layout_fingerprint(grid, 3, tuple(key_cells)))
+    layout = _cache_get(key)
+    if layout is not None and _social_layout_valid(grid, layout, key_cells):
+        _count_layout(hit=True)
+        return layout
+    _count_layout(hit=False)
+    layout = _detect_social_layout(grid, key_cells)
+    if layout is not None:
+        _cache_put(key, layout)
+    return layout
+
+
+@lru_cache(maxsize=_HEADER_CACHE_SIZE)
+def _time_col_info(labels, year):
+    """(nhãn, ngày bắt đầu, ngày kết thúc, loại thời gian) của các cột thời gian, nhớ theo header."""
+    col_info = []
+    for label in labels:
+        time_label = str(label).strip()
+        start_date, end_date = parse_week(time_label, year)
+        time_type = "Tháng" if "tháng" in time_label.lower() else "Tuần"
+        col_info.append((time_label, start_date, end_date, time_type))
+    return tuple(col_info)
+
+
+def extract_social_data(df, key_cells, metric_mapping, date_range=None):
+    """
+    Trích xuất và chuẩn hóa dữ liệu Social Media từ DataFrame thô.
+    `date_range` = (từ ngày, đến ngày): chỉ trích xuất các cột thời gian có ngày bắt đầu trong
+    khoảng này (các cột khác bị bỏ ngay từ header, trước khi đọc từng ô).
+    """
+    grid = df.to_numpy(dtype=object)
+    rows, cols = grid.shape
+
+    if cols < 3:
+        return pd.DataFrame()
+
+    layout = _social_layout(grid, key_cells)
+    if layout is None:
+        # Không tìm thấy header, không thể xử lý
+        return pd.DataFrame()
+
+    header_row_idx = layout["header_row"]
+    header_row = grid[header_row_idx]
+    time_cols = layout["time_cols"]
+
+    # Thông tin kênh được đọc lại từ vị trí đã biết (tên kênh ở ô bên phải key cell)
+    channel_data = {}
+    for i, j in layout["channel_cells"]:
+        cell_value = str(grid[i, j]).strip().upper()
+        channel_name = str(grid[i, j + 1]).strip() if j + 1 < cols and pd.notna(grid[i, j + 1]) else cell_value
+        channel_data[i] = {"Kênh": cell_value, "Tên kênh": channel_name}
+
+    # Xác định các dòng chỉ số và kênh tương ứng
+    metric_rows, row_info = [], []
     for r in range(header_row_idx + 1, rows):
-        metric_raw = str(df.iloc[r, 2]).strip()
+        metric_raw = str(grid[r, 2]).strip()
         if not metric_raw or metric_raw.lower().startswith("báo cáo"):
             continue
 
@@ -72,67 +232,156 @@ def extract_social_data(df, key_cells, metric_mapping):
         if not current_channel_info:
             continue
 
-        channel = current_channel_info.get("Kênh", "N/A")
-        channel_name = current_channel_info.get("Tên kênh", "N/A")
-        metric_standard = metric_mapping.get(metric_raw, metric_raw)
+        metric_rows.append(r)
+        row_info.append((
+            current_channel_info.get("Kênh", "N/A"), current_channel_info.get("Tên kênh", "N/A"),
+            metric_raw, metric_mapping.get(metric_raw, metric_raw),
+        ))
+
+    if not metric_rows or not time_cols:
+        return pd.DataFrame()
+
+    # Thông tin thời gian chỉ cần phân tích một lần cho mỗi cột
+    col_info = _time_col_info(tuple(header_row[c] for c in time_cols), datetime.now().year)
+    if date_range is not None:
+        starts = np.array([np.datetime64(info[1], 'D') if info[1] is not None else np.datetime64('NaT', 'D')
+                           for info in col_info], dtype='datetime64[D]')
+        keep = np.flatnonzero(date_range_mask(starts, date_range))
+        time_cols = [time_cols[k] for k in keep]
+        col_info = [col_info[k] for k in keep]
+        if not time_cols:
+            return pd.DataFrame()
 
-        # Lấy giá trị theo từng cột thời gian
-        for c in time_cols:
-            time_label = str(header_row[c]).strip()
-            value = df.iloc[r, c]
+    # Lấy toàn bộ ô giá trị (dòng chỉ số x cột thời gian) và chuẩn hóa số trên cả mảng
+    cells = grid[np.ix_(metric_rows, time_cols)]
+    ri, ci = np.nonzero(pd.notna(cells) & (cells != ""))
+    values, unparsed = parse_vn_numbers(cells[ri, ci])
+    ok = ~np.isnan(values)
+    ri, ci, values = ri[ok], ci[ok], values[ok]
+    if not len(values):
+        return pd.DataFrame()
 
-            if pd.isna(value) or value == "":
-                continue
+    def _field(items, k, idx):
+        arr = np.empty(len(items), dtype=object)
+        arr[:] = [x[k] for x in items]
+        return arr[idx]
 
-            numeric_value = pd.to_numeric(value, errors='coerce')
-            if pd.isna(numeric_value):
-                continue
+    df_out = pd.DataFrame({
+        "Kênh": _field(row_info, 0, ri), "Tên kênh": _field(row_info, 1, ri),
+        "Chỉ số thô": _field(row_info, 2, ri), "Chỉ số chuẩn": _field(row_info, 3, ri),
+        "Loại thời gian": _field(col_info, 3, ci), "Mốc thời gian": _field(col_info, 0, ci),
+        "Ngày Bắt Đầu": _field(col_info, 1, ci), "Ngày Kết Thúc": _field(col_info, 2, ci),
+        "Giá trị": values,
+    })
+    df_out.attrs['unparsed_cells'] = unparsed
+    return df_out
 
-            start_date, end_date = parse_week(time_label)
-            time_type = "Tháng" if "tháng" in time_label.lower() else "Tuần"
 
-            all_data.append({
-                "Kênh": channel, "Tên kênh": channel_name, "Chỉ số thô": metric_raw,
-                "Chỉ số chuẩn": metric_standard, "Loại thời gian": time_type,
-                "Mốc thời gian": time_label, "Ngày Bắt Đầu": start_date,
-                "Ngày Kết Thúc": end_date, "Giá trị": numeric_value,
-            })
+def _camp_header_positions(grid, i):
+    """Vị trí các ô có dữ liệu trên dòng 'camp' (từ cột thứ 3 trở đi)."""
+    return (np.flatnonzero(pd.notna(grid[i, 2:])) + 2).tolist()
 
-    if not all_data:
-        return pd.DataFrame()
 
-    df_out = pd.DataFrame(all_data)
-    df_out['Giá trị'] = pd.to_numeric(df_out['Giá trị'], errors='coerce').fillna(0)
-    return df_out
+@lru_cache(maxsize=_HEADER_CACHE_SIZE)
+def _camp_date_labels(labels):
+    """Các nhãn ngày trên dòng 'camp' (bỏ cột "Tổng"), nhớ theo nội dung header."""
+    return tuple(x for x in labels if not str(x).strip().lower().startswith("tổng"))
+
 
-def extract_camp_blocks(df):
+def _camp_header_digest(grid, rows):
     """
-    Trích xuất dữ liệu từ các block campaign trong file quảng cáo.
+    Dấu vân tay vị trí các ô có dữ liệu trên tất cả dòng 'camp' (tính một lần trên cả mảng),
+    dùng để kiểm tra layout lấy từ cache mà không phải dò lại từng block.
     """
-    all_data = []
-    current_camp = None
-    date_cols = []
-    for i, row in df.iterrows():
+    mask = pd.notna(grid[rows, 2:]) if rows else np.zeros((0, 0), dtype=bool)
+    return hashlib.sha1(np.packbits(mask, axis=None).tobytes()).hexdigest()
+
+
+def _detect_camp_layout(grid):
+    """Dò tìm các block campaign: dòng 'camp', vị trí các ô ngày và các dòng chỉ số."""
+    blocks = []
+    current = None
+    for i in range(grid.shape[0]):
         # Dòng bắt đầu block campaign
-        if str(row.iloc[0]).lower().strip() == 'camp':
-            current_camp = str(row.iloc[1]).strip() if pd.notnull(row.iloc[1]) else None
-            # Lấy danh sách ngày, loại bỏ cột "Tổng"
-            date_cols = [
-                v for v in row.iloc[2:].dropna()
-                if str(v).strip().lower() != "tổng" and not str(v).strip().lower().startswith("tổng")
-            ]
+        if str(grid[i, 0]).lower().strip() == 'camp':
+            current = {"row": i, "date_pos": _camp_header_positions(grid, i), "metric_rows": []}
+            blocks.append(current)
             continue
 
         # Dòng chứa chỉ số
-        if current_camp and pd.notnull(row.iloc[1]) and str(row.iloc[1]).strip() != "":
-            criteria = str(row.iloc[1]).strip()
-            for idx, date in enumerate(date_cols):
-                value = row.iloc[idx + 2] if (idx + 2) < len(row) else None
-                if pd.isnull(value) or str(value).strip() == '':
-                    value = 0
-                if pd.notnull(date):
-                    all_data.append({
-                        'campaign': current_camp, 'criteria': criteria,
-                        'date': date, 'value': value
-                    })
-    return pd.DataFrame(all_data)
+        if current is not None and pd.notnull(grid[i, 1]) and str(grid[i, 1]).strip() != "":
+            current["metric_rows"].append(i)
+    rows = [b["row"] for b in blocks]
+    return {"blocks": blocks, "rows": rows, "header_digest": _camp_header_digest(grid, rows)}
+
+
+def _camp_layout(grid):
+    """Lấy layout các block campaign từ cache theo dấu vân tay, dò tìm lại nếu không khớp."""
+    key = ("camp", _layout_fingerprint(grid, 2))
+    layout = _cache_get(key)
+    if layout is not None and _camp_header_digest(grid, layout["rows"]) == layout["header_digest"]:
+        _count_layout(hit=True)
+        return layout
+    _count_layout(hit=False)
+    layout = _detect_camp_layout(grid)
+    _cache_put(key, layout)
+    return layout
+
+
+def extract_camp_blocks(df, date_range=None):
+    """
+    Trích xuất dữ liệu từ các block campaign trong file quảng cáo.
+    `date_range` = (từ ngày, đến ngày): chỉ trích xuất các cột ngày trong khoảng này (các cột khác
+    bị bỏ ngay từ header, trước khi đọc từng ô).
+    """
+    grid = df.to_numpy(dtype=object)
+    if grid.shape[1] < 2:
+        return pd.DataFrame()
+
+    n_cols = grid.shape[1]
+    campaigns, criteria, dates, cells = [], [], [], []
+    for block in _camp_layout(grid)["blocks"]:
+        i = block["row"]
+        current_camp = str(grid[i, 1]).strip() if pd.notnull(grid[i, 1]) else None
+        if not current_camp or not block["metric_rows"]:
+            continue
+        # Lấy danh sách ngày, loại bỏ cột "Tổng"
+        date_cols = _camp_date_labels(tuple(grid[i, block["date_pos"]]))
+        positions = np.arange(len(date_cols))
+        if date_range is not None:
+            positions = positions[date_range_mask(header_dates(date_cols), date_range)]
+            date_cols = [date_cols[p] for p in positions]
+        if not date_cols:
+            continue
+
+        # Giá trị của ngày thứ idx nằm ở cột idx + 2 của các dòng chỉ số trong block
+        n_dates, n_rows = len(date_cols), len(block["metric_rows"])
+        values = np.full((n_rows, n_dates), None, dtype=object)
+        present = positions + 2 < n_cols
+        values[:, present] = grid[np.ix_(block["metric_rows"], positions[present] + 2)]
+
+        campaigns.append(np.full(n_rows * n_dates, current_camp, dtype=object))
+        criteria.append(np.repeat(np.array([str(grid[r, 1]).strip() for r in block["metric_rows"]], dtype=object), n_dates))
+        date_arr = np.empty(n_dates, dtype=object)
+        date_arr[:] = date_cols
+        dates.append(np.tile(date_arr, n_rows))
+        cells.append(values.ravel())
+
+    if not cells:
+        return pd.DataFrame()
+
+    values = np.concatenate(cells)
+    # Ô trống được tính là 0; các ô còn lại chuẩn hóa số (1.234.567, 12,5%, 3.000.000 đ...) trên cả cột
+    blank = pd.isna(values) | (pd.Series(values, dtype=object).astype(str).str.strip() == '').to_numpy()
+    values[blank] = 0
+    parsed, unparsed = parse_vn_numbers(values)
+    # Ô không đọc được số cũng tính là 0 (như khi ép kiểu sau pivot trước đây): pivot 'first' bỏ qua
+    # NaN nên nếu để NaN, giá trị của một block trùng phía sau sẽ thay chỗ ô đầu tiên
+    parsed[np.isnan(parsed)] = 0
+
+    df_out = pd.DataFrame({
+        'campaign': np.concatenate(campaigns), 'criteria': np.concatenate(criteria),
+        'date': np.concatenate(dates), 'value': parsed,
+    })
+    df_out.attrs['unparsed_cells'] = unparsed
+    return df_out
@@ -0,0 +1,149 @@
+import hashlib
+import importlib.util
+import logging
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Bộ nhớ đệm trên đĩa cho bảng dữ liệu đã chuẩn hóa (dạng wide) của các trang, lưu dạng Parquet.
+# Khóa là mã băm nội dung các nguồn + tham số đọc + phiên bản schema, nên sau khi khởi động lại
+# server (hoặc deploy) dữ liệu không đổi được nạp lại trong vài mili giây thay vì đọc & trích
+# xuất lại. Đổi phiên bản schema thì toàn bộ mục cũ bị xóa; tổng dung lượng bị giới hạn, mục lâu
+# không dùng nhất bị xóa trước. Cần pyarrow (đi kèm streamlit); không có thì bộ nhớ đệm tắt.
+DATASET_CACHE_DIR_ENV_VAR = "DASHBOARD_DATASET_CACHE_DIR"
+DEFAULT_DATASET_CACHE_DIR = os.path.join(".cache", "datasets")
+CACHE_MB_ENV_VAR = "DASHBOARD_DATASET_CACHE_MB"
+DEFAULT_CACHE_MB = 256
+MEMORY_ENTRIES = 4  # số bảng vừa nạp được giữ trong bộ nhớ (dùng chung giữa các session)
+# Parquet không lưu tên của trục cột ('criteria' / 'Chỉ số chuẩn'): ghi kèm vào attrs rồi đặt lại khi đọc
+_COLUMNS_NAME_ATTR = "columns_name"
+
+_memory = OrderedDict()
+_lock = threading.Lock()
+
+
+def available():
+    """Có thể đọc / ghi Parquet (đã cài pyarrow)."""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def cache_dir():
+    """Thư mục bộ nhớ đệm (đặt qua biến môi trường DASHBOARD_DATASET_CACHE_DIR)."""
+    return os.environ.get(DATASET_CACHE_DIR_ENV_VAR, DEFAULT_DATASET_CACHE_DIR)
+
+
+def cache_limit_bytes():
+    """Dung lượng tối đa (đặt qua biến môi trường DASHBOARD_DATASET_CACHE_MB)."""
+    try:
+        mb = float(os.environ.get(CACHE_MB_ENV_VAR, DEFAULT_CACHE_MB))
+    except ValueError:
+        mb = DEFAULT_CACHE_MB
+    return max(0, int(mb * 1024 * 1024))
+
+
+def dataset_key(part_keys, *params):
+    """Khóa của một bộ dữ liệu: khóa nội dung của từng phần nguồn (theo thứ tự) cùng tham số đọc."""
+    return hashlib.sha1(repr((list(part_keys), params)).encode()).hexdigest()[:24]
+
+
+def _version_dir(schema_version):
+    return os.path.join(cache_dir(), f"v{schema_version}")
+
+
+def _path(page, key, schema_version):
+    return os.path.join(_version_dir(schema_version), page, f"{key}.parquet")
+
+
+def load_dataset(page, key, schema_version, use_memory=True):
+    """
+    Bảng đã lưu của `page` ứng với `key` (None nếu chưa có hoặc không đọc được). Kết quả có thể
+    được dùng chung giữa các session: không được sửa trực tiếp.
+    """
+    if not available():
+        return None
+    path = _path(page, key, schema_version)
+    with _lock:
+        df = _memory.get(path)
+        if df is not None:
+            _memory.move_to_end(path)
+            return df
+    if not os.path.exists(path):
+        return None
+    import pandas as pd
+    try:
+        df = pd.read_parquet(path)
+        df.columns.name = df.attrs.pop(_COLUMNS_NAME_ATTR, None)
+        os.utime(path)  # đánh dấu vừa dùng (xóa theo thứ tự lâu không dùng nhất)
+    except Exception as e:
+        logger.warning("Không đọc được bộ nhớ đệm %s: %s", path, e)
+        return None
+    if use_memory:
+        _remember(path, df)
+    return df
+
+
+def store_dataset(page, key, schema_version, df, use_memory=True):
+    """Lưu bảng (ghi ra file tạm rồi đổi tên), xóa mục của phiên bản schema cũ và cắt bớt theo dung lượng."""
+    if not available():
+        return
+    path = _path(page, key, schema_version)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        out = df.copy(deep=False)
+        out.attrs = {**df.attrs, _COLUMNS_NAME_ATTR: df.columns.name}
+        out.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning("Không ghi được bộ nhớ đệm %s: %s", path, e)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return
+    if use_memory:
+        _remember(path, df)
+    _drop_old_versions(schema_version)
+    prune(schema_version)
+
+
+def _remember(path, df):
+    with _lock:
+        _memory[path] = df
+        _memory.move_to_end(path)
+        while len(_memory) > MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+
+
+def _drop_old_versions(schema_version):
+    root = cache_dir()
+    current = f"v{schema_version}"
+    for name in os.listdir(root):
+        if name != current and os.path.isdir(os.path.join(root, name)):
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def prune(schema_version, limit_bytes=None):
+    """Xóa các mục lâu không dùng nhất cho tới khi tổng dung lượng không vượt giới hạn."""
+    limit_bytes = cache_limit_bytes() if limit_bytes is None else limit_bytes
+    entries = []
+    for dirpath, _, filenames in os.walk(_version_dir(schema_version)):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= limit_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        with _lock:
+            _memory.pop(path, None)
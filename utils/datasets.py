@@ -0,0 +1,189 @@
+import logging
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from utils.data_processing import extract_camp_blocks
+from utils.executor import run_frame_job, run_job, run_jobs
+from utils.gsheets import GoogleSheetSource
+from utils.jobs import extract_camp_workbook, extract_social_excel, extract_social_csv
+from utils.readers import open_excel, read_bytes
+from utils.reshape import pivot_wide
+
+logger = logging.getLogger(__name__)
+
+# Cấu hình dữ liệu và các bước chuẩn hóa dùng chung cho các trang dashboard và API cục bộ
+# (utils/api.py), để mọi nơi tính KPI trên cùng một bộ dữ liệu đã chuẩn hóa.
+# Phiên bản schema của bảng đã chuẩn hóa: tăng khi thay đổi cách trích xuất / chuẩn hóa (utils/data_processing.py,
+# các hàm normalize_* bên dưới) để bộ nhớ đệm trên đĩa (utils/dataset_cache.py) không trả về dữ liệu cũ.
+SCHEMA_VERSION = 1
+
+# ========================== DỮ LIỆU SOCIAL ==========================
+METRIC_MAPPING = {
+    "Follower": "Follower",
+    "Lượt xem (views)": "Lượt xem (views)",
+    "Engagement": "Engagement (like/ cmt/ share)",
+    "Engagement (like/ cmt/ share)": "Engagement (like/ cmt/ share)",
+    "Total content put": "Total content publish",
+    "Total content publish": "Total content publish",
+    "video clip": "Video/ clips/ Reels",
+    "Video/ clips/ Reels": "Video/ clips/ Reels",
+    "Reel Text + Ảnh": "Text + Ảnh",
+    "Text + Ảnh": "Text + Ảnh",
+    "Back - text": "Back + text",
+    "Back + text": "Back + text"
+}
+
+REQUIRED_METRICS = [
+    "Follower", "Lượt xem (views)", "Engagement (like/ cmt/ share)",
+    "Total content publish", "Video/ clips/ Reels", "Text + Ảnh", "Back + text"
+]
+
+CONTENT_METRICS = ["Video/ clips/ Reels", "Text + Ảnh", "Back + text"]
+SOCIAL_PIVOT_COLS = ['Kênh', 'Tên kênh', 'Ngày Bắt Đầu', 'Ngày Kết Thúc', 'Mốc thời gian', 'Loại thời gian']
+DEFAULT_KEY_CELLS = "FB,TT,OA,YT,ZL"
+# Khóa trùng giữa các nguồn (kênh, chỉ số, kỳ): khi nhiều file cùng có một khóa thì file sau thắng
+SOCIAL_DEDUP_KEYS = ['Kênh', 'Tên kênh', 'Chỉ số chuẩn', 'Mốc thời gian', 'Ngày Bắt Đầu']
+
+# ========================== DỮ LIỆU QUẢNG CÁO ==========================
+AD_PIVOT_INDEX = ['sheet', 'campaign', 'date']
+AD_DEDUP_KEYS = AD_PIVOT_INDEX + ['criteria']
+AD_NUMERIC_COLS = [
+    'Doanh số', 'Đầu tư ngân sách', 'KH Tiềm Năng (Mess)',
+    'Số Lượng Khách Hàng', 'Số đơn hàng'
+]
+
+
+# ========================== PHẠM VI NẠP ==========================
+# Chỉ trích xuất các cột ngày gần đây (lọc ngay từ header, xem utils/data_processing.py) khi người
+# dùng không cần toàn bộ lịch sử: chi phí nạp tỷ lệ với độ dài khoảng ngày thay vì cả sheet.
+LOAD_WINDOWS = {
+    "Toàn bộ lịch sử": None,
+    "12 tháng gần nhất": 365,
+    "3 tháng gần nhất": 92,
+    "30 ngày gần nhất": 30,
+}
+
+
+def recent_date_range(days, today=None):
+    """Khoảng (từ ngày, đến ngày) cho `days` ngày gần nhất tính đến hôm nay; None = toàn bộ lịch sử."""
+    if not days:
+        return None
+    return (today or date.today()) - timedelta(days=days - 1), None
+
+
+def is_gsheet_link(source):
+    """Nguồn là link Google Sheet (/spreadsheets/d/<id>/...)."""
+    return isinstance(source, str) and "/spreadsheets/d/" in source
+
+
+def gsheet_export_url(sheet_url, fmt):
+    """Đổi link chia sẻ Google Sheet thành link export (`fmt` = 'csv' hoặc 'xlsx')."""
+    return sheet_url.replace('/edit?usp=sharing', f'/export?format={fmt}').replace('/edit', f'/export?format={fmt}')
+
+
+def _to_dates(values):
+    """Chuyển cột ngày (chuỗi dd/mm/yyyy hoặc datetime lẫn lộn) sang datetime, mỗi giá trị chỉ đọc một lần."""
+    codes, uniques = pd.factorize(values)
+    dates = pd.to_datetime(pd.Series(uniques, dtype=object), errors='coerce', dayfirst=True).to_numpy()
+    return np.where(codes >= 0, dates[codes], np.datetime64('NaT'))
+
+
+def merge_sources(source_frames, keys, date_col=None):
+    """
+    Gộp dữ liệu dạng long của nhiều nguồn (list các list DataFrame, theo thứ tự nguồn).
+    Khi nhiều nguồn cùng có một khóa `keys` (vd: cùng kênh, chỉ số và kỳ), chỉ giữ các dòng của
+    nguồn sau cùng; các dòng trùng bên trong một nguồn được giữ nguyên như khi chỉ có một file.
+    `date_col` được chuẩn hóa sang datetime trước để cùng một ngày ở các định dạng khác nhau khớp nhau.
+    """
+    parts = [(i, df) for i, frames in enumerate(source_frames) for df in frames]
+    df = pd.concat([df for _, df in parts], ignore_index=True)
+    if len({i for i, _ in parts}) <= 1:
+        return df
+    if date_col is not None:
+        df[date_col] = _to_dates(df[date_col])
+    source = pd.Series(np.repeat([i for i, _ in parts], [len(f) for _, f in parts]), index=df.index)
+    latest = source.groupby([df[k] for k in keys], dropna=False, sort=False).transform('max')
+    return df[(source == latest).to_numpy()].reset_index(drop=True)
+
+
+def normalize_ads_pivot(df_pivot):
+    """Chuẩn hóa bảng quảng cáo dạng wide: ngày hợp lệ, các cột số luôn có mặt và không rỗng."""
+    # Ngày đọc từ CSV là chuỗi dạng dd/mm/yyyy nên cần dayfirst=True
+    df_pivot['date'] = pd.to_datetime(df_pivot['date'], errors='coerce', dayfirst=True)
+    df_pivot.dropna(subset=['date'], inplace=True) # Loại bỏ các dòng có ngày không hợp lệ
+    for col in AD_NUMERIC_COLS:
+        if col in df_pivot.columns:
+            df_pivot[col] = pd.to_numeric(df_pivot[col], errors='coerce').fillna(0)
+        else:
+            df_pivot[col] = 0
+    return df_pivot
+
+
+def normalize_social_wide(df_wide):
+    """Chuẩn hóa bảng social dạng wide: đủ các chỉ số, tính lại tổng số bài đăng, sắp xếp cột."""
+    for col in REQUIRED_METRICS:
+        if col not in df_wide.columns:
+            df_wide[col] = 0
+        else:
+            df_wide[col] = pd.to_numeric(df_wide[col], errors='coerce').fillna(0)
+    # Tính tổng số nội dung được đăng (Total content publish) từ các loại nội dung chi tiết
+    df_wide['Total content publish'] = df_wide[CONTENT_METRICS].sum(axis=1)
+    return df_wide[SOCIAL_PIVOT_COLS + REQUIRED_METRICS]
+
+
+# ========================== NẠP DỮ LIỆU NGOÀI STREAMLIT ==========================
+
+def load_ads_dataset(source, sheets=None, date_range=None):
+    """
+    Đọc, trích xuất và chuẩn hóa dữ liệu quảng cáo từ link Google Sheet, URL hoặc đường dẫn
+    file .xlsx (mặc định: mọi sheet). Sheet lỗi được ghi log và bỏ qua.
+    `date_range` = (từ ngày, đến ngày): chỉ trích xuất các ngày trong khoảng này.
+    """
+    if is_gsheet_link(source):
+        xls = GoogleSheetSource(source)
+        sheets = [s for s in (sheets or xls.sheet_names) if s in xls.sheet_names]
+        xls.prefetch(sheets)
+        raw = {s: xls.parse(s, header=None) for s in sheets}
+        extracted = dict(zip(raw, run_jobs([(extract_camp_blocks, (df,), {"date_range": date_range})
+                                                for df in raw.values()])))
+    else:
+        data = read_bytes(source)
+        with open_excel(data) as xls:
+            names, engine = xls.sheet_names, xls.engine
+        sheets = [s for s in (sheets or names) if s in names]
+        extracted = run_job(extract_camp_workbook, data, sheets, engine=engine, date_range=date_range)
+
+    frames = []
+    for sheet, df in extracted.items():
+        if isinstance(df, Exception):
+            logger.warning("Bỏ qua sheet '%s': %s", sheet, df)
+        elif not df.empty:
+            df['sheet'] = sheet
+            frames.append(df)
+    if not frames:
+        raise ValueError("Không trích xuất được dữ liệu từ bất kỳ sheet nào.")
+    df_full = pd.concat(frames, ignore_index=True)
+    df_pivot = run_frame_job(pivot_wide, df_full[AD_DEDUP_KEYS + ['value']], index=AD_PIVOT_INDEX,
+                             columns='criteria', values='value', aggfunc='first')
+    return normalize_ads_pivot(df_pivot)
+
+
+def load_social_dataset(source, key_cells=None, date_range=None):
+    """
+    Đọc, trích xuất và chuẩn hóa dữ liệu social từ link Google Sheet, URL hoặc file Excel.
+    `date_range` = (từ ngày, đến ngày): chỉ trích xuất các kỳ bắt đầu trong khoảng này.
+    """
+    key_cells = [s.strip().upper() for s in (key_cells or DEFAULT_KEY_CELLS).split(",") if s.strip()]
+    if is_gsheet_link(source):
+        df_long = run_job(extract_social_csv, read_bytes(gsheet_export_url(source, 'csv')), key_cells,
+                          METRIC_MAPPING, date_range=date_range)
+    else:
+        df_long, _ = run_job(extract_social_excel, read_bytes(source), key_cells, METRIC_MAPPING,
+                             date_range=date_range)
+    if df_long.empty:
+        raise ValueError("Không trích xuất được dữ liệu social hợp lệ.")
+    df_wide = run_frame_job(pivot_wide, df_long[SOCIAL_PIVOT_COLS + ['Chỉ số chuẩn', 'Giá trị']],
+                            index=SOCIAL_PIVOT_COLS, columns='Chỉ số chuẩn', values='Giá trị', aggfunc='sum')
+    return normalize_social_wide(df_wide)
@@ -0,0 +1,193 @@
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+# Streamlit chạy script của mọi session trong các thread của cùng một tiến trình, nên một bước
+# nặng (đọc Excel, trích xuất, pivot, xuất Excel) giữ GIL sẽ làm các session khác bị giật.
+# Các bước này được đẩy sang một process pool dùng chung, có giới hạn số tiến trình và số job
+# chờ. Hàm chạy trong pool phải là hàm cấp module (pickle được) và không dùng streamlit.
+WORKERS_ENV_VAR = "DASHBOARD_POOL_WORKERS"  # 0 = tắt pool, chạy trực tiếp trong thread của session
+TIMEOUT_ENV_VAR = "DASHBOARD_JOB_TIMEOUT"
+DEFAULT_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+DEFAULT_JOB_TIMEOUT = 300  # giây
+POOL_MIN_ROWS_ENV_VAR = "DASHBOARD_POOL_MIN_ROWS"
+DEFAULT_POOL_MIN_ROWS = 1_000_000  # bảng nhỏ hơn: pickle qua lại tốn ngang chính job (benchmarks/bench_executor.py)
+MAX_PENDING_PER_WORKER = 4
+
+_pool = None
+_slots = None
+_pool_lock = threading.Lock()
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+class JobTimeout(TimeoutError):
+    """Job không hoàn thành trong thời gian cho phép (hoặc hàng đợi của pool đã đầy)."""
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def pool_workers():
+    """Số tiến trình của pool (đặt qua biến môi trường DASHBOARD_POOL_WORKERS)."""
+    return max(0, _env_int(WORKERS_ENV_VAR, DEFAULT_WORKERS))
+
+
+def job_timeout():
+    """Thời gian tối đa (giây) cho mỗi lần gọi, đặt qua biến môi trường DASHBOARD_JOB_TIMEOUT."""
+    return max(1, _env_int(TIMEOUT_ENV_VAR, DEFAULT_JOB_TIMEOUT))
+
+
+def pool_min_rows():
+    """Số dòng tối thiểu để `run_frame_job` gửi bảng sang pool, đặt qua DASHBOARD_POOL_MIN_ROWS."""
+    return max(0, _env_int(POOL_MIN_ROWS_ENV_VAR, DEFAULT_POOL_MIN_ROWS))
+
+
+def queue_depth():
+    """Số job đang chờ hoặc đang chạy trong pool (của mọi session)."""
+    return _pending
+
+
+def _get_pool():
+    """Pool dùng chung cho cả tiến trình, tạo lần đầu khi cần. None nếu pool bị tắt."""
+    global _pool, _slots
+    with _pool_lock:
+        if _pool is None:
+            n_workers = pool_workers()
+            if n_workers == 0:
+                return None, None
+            # spawn: tiến trình con không kế thừa các thread của streamlit như khi fork
+            _pool = ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context("spawn"))
+            _slots = threading.BoundedSemaphore(n_workers * MAX_PENDING_PER_WORKER)
+        return _pool, _slots
+
+
+def _discard_pool(pool):
+    """Bỏ một pool bị hỏng hoặc có job treo: dừng các tiến trình con, lần gọi sau sẽ tạo pool mới."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    for proc in list((getattr(pool, "_processes", None) or {}).values()):
+        proc.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _picklable(fn):
+    try:
+        pickle.dumps(fn)
+        return True
+    except Exception:
+        return False
+
+
+def _call_inline(fn, args, kwargs):
+    try:
+        return fn(*args, **kwargs)
+    except Exception as e:
+        return e
+
+
+def _job_done(slots):
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+    slots.release()
+
+
+def run_jobs(calls, timeout=None, on_submit=None):
+    """
+    Chạy nhiều job `(fn, args, kwargs)` song song trong pool và chờ tất cả hoàn thành.
+    Trả về danh sách kết quả theo đúng thứ tự; job lỗi trả về chính đối tượng Exception
+    (JobTimeout nếu quá thời gian). Nếu pool bị tắt, bị hỏng hoặc `fn` không pickle được
+    thì job chạy trực tiếp trong thread hiện tại. `on_submit(future)` được gọi với Future của mỗi
+    job gửi vào pool: người gọi có thể `future.cancel()` job còn đang chờ (kết quả là CancelledError).
+    """
+    global _pending
+    timeout = job_timeout() if timeout is None else timeout
+    deadline = time.monotonic() + timeout
+    pool, slots = _get_pool()
+
+    futures = []
+    for fn, args, kwargs in calls:
+        if pool is None or not _picklable(fn):
+            futures.append(None)
+            continue
+        if not slots.acquire(timeout=max(0, deadline - time.monotonic())):
+            futures.append(JobTimeout("Hàng đợi xử lý nền đang đầy, vui lòng thử lại sau."))
+            continue
+        with _pending_lock:
+            _pending += 1
+        try:
+            future = pool.submit(fn, *args, **kwargs)
+        except (BrokenProcessPool, RuntimeError):
+            _job_done(slots)
+            _discard_pool(pool)
+            futures.append(None)
+            continue
+        future.add_done_callback(lambda _f, s=slots: _job_done(s))
+        futures.append(future)
+        if on_submit is not None:
+            on_submit(future)
+
+    results = []
+    for (fn, args, kwargs), future in zip(calls, futures):
+        if future is None:
+            results.append(_call_inline(fn, args, kwargs))
+        elif isinstance(future, Exception):
+            results.append(future)
+        else:
+            try:
+                results.append(future.result(timeout=max(0, deadline - time.monotonic())))
+            except FutureTimeout:
+                # Không thể dừng riêng một job đang chạy: bỏ cả pool (các job khác sẽ chạy lại trực tiếp)
+                if not future.cancel():
+                    _discard_pool(pool)
+                results.append(JobTimeout(f"Quá thời gian xử lý ({timeout} giây)."))
+            except CancelledError as e:
+                if _pool is pool:
+                    results.append(e)  # người gọi tự hủy job (qua `on_submit`)
+                else:
+                    # Job đang chờ bị hủy khi một lần gọi khác bỏ pool: chạy lại trực tiếp
+                    results.append(_call_inline(fn, args, kwargs))
+            except BrokenProcessPool:
+                _discard_pool(pool)
+                results.append(_call_inline(fn, args, kwargs))
+            except Exception as e:
+                results.append(e)
+    return results
+
+
+def run_job(fn, *args, timeout=None, **kwargs):
+    """Chạy một job trong pool và trả về kết quả; lỗi của job (kể cả JobTimeout) được raise lại."""
+    result = run_jobs([(fn, args, kwargs)], timeout=timeout)[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def run_frame_job(fn, df, *args, timeout=None, **kwargs):
+    """
+    Như `run_job` cho job có đối số đầu là DataFrame `df`: bảng ít hơn `pool_min_rows()` dòng
+    được xử lý trực tiếp, vì pickle bảng sang tiến trình con và kết quả về tốn hơn chính job.
+    """
+    if len(df) < pool_min_rows():
+        return fn(df, *args, **kwargs)
+    return run_job(fn, df, *args, timeout=timeout, **kwargs)
+
+
+def render_pool_status(st):
+    """Hiển thị độ dài hàng đợi của pool ở sidebar."""
+    n_workers = pool_workers()
+    if n_workers == 0:
+        st.sidebar.caption("⚙️ Xử lý nền: tắt (chạy trực tiếp)")
+    else:
+        st.sidebar.caption(f"⚙️ Hàng đợi xử lý nền: {queue_depth()} job · {n_workers} tiến trình")
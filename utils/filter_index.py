@@ -0,0 +1,162 @@
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+class FilterIndex:
+    """
+    Chỉ mục lọc cho các bộ lọc ở sidebar, được dựng một lần khi nạp dữ liệu:
+    - mỗi giá trị của các chiều (sheet, campaign, kênh...) có một bitmap dòng (đã nén bit);
+    - cột ngày được sắp xếp sẵn để lấy khoảng ngày bằng tìm kiếm nhị phân.
+    Mọi tổ hợp bộ lọc được trả lời bằng phép giao bitmap; vài mặt nạ gần nhất được ghi nhớ.
+    """
+
+    def __init__(self, df, dims, date_col, cache_size=8):
+        self.n_rows = len(df)
+        self.dims = list(dims)
+        self._n_bytes = (self.n_rows + 7) // 8
+        self._values = {}
+        self._codes_of = {}
+        self._bitmaps = {}
+        self._valid = {}
+        positions = np.arange(self.n_rows, dtype=np.int64)
+        for dim in self.dims:
+            codes, uniques = pd.factorize(df[dim], sort=True)
+            bitmaps = np.zeros((len(uniques), self._n_bytes), dtype=np.uint8)
+            valid = codes >= 0
+            np.bitwise_or.at(
+                bitmaps,
+                (codes[valid], positions[valid] >> 3),
+                (np.uint8(0x80) >> (positions[valid] & 7).astype(np.uint8)),
+            )
+            self._values[dim] = list(uniques)
+            self._codes_of[dim] = {v: k for k, v in enumerate(uniques)}
+            self._bitmaps[dim] = bitmaps
+            # Dòng có giá trị rỗng ở chiều này không thuộc bitmap nào (cần khi lấy phần bù)
+            self._valid[dim] = None if valid.all() else np.packbits(valid)
+
+        # So sánh theo ngày (giống `.dt.date`), NaT được xếp cuối và không bao giờ khớp
+        days = pd.to_datetime(df[date_col]).to_numpy().astype("datetime64[D]")
+        self._date_order = np.argsort(days, kind="stable")
+        self._sorted_days = days[self._date_order]
+
+        self._cache_size = cache_size
+        self._masks = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def values(self, dim):
+        """Danh sách giá trị (đã sắp xếp) của một chiều."""
+        return self._values[dim]
+
+    # Hai hàm dưới trả về None khi bộ lọc giữ lại mọi dòng, để khỏi phải AND với bitmap toàn 1
+    def _dim_bitmap(self, dim, selected):
+        codes_of = self._codes_of[dim]
+        codes = sorted({codes_of[v] for v in selected if v in codes_of})
+        n_values = len(codes_of)
+        if len(codes) == n_values:
+            return self._valid[dim]
+        if not codes:
+            return np.zeros(self._n_bytes, dtype=np.uint8)
+        bitmaps = self._bitmaps[dim]
+        if len(codes) <= n_values // 2:
+            return np.bitwise_or.reduce(bitmaps[codes], axis=0)
+        # Chọn nhiều hơn một nửa: lấy phần bù của các giá trị không được chọn
+        others = np.setdiff1d(np.arange(n_values), codes)
+        bitmap = ~np.bitwise_or.reduce(bitmaps[others], axis=0)
+        if self._valid[dim] is not None:
+            bitmap &= self._valid[dim]
+        return bitmap
+
+    def _date_bitmap(self, start_date, end_date):
+        lo = np.searchsorted(self._sorted_days, np.datetime64(start_date, "D"), side="left")
+        hi = np.searchsorted(self._sorted_days, np.datetime64(end_date, "D"), side="right")
+        if lo == 0 and hi == self.n_rows:
+            return None
+        bits = np.zeros(self.n_rows, dtype=bool)
+        bits[self._date_order[lo:hi]] = True
+        return np.packbits(bits)
+
+    def mask(self, start_date=None, end_date=None, **selections):
+        """
+        Mặt nạ boolean (numpy) cho khoảng ngày [start_date, end_date] và các lựa chọn theo chiều,
+        ví dụ `mask(start, end, sheet=[...], campaign=[...])`. Chiều không truyền vào = không lọc.
+        """
+        key = (start_date, end_date) + tuple(
+            (dim, frozenset(selections[dim])) for dim in self.dims if dim in selections
+        )
+        with self._lock:
+            cached = self._masks.get(key)
+            if cached is not None:
+                self._masks.move_to_end(key)
+                self.stats["hits"] += 1
+                return cached
+
+        parts = [self._dim_bitmap(dim, selections[dim]) for dim in self.dims if dim in selections]
+        if start_date is not None and end_date is not None:
+            parts.append(self._date_bitmap(start_date, end_date))
+        parts = [p for p in parts if p is not None]
+
+        if not parts:
+            result = np.ones(self.n_rows, dtype=bool)
+        else:
+            combined = parts[0] if len(parts) == 1 else np.bitwise_and.reduce(parts, axis=0)
+            result = np.unpackbits(combined, count=self.n_rows).astype(bool)
+        result.setflags(write=False)
+
+        with self._lock:
+            self._masks[key] = result
+            self._masks.move_to_end(key)
+            while len(self._masks) > self._cache_size:
+                self._masks.popitem(last=False)
+            self.stats["misses"] += 1
+        return result
+
+
+def _fold(text):
+    """Chuỗi để so khớp: chữ thường, bỏ dấu tiếng Việt (gõ "chien dich" vẫn tìm được "Chiến dịch")."""
+    text = unicodedata.normalize('NFD', str(text).casefold().replace('đ', 'd'))
+    return ''.join(ch for ch in text if not unicodedata.combining(ch))
+
+
+class ValueSearch:
+    """
+    Tìm kiếm phía server trên các giá trị của một chiều (vd: tên chiến dịch), dựng một lần khi nạp
+    dữ liệu, để widget chỉ phải gửi xuống trình duyệt một danh sách kết quả ngắn:
+    - khớp tiền tố bằng tìm kiếm nhị phân trên danh sách khóa (không dấu) đã sắp xếp;
+    - nếu chưa đủ kết quả thì bổ sung các giá trị chứa chuỗi tìm kiếm ở giữa tên;
+    - `groups`: các giá trị theo từng giá trị của `group_dim` (vd: chiến dịch của từng người chạy).
+    """
+
+    def __init__(self, df, dim, group_dim=None):
+        pairs = df[[dim] + ([group_dim] if group_dim else [])].dropna().drop_duplicates()
+        self.values = sorted(pairs[dim].unique())
+        folded = [_fold(v) for v in self.values]
+        self._order = sorted(range(len(folded)), key=folded.__getitem__)
+        self._keys = [folded[i] for i in self._order]
+        self.groups = {}
+        if group_dim:
+            self.groups = {g: sorted(v) for g, v in pairs.groupby(group_dim, sort=True)[dim]}
+
+    def search(self, query, limit, groups=None):
+        """
+        Tối đa `limit` giá trị khớp `query` (tiền tố trước, rồi đến chứa chuỗi), theo thứ tự tên;
+        `groups`: chỉ lấy các giá trị thuộc các nhóm này.
+        """
+        allowed = None if groups is None else {v for g in groups for v in self.groups.get(g, ())}
+        q = _fold(query.strip())
+        if not q:
+            candidates = self.values
+        else:
+            lo = bisect_left(self._keys, q)
+            hi = bisect_left(self._keys, q + '\uffff')
+            prefix = sorted(self._order[lo:hi])
+            if len(prefix) < limit:
+                seen = set(prefix)
+                prefix += [i for i, key in zip(self._order, self._keys) if q in key and i not in seen]
+            candidates = [self.values[i] for i in prefix]
+        return [v for v in candidates if allowed is None or v in allowed][:limit]
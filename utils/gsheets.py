@@ -0,0 +1,150 @@
+import html
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlparse
+
+# Tải từng worksheet của Google Sheet (public) dưới dạng CSV thay vì cả workbook .xlsx.
+# Địa chỉ máy chủ được lấy từ chính link người dùng nhập, nên có thể trỏ link tới
+# một HTTP server cục bộ giả lập Google Sheets để kiểm thử.
+REQUEST_TIMEOUT = (5, 30)  # (kết nối, đọc) tính bằng giây
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.5
+POOL_SIZE = 8
+SHEET_LIST_TTL = 300  # giây
+
+_ID_RE = re.compile(r"/spreadsheets/d/([a-zA-Z0-9_-]+)")
+# Danh sách sheet trong trang htmlview: khai báo JS `items.push({name: "...", ..., gid: "..."})`
+# hoặc các nút chuyển sheet `<li id="sheet-button-<gid>"><a ...>Tên</a></li>`.
+_JS_ITEM_RE = re.compile(r'items\.push\(\{name:\s*"((?:[^"\\]|\\.)*)".*?gid:\s*"(\d+)"', re.S)
+_BUTTON_RE = re.compile(r'id="sheet-button-(\d+)"[^>]*>\s*<a[^>]*>(.*?)</a>', re.S)
+_JS_ESCAPE_RE = re.compile(r"\\(x[0-9a-fA-F]{2}|u[0-9a-fA-F]{4}|.)")
+
+_session = None
+_session_lock = threading.Lock()
+_sheet_list_cache = {}
+_sheet_list_lock = threading.Lock()
+
+
+def _get_session():
+    """HTTP session dùng chung (connection pool + tự thử lại khi lỗi mạng/5xx/429)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            retry = Retry(
+                total=MAX_RETRIES, backoff_factor=RETRY_BACKOFF,
+                status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET",),
+            )
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def _split_url(sheet_url):
+    """Tách link Google Sheet thành (địa chỉ gốc, ID của spreadsheet)."""
+    m = _ID_RE.search(sheet_url)
+    if not m:
+        raise ValueError("Link không đúng định dạng Google Sheet (/spreadsheets/d/<id>/...).")
+    parsed = urlparse(sheet_url)
+    return f"{parsed.scheme}://{parsed.netloc}", m.group(1)
+
+
+def _get(url):
+    resp = _get_session().get(url, timeout=REQUEST_TIMEOUT)
+    resp.raise_for_status()
+    return resp
+
+
+def download(url):
+    """
+    Tải nội dung một URL (bytes) qua session dùng chung: có timeout kết nối / đọc và tự thử lại,
+    nên máy chủ treo không giữ worker mãi mãi.
+    """
+    return _get(url).content
+
+
+def _unescape_js(text):
+    def repl(m):
+        esc = m.group(1)
+        if esc[0] in "xu" and len(esc) > 1:
+            return chr(int(esc[1:], 16))
+        return esc
+    return html.unescape(_JS_ESCAPE_RE.sub(repl, text))
+
+
+def list_worksheets(sheet_url):
+    """
+    Trả về danh sách (tên sheet, gid) của Google Sheet, đọc từ trang htmlview (nhẹ hơn
+    nhiều so với tải cả file .xlsx). Kết quả được cache trong SHEET_LIST_TTL giây.
+    """
+    base, sheet_id = _split_url(sheet_url)
+    key = (base, sheet_id)
+    with _sheet_list_lock:
+        cached = _sheet_list_cache.get(key)
+        if cached and time.monotonic() - cached[0] < SHEET_LIST_TTL:
+            return cached[1]
+
+    page = _get(f"{base}/spreadsheets/d/{sheet_id}/htmlview").text
+    sheets = [(_unescape_js(name), gid) for name, gid in _JS_ITEM_RE.findall(page)]
+    if not sheets:
+        sheets = [(html.unescape(re.sub(r"<[^>]+>", "", name)).strip(), gid) for gid, name in _BUTTON_RE.findall(page)]
+    if not sheets:
+        raise ValueError("Không đọc được danh sách sheet. Hãy chắc chắn link là public.")
+
+    with _sheet_list_lock:
+        _sheet_list_cache[key] = (time.monotonic(), sheets)
+    return sheets
+
+
+def fetch_worksheet(sheet_url, gid):
+    """Tải một worksheet (theo gid) dưới dạng CSV và trả về DataFrame thô (header=None)."""
+    import pandas as pd
+    base, sheet_id = _split_url(sheet_url)
+    resp = _get(f"{base}/spreadsheets/d/{sheet_id}/export?format=csv&gid={gid}")
+    return pd.read_csv(BytesIO(resp.content), header=None)
+
+
+def fetch_worksheets(sheet_url, gids, max_workers=POOL_SIZE):
+    """Tải song song nhiều worksheet. `gids` là dict {tên sheet: gid}; trả về {tên sheet: DataFrame}."""
+    if not gids:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(gids))) as pool:
+        futures = {name: pool.submit(fetch_worksheet, sheet_url, gid) for name, gid in gids.items()}
+        return {name: f.result() for name, f in futures.items()}
+
+
+class GoogleSheetSource:
+    """
+    Nguồn dữ liệu Google Sheet đọc theo từng worksheet. Có cùng giao diện tối thiểu với
+    `pd.ExcelFile` (`sheet_names`, `parse`, `engine`) để trang dashboard dùng thay thế được;
+    chỉ những sheet thực sự được đọc mới phải tải về.
+    """
+    engine = "csv (từng sheet)"
+
+    def __init__(self, sheet_url):
+        self.sheet_url = sheet_url
+        self._gids = dict(list_worksheets(sheet_url))
+        self.sheet_names = list(self._gids)
+        self._frames = {}
+
+    def prefetch(self, names):
+        """Tải song song các sheet được chọn mà chưa có trong bộ nhớ."""
+        missing = {n: self._gids[n] for n in names if n in self._gids and n not in self._frames}
+        self._frames.update(fetch_worksheets(self.sheet_url, missing))
+
+    def parse(self, sheet_name, header=None):
+        """Trả về dữ liệu thô của một sheet (chỉ hỗ trợ header=None như cách trang đang đọc)."""
+        if header is not None:
+            raise ValueError("GoogleSheetSource chỉ hỗ trợ header=None.")
+        if sheet_name not in self._frames:
+            self.prefetch([sheet_name])
+        return self._frames[sheet_name]
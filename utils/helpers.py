@@ -1,10 +1,11 @@
-import pandas as pd
 from io import BytesIO
 
 def to_excel(df):
     """
     Chuyển đổi một DataFrame thành file Excel trong bộ nhớ (bytes).
     """
+    # Chỉ nạp pandas/xlsxwriter khi thực sự xuất file
+    import pandas as pd
     output = BytesIO()
     # Sử dụng 'with' để đảm bảo writer được đóng đúng cách
     with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
@@ -12,3 +13,86 @@ def to_excel(df):
     # Lấy giá trị từ buffer sau khi writer đã đóng
     processed_data = output.getvalue()
     return processed_data
+
+
+def ads_kpi_values(kpis):
+    """
+    Các chỉ số phái sinh (ROAS, CAC, tỷ lệ chuyển đổi, ...) từ tổng các chỉ số quảng cáo
+    (kết quả `ads_kpi_totals`). Phép chia có mẫu số bằng 0 trả về 0.
+    """
+    tong_doanh_so = kpis['Doanh số']
+    tong_ngan_sach = kpis['Đầu tư ngân sách']
+    tong_kh_tiem_nang = kpis['KH Tiềm Năng (Mess)']
+    tong_kh_moi = kpis['Số Lượng Khách Hàng']
+    tong_don_hang = tong_kh_moi 
+    return {
+        **kpis,
+        'ROAS': tong_doanh_so / tong_ngan_sach if tong_ngan_sach > 0 else 0,
+        'Chi phí / mess mới': tong_ngan_sach / tong_kh_tiem_nang if tong_kh_tiem_nang > 0 else 0,
+        'CAC': tong_ngan_sach / tong_kh_moi if tong_kh_moi > 0 else 0,
+        'Tỷ lệ chuyển đổi (%)': (tong_kh_moi / tong_kh_tiem_nang) * 100 if tong_kh_tiem_nang > 0 else 0,
+        'AOV': tong_doanh_so / tong_don_hang if tong_don_hang > 0 else 0,
+        'Số GD TB / KH': tong_don_hang / tong_kh_moi if tong_kh_moi > 0 else 0,
+    }
+
+
+def ads_kpi_cards(kpis):
+    """
+    Các thẻ KPI của trang quảng cáo từ tổng các chỉ số (kết quả `ads_kpi_totals`).
+    Trả về 2 hàng, mỗi hàng là list (nhãn, giá trị đã định dạng).
+    """
+    v = ads_kpi_values(kpis)
+    return [
+        [
+            ("Doanh số", f"{v['Doanh số']:,.0f} VNĐ"),
+            ("Đầu tư ngân sách", f"{v['Đầu tư ngân sách']:,.0f} VNĐ"),
+            ("ROAS", f"{v['ROAS']:.2f}"),
+            ("KH Tiềm Năng (Mess)", f"{v['KH Tiềm Năng (Mess)']:,.0f}"),
+            ("Chi phí / mess mới", f"{v['Chi phí / mess mới']:,.0f} VNĐ"),
+        ],
+        [
+            ("Số Lượng Khách Hàng", f"{v['Số Lượng Khách Hàng']:,.0f}"),
+            ("Chi phí / KH mới (CAC)", f"{v['CAC']:,.0f} VNĐ"),
+            ("Tỷ lệ chuyển đổi", f"{v['Tỷ lệ chuyển đổi (%)']:.2f}%"),
+            ("Giá Trị TB đơn (AOV)", f"{v['AOV']:,.0f} VNĐ"),
+            ("Số GD TB / KH", f"{v['Số GD TB / KH']:.2f}"),
+        ],
+    ]
+
+
+def social_kpi_cards(kpis):
+    """Các thẻ KPI của trang social từ kết quả `social_kpi_totals` (1 hàng)."""
+    return [[
+        ("Tổng Lượt xem (Views)", f"{int(kpis['Lượt xem (views)']):,}"),
+        ("Tổng Tương tác (Engagement)", f"{int(kpis['Engagement (like/ cmt/ share)']):,}"),
+        ("Follower (Cuối kỳ)", f"{int(kpis['Follower']):,}"),
+        ("Tổng số bài đăng", f"{int(kpis['Total content publish']):,}"),
+    ]]
+
+
+def render_kpi_cards(st, cards):
+    """Hiển thị các hàng thẻ KPI bằng st.metric."""
+    for row in cards:
+        for col, (label, value) in zip(st.columns(len(row)), row):
+            col.metric(label, value)
+
+
+def filter_container(st, key, batch):
+    """
+    Nơi đặt các widget lọc ở sidebar. Chế độ gom thay đổi (`batch`) đặt chúng trong một form:
+    đổi widget không chạy lại trang, mọi thay đổi được áp dụng cùng lúc khi bấm nút Áp dụng.
+    """
+    return st.sidebar.form(key, border=False) if batch else st.sidebar
+
+
+def applied_filters(st, key, pending, data_token, batch, submitted):
+    """
+    Bộ lọc đang áp dụng (lưu trong session_state[key]) và trang còn thay đổi chưa áp dụng hay không.
+    `pending` là giá trị hiện trên các widget; ở chế độ gom thay đổi nó chỉ được áp dụng khi bấm
+    Áp dụng (`submitted`) hoặc khi dữ liệu đổi (`data_token`), còn lại trang giữ bộ lọc cũ.
+    """
+    state = st.session_state.get(key)
+    if not batch or submitted or state is None or state[0] != data_token:
+        state = (data_token, pending)
+        st.session_state[key] = state
+    return state[1], state[1] != pending
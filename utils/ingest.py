@@ -0,0 +1,105 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from utils.executor import run_jobs
+
+# Nạp nhiều nguồn dữ liệu (nhiều file upload / nhiều link) cùng lúc: tải các link song song
+# bằng thread (I/O), trích xuất song song trong process pool, và ghi nhớ kết quả trích xuất
+# theo nội dung của từng nguồn để các lần chạy lại chỉ xử lý những nguồn đã thay đổi.
+# Kết quả trong bộ nhớ đệm được dùng chung giữa các session: không được sửa trực tiếp.
+CACHE_SIZE_ENV_VAR = "DASHBOARD_SOURCE_CACHE_SIZE"
+DEFAULT_CACHE_SIZE = 16
+FETCH_WORKERS = 8
+FETCH_TIMEOUT = 120  # giây chờ tối đa cho cả lượt tải song song (mỗi lần tải còn có timeout riêng)
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def cache_size():
+    """Số kết quả trích xuất được giữ (đặt qua biến môi trường DASHBOARD_SOURCE_CACHE_SIZE)."""
+    try:
+        return max(0, int(os.environ.get(CACHE_SIZE_ENV_VAR, DEFAULT_CACHE_SIZE)))
+    except ValueError:
+        return DEFAULT_CACHE_SIZE
+
+
+def content_key(data, *params):
+    """Khóa của một nguồn dạng bytes (nội dung file) cùng các tham số trích xuất."""
+    h = hashlib.sha1(data)
+    h.update(repr(params).encode())
+    return h.hexdigest()
+
+
+def frame_key(df, *params):
+    """Khóa của một nguồn đã đọc sẵn thành DataFrame thô (vd: một sheet tải từ Google Sheet)."""
+    import pandas as pd
+    h = hashlib.sha1(repr((df.shape, params)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def fetch_all(fn, items, max_workers=FETCH_WORKERS, timeout=FETCH_TIMEOUT):
+    """
+    Gọi `fn(item)` song song trong thread (tải link); kết quả theo thứ tự, lỗi trả về Exception.
+    Nguồn chưa xong sau `timeout` giây trả về TimeoutError thay vì chặn cả trang; thread của nó
+    tự kết thúc khi lần tải hết timeout.
+    """
+    items = list(items)
+    if not items:
+        return []
+    threads = ThreadPoolExecutor(max_workers=min(max_workers, len(items)))
+    try:
+        futures = [threads.submit(fn, item) for item in items]
+        wait(futures, timeout=timeout)
+    finally:
+        threads.shutdown(wait=False, cancel_futures=True)
+    results = []
+    for future in futures:
+        if not future.done():
+            results.append(TimeoutError(f"Quá {timeout} giây mà chưa tải xong."))
+        elif future.cancelled():
+            results.append(TimeoutError("Chưa bắt đầu tải trước khi hết thời gian chờ."))
+        else:
+            results.append(future.exception() or future.result())
+    return results
+
+
+def run_cached(calls, use_cache=True):
+    """
+    Chạy các job trích xuất `(khóa, fn, args, kwargs)`: job có khóa đã nằm trong bộ nhớ đệm được
+    dùng lại, các job còn lại chạy song song trong process pool. Trả về (kết quả theo thứ tự,
+    số nguồn được dùng lại). Job lỗi trả về Exception và không được ghi nhớ.
+    """
+    results = [None] * len(calls)
+    missing = []
+    with _cache_lock:
+        for i, (key, *_) in enumerate(calls):
+            cached = _cache.get(key) if use_cache else None
+            if cached is None:
+                missing.append(i)
+            else:
+                _cache.move_to_end(key)
+                results[i] = cached
+        _stats["hits"] += len(calls) - len(missing)
+        _stats["misses"] += len(missing)
+
+    for i, result in zip(missing, run_jobs([calls[i][1:] for i in missing])):
+        results[i] = result
+        if use_cache and not isinstance(result, Exception):
+            with _cache_lock:
+                _cache[calls[i][0]] = result
+                _cache.move_to_end(calls[i][0])
+                while len(_cache) > cache_size():
+                    _cache.popitem(last=False)
+    return results, len(calls) - len(missing)
+
+
+def cache_stats():
+    """Số lần dùng lại / phải trích xuất lại và số kết quả đang được giữ."""
+    with _cache_lock:
+        return dict(_stats, size=len(_cache))
@@ -0,0 +1,61 @@
+# Các job chạy trong process pool (xem utils/executor.py): hàm cấp module, pickle được,
+# không dùng streamlit. Mỗi job gộp các bước nặng để dữ liệu thô không phải gửi qua lại
+# giữa các tiến trình.
+from io import BytesIO
+
+from utils.data_processing import extract_camp_blocks, extract_social_data, recent_columns
+from utils.readers import open_excel, read_excel
+
+
+def extract_camp_workbook(data, sheet_names, engine=None, recent_cols=None, date_range=None):
+    """
+    Mở workbook (bytes) và trích xuất các block camp của từng sheet được chọn.
+    Trả về {tên sheet: DataFrame đã trích xuất, hoặc Exception nếu sheet đó lỗi}.
+    `recent_cols`: chỉ trích xuất từng ấy cột ngày cuối cùng (bản xem trước).
+    `date_range`: chỉ trích xuất các cột ngày trong khoảng (từ ngày, đến ngày).
+    """
+    results = {}
+    with open_excel(data, engine=engine) as xls:
+        for sheet in sheet_names:
+            try:
+                results[sheet] = extract_camp_blocks(recent_columns(xls.parse(sheet, header=None), recent_cols, 2),
+                                                     date_range=date_range)
+            except Exception as e:
+                results[sheet] = e
+    return results
+
+
+def extract_camp_frames(frames, date_range=None):
+    """
+    Trích xuất các block camp từ các sheet đã đọc sẵn ({tên sheet: DataFrame thô}, vd: tải từ
+    Google Sheet). Trả về {tên sheet: DataFrame đã trích xuất, hoặc Exception nếu sheet đó lỗi}.
+    """
+    results = {}
+    for sheet, df_raw in frames.items():
+        try:
+            results[sheet] = extract_camp_blocks(df_raw, date_range=date_range)
+        except Exception as e:
+            results[sheet] = e
+    return results
+
+
+def extract_social_excel(data, key_cells, metric_mapping, recent_cols=None, date_range=None):
+    """
+    Đọc file Excel social (bytes) rồi trích xuất dữ liệu dạng long. Trả về (DataFrame, engine).
+    `recent_cols`: chỉ trích xuất từng ấy cột thời gian cuối cùng (bản xem trước).
+    `date_range`: chỉ trích xuất các cột thời gian bắt đầu trong khoảng (từ ngày, đến ngày).
+    """
+    df_raw, engine = read_excel(data, header=None)
+    df_raw = recent_columns(df_raw, recent_cols, 3)
+    return extract_social_data(df_raw, key_cells=key_cells, metric_mapping=metric_mapping,
+                               date_range=date_range), engine
+
+
+def extract_social_csv(source, key_cells, metric_mapping, date_range=None):
+    """
+    Đọc sheet social dạng CSV (link export của Google Sheet, hoặc nội dung đã tải về dạng bytes)
+    rồi trích xuất dữ liệu dạng long.
+    """
+    import pandas as pd
+    df_raw = pd.read_csv(BytesIO(source) if isinstance(source, bytes) else source, header=None)
+    return extract_social_data(df_raw, key_cells=key_cells, metric_mapping=metric_mapping, date_range=date_range)
@@ -0,0 +1,140 @@
+import os
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows không có module resource
+    resource = None
+
+# Đo bộ nhớ theo từng bước xử lý của một lần chạy lại (rerun) trang dashboard.
+# Mặc định đo RSS của tiến trình (rẻ); tracemalloc (chính xác cho bộ nhớ Python, nhưng
+# làm chậm mọi phép cấp phát) là trạng thái của cả tiến trình, nên chỉ dùng được khi server bật
+# bằng biến môi trường DASHBOARD_TRACEMALLOC=1, và một khi đã bật thì không session nào tắt nó.
+BUDGET_ENV_VAR = "DASHBOARD_MEMORY_BUDGET_MB"
+TRACEMALLOC_ENV_VAR = "DASHBOARD_TRACEMALLOC"
+DEFAULT_BUDGET_MB = 1024
+
+_MB = 1024 * 1024
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss_mb():
+    """RSS hiện tại của tiến trình (MB); None nếu hệ điều hành không hỗ trợ."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / _MB
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_mb():
+    """RSS cao nhất từ lúc tiến trình khởi động (MB); None nếu không đọc được."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux trả về KB, macOS trả về byte
+    return peak / _MB if sys.platform == "darwin" else peak / 1024
+
+
+def default_budget_mb():
+    """Ngân sách bộ nhớ mặc định, có thể đặt qua biến môi trường DASHBOARD_MEMORY_BUDGET_MB."""
+    try:
+        return int(os.environ.get(BUDGET_ENV_VAR, DEFAULT_BUDGET_MB))
+    except ValueError:
+        return DEFAULT_BUDGET_MB
+
+
+def tracemalloc_allowed():
+    """Server cho phép đo bằng tracemalloc (biến môi trường DASHBOARD_TRACEMALLOC=1)."""
+    return os.environ.get(TRACEMALLOC_ENV_VAR, "").strip().lower() in ("1", "true", "yes")
+
+
+class MemoryTracker:
+    """
+    Ghi nhận bộ nhớ theo từng bước: mỗi lần gọi `checkpoint(tên)` kết thúc bước đang chạy
+    (tính từ checkpoint trước) và lưu RSS cuối bước, mức tăng RSS, thời gian và (nếu bật
+    tracemalloc) bộ nhớ Python cao nhất trong bước.
+    """
+
+    def __init__(self, use_tracemalloc=False):
+        self.stages = []
+        # tracemalloc là trạng thái của cả tiến trình: session chọn đo chi tiết chỉ bật nó (khi server
+        # cho phép), không bao giờ tắt, để không làm hỏng số liệu của session khác đang đo
+        if use_tracemalloc and tracemalloc_allowed() and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.use_tracemalloc = use_tracemalloc and tracemalloc.is_tracing()
+        if self.use_tracemalloc:
+            tracemalloc.reset_peak()
+        self._start_peak_rss = peak_rss_mb()
+        self._rss = current_rss_mb()
+        self._rss_max = self._rss
+        self._t = time.perf_counter()
+
+    def checkpoint(self, name):
+        """Kết thúc bước `name` và bắt đầu đo bước tiếp theo."""
+        rss = current_rss_mb()
+        now = time.perf_counter()
+        row = {
+            "Bước": name,
+            "RSS cuối (MB)": rss,
+            "Tăng RSS (MB)": None if rss is None or self._rss is None else rss - self._rss,
+            "Thời gian (s)": now - self._t,
+        }
+        if self.use_tracemalloc:
+            current, peak = tracemalloc.get_traced_memory()
+            row["Python đỉnh (MB)"] = peak / _MB
+            row["Python hiện tại (MB)"] = current / _MB
+            tracemalloc.reset_peak()
+        self.stages.append(row)
+        if rss is not None:
+            self._rss_max = rss if self._rss_max is None else max(self._rss_max, rss)
+        self._rss, self._t = rss, now
+
+    def peak_mb(self):
+        """
+        Bộ nhớ cao nhất của lần chạy này: RSS lớn nhất đo được ở các checkpoint, hoặc
+        mức RSS cao nhất của tiến trình nếu mức đó được nâng lên trong lần chạy này.
+        """
+        peak = self._rss_max
+        process_peak = peak_rss_mb()
+        if process_peak is not None and self._start_peak_rss is not None and process_peak > self._start_peak_rss:
+            peak = process_peak if peak is None else max(peak, process_peak)
+        return peak
+
+
+def memory_settings(st, key_prefix):
+    """Các tùy chọn bộ nhớ ở sidebar. Trả về (chế độ tiết kiệm bộ nhớ, ngân sách MB, dùng tracemalloc)."""
+    with st.sidebar.expander("🧠 Bộ nhớ"):
+        low_memory = st.checkbox(
+            "Chế độ tiết kiệm bộ nhớ", value=False, key=f"{key_prefix}_low_memory",
+            help="Giải phóng dữ liệu trung gian (dữ liệu thô, bảng dạng long) ngay sau khi dùng xong "
+                 "và chỉ tạo file Excel khi bấm tải xuống."
+        )
+        budget_mb = st.number_input(
+            "Ngân sách bộ nhớ mỗi lần chạy (MB):", min_value=64, value=default_budget_mb(), step=64,
+            key=f"{key_prefix}_memory_budget"
+        )
+        use_tracemalloc = st.checkbox(
+            "Đo chi tiết bằng tracemalloc (chậm hơn)", value=False, key=f"{key_prefix}_tracemalloc",
+            disabled=not tracemalloc_allowed(),
+            help="Chỉ dùng được khi server chạy với DASHBOARD_TRACEMALLOC=1. Số liệu là của cả tiến "
+                 "trình, gồm cả các session khác đang chạy cùng lúc."
+        )
+    return low_memory, budget_mb, use_tracemalloc
+
+
+def render_memory_report(st, tracker, budget_mb, low_memory=False):
+    """Cảnh báo khi vượt ngân sách và hiển thị bảng bộ nhớ theo từng bước trong mục Chẩn đoán."""
+    peak = tracker.peak_mb()
+    if peak is not None and peak > budget_mb:
+        hint = "Hãy thu hẹp dữ liệu (ít sheet/kênh hơn)." if low_memory else \
+            "Hãy bật 'Chế độ tiết kiệm bộ nhớ' hoặc thu hẹp dữ liệu."
+        st.warning(f"⚠️ Lần chạy này dùng tới {peak:,.0f} MB bộ nhớ, vượt ngân sách {budget_mb:,} MB. {hint}")
+    with st.expander("🩺 Chẩn đoán: bộ nhớ theo từng bước"):
+        if peak is None:
+            st.caption("Hệ điều hành không cung cấp thông tin RSS; chỉ có số liệu tracemalloc (nếu bật).")
+        else:
+            st.caption(f"Bộ nhớ cao nhất của lần chạy: {peak:,.1f} MB / ngân sách {budget_mb:,} MB")
+        st.dataframe(tracker.stages, hide_index=True)
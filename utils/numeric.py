@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+# Chuẩn hóa số theo định dạng Việt Nam trên cả cột (vector hóa), dùng ngay lúc trích xuất:
+#   "1.234.567" -> 1234567      "12,5" -> 12.5        "12,5%" -> 0.125
+#   "3.000.000 đ" -> 3000000    "(1.200)" -> -1200    "1.234,5" -> 1234.5
+# Quy ước khi chỉ có một loại dấu phân cách (theo locale vi-VN):
+#   - dấu chấm là phân cách hàng nghìn nếu có dạng 1.234 / 1.234.567, ngược lại là dấu thập phân;
+#   - dấu phẩy là dấu thập phân, trừ khi có từ hai nhóm nghìn trở lên (1,234,567).
+_CURRENCY_RE = r"(?:vnđ|vnd|đồng|đ|₫)"
+# Liệt kê rõ NBSP và các khoảng trắng Unicode: với dtype str của pandas 3 (regex RE2 của Arrow),
+# \s chỉ khớp khoảng trắng ASCII
+_SPACES_RE = "[\\s\u00a0\u1680\u2000-\u200b\u202f\u205f\u3000\ufeff]+"
+_DOT_THOUSANDS_RE = r"^[+-]?\d{1,3}(?:\.\d{3})+$"
+_COMMA_THOUSANDS_RE = r"^[+-]?\d{1,3}(?:,\d{3}){2,}$"
+
+
+def _parse_strings(s):
+    """Chuyển Series chuỗi thành Series float (NaN nếu không đọc được)."""
+    t = s.str.strip().str.lower()
+    t = t.str.replace(_CURRENCY_RE, "", regex=True).str.replace(_SPACES_RE, "", regex=True)
+
+    negative = t.str.startswith("(") & t.str.endswith(")")
+    t = t.mask(negative, t.str.slice(1, -1))
+    percent = t.str.endswith("%")
+    t = t.mask(percent, t.str.slice(0, -1))
+
+    has_dot = t.str.contains(".", regex=False)
+    has_comma = t.str.contains(",", regex=False)
+    both = has_dot & has_comma
+    comma_is_decimal = both & (t.str.rfind(",") > t.str.rfind("."))
+
+    out = t.copy()
+    # Có cả hai loại dấu: dấu xuất hiện sau cùng là dấu thập phân
+    out = out.mask(comma_is_decimal, t.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    out = out.mask(both & ~comma_is_decimal, t.str.replace(",", "", regex=False))
+    # Chỉ có dấu chấm
+    dot_only = has_dot & ~has_comma
+    out = out.mask(dot_only & t.str.match(_DOT_THOUSANDS_RE), t.str.replace(".", "", regex=False))
+    # Chỉ có dấu phẩy
+    comma_only = has_comma & ~has_dot
+    comma_thousands = comma_only & t.str.match(_COMMA_THOUSANDS_RE)
+    out = out.mask(comma_thousands, t.str.replace(",", "", regex=False))
+    out = out.mask(comma_only & ~comma_thousands, t.str.replace(",", ".", regex=False))
+
+    values = pd.to_numeric(out, errors="coerce").astype("float64")
+    values = values.mask(percent, values / 100)
+    return values.mask(negative, -values)
+
+
+def parse_vn_numbers(values):
+    """
+    Chuyển một mảng giá trị thô (số, chuỗi định dạng Việt Nam, ô trống) thành mảng float64.
+    Trả về (mảng float64, số ô có dữ liệu nhưng không đọc được thành số).
+    Ô trống (None, NaN, chuỗi rỗng) trả về NaN và không bị tính là lỗi.
+    """
+    s = pd.Series(np.asarray(values, dtype=object), dtype=object)
+    result = np.full(len(s), np.nan, dtype="float64")
+    if s.empty:
+        return result, 0
+
+    is_str = s.map(type).eq(str).to_numpy()
+    empty = s.isna().to_numpy().copy()
+
+    other = ~is_str & ~empty
+    if other.any():
+        result[other] = pd.to_numeric(s[other], errors="coerce").astype("float64").to_numpy()
+
+    if is_str.any():
+        strings = s[is_str].astype(str)
+        blank = strings.str.strip().eq("").to_numpy()
+        empty[np.flatnonzero(is_str)[blank]] = True
+        result[is_str] = _parse_strings(strings).to_numpy()
+
+    unparsed = int((np.isnan(result) & ~empty).sum())
+    return result, unparsed
@@ -1,16 +1,115 @@
+# Plotly chỉ được import bên trong từng hàm vẽ để trang đăng nhập và trang chào mừng
+# không phải trả chi phí nạp thư viện khi chưa cần vẽ biểu đồ.
+import logging
 
+logger = logging.getLogger(__name__)
 
-import plotly.express as px
-import pandas as pd # Import pandas if not already imported
+# ========================== XUẤT BIỂU ĐỒ GỌN NHẸ ==========================
+# Mọi biểu đồ đi qua `show_chart`: mảng số được làm tròn / thu nhỏ kiểu dữ liệu theo độ chính
+# xác hiển thị, kích thước JSON gửi xuống trình duyệt được đo và ghi lại cho từng biểu đồ.
+PAGE_PAYLOAD_BUDGET_KB = 2048
+CHART_DECIMALS = 2
+_PAYLOAD_LOG_KEY = "_chart_payloads"
+# Các thuộc tính mảng dữ liệu của trace được thu gọn (nếu trace có thuộc tính đó)
+_ARRAY_PROPS = ("x", "y", "z", "values", "customdata", "marker.size", "marker.color", "marker.colors")
+# Biểu đồ phân cấp kiểm tra tổng con = cha trên `values`, không được làm tròn riêng lẻ
+_HIERARCHY_TRACES = ("treemap", "sunburst", "icicle")
 
-import plotly.express as px
-import pandas as pd
-import streamlit as st # Đảm bảo bạn đã import streamlit là 'st'
 
-def plot_trends_interactive_line_charts(st, df):
+def _compact_array(values, decimals):
+    """
+    Thu gọn một mảng numpy theo độ chính xác hiển thị: số thực được làm tròn rồi chuyển sang
+    int32/float32 nếu không đổi giá trị hiển thị; ngày không có giờ được ghi dạng YYYY-MM-DD.
+    """
+    import numpy as np
+    if not isinstance(values, np.ndarray) or values.size == 0:
+        return values
+    kind = values.dtype.kind
+    if kind == "f":
+        rounded = np.round(values, decimals)
+        finite = np.isfinite(rounded)
+        if finite.all() and np.abs(rounded).max() < 2 ** 31 and (rounded == np.trunc(rounded)).all():
+            return rounded.astype(np.int32)
+        as_f32 = rounded.astype(np.float32)
+        if np.allclose(as_f32, rounded, rtol=0, atol=0.5 * 10 ** -decimals, equal_nan=True):
+            return as_f32
+        return rounded
+    if kind in "iu" and values.dtype.itemsize > 4:
+        if values.min() >= -2 ** 31 and values.max() < 2 ** 31:
+            return values.astype(np.int32)
+        return values
+    if kind == "M":
+        days = values.astype("datetime64[D]")
+        if (days == values).all():
+            # NaT giữ nguyên dạng chuỗi "NaT" sẽ làm plotly lỗi trục: thay bằng None
+            text = np.datetime_as_string(days, unit="D").astype(object)
+            text[np.isnat(days)] = None
+            return text
+    return values
+
+
+def compact_figure(fig, decimals=CHART_DECIMALS):
+    """Thu gọn các mảng dữ liệu của mọi trace trong biểu đồ (thay đổi trực tiếp `fig`)."""
+    for trace in fig.data:
+        for prop in _ARRAY_PROPS:
+            if prop == "values" and trace.type in _HIERARCHY_TRACES:
+                continue
+            try:
+                values = trace[prop]
+            except (KeyError, ValueError):
+                continue
+            compacted = _compact_array(values, decimals)
+            if compacted is not values:
+                trace[prop] = compacted
+    return fig
+
+
+def show_chart(st, fig, name=None, decimals=CHART_DECIMALS, **kwargs):
+    """
+    Thay cho `st.plotly_chart`: thu gọn dữ liệu của biểu đồ, đo kích thước JSON (plotly tự dùng
+    mã hóa nhị phân base64 cho mảng số) rồi ghi log và lưu vào nhật ký của lần chạy hiện tại.
+    """
+    import plotly.io as pio
+    compact_figure(fig, decimals)
+    size = len(pio.to_json(fig, validate=False))
+    log = _payload_log(st)
+    name = name or fig.layout.title.text or f"Biểu đồ {len(log or []) + 1}"
+    logger.info("plotly payload %s: %.1f KB", name, size / 1024)
+    if log is not None:
+        log.append({"Biểu đồ": name, "Kích thước (KB)": round(size / 1024, 1)})
+    return st.plotly_chart(fig, **kwargs)
+
+
+def _payload_log(st):
+    """Nhật ký kích thước biểu đồ của lần chạy hiện tại (None nếu không có session_state)."""
+    state = getattr(st, "session_state", None)
+    if state is None:
+        return None
+    return state.setdefault(_PAYLOAD_LOG_KEY, [])
+
+
+def reset_payload_log(st):
+    """Bắt đầu nhật ký kích thước biểu đồ mới; gọi ở đầu mỗi lần chạy trang."""
+    st.session_state[_PAYLOAD_LOG_KEY] = []
+
+
+def render_payload_report(st, budget_kb=PAGE_PAYLOAD_BUDGET_KB):
+    """Cảnh báo khi tổng dữ liệu biểu đồ của trang vượt ngân sách và hiển thị chi tiết từng biểu đồ."""
+    log = _payload_log(st) or []
+    total_kb = sum(row["Kích thước (KB)"] for row in log)
+    if total_kb > budget_kb:
+        st.warning(f"⚠️ Các biểu đồ của trang gửi {total_kb:,.0f} KB dữ liệu, vượt ngân sách {budget_kb:,} KB. "
+                   "Hãy thu hẹp bộ lọc hoặc giảm số chiến dịch hiển thị.")
+    with st.expander("🩺 Chẩn đoán: kích thước dữ liệu biểu đồ"):
+        st.caption(f"Tổng: {total_kb:,.1f} KB / ngân sách {budget_kb:,} KB cho {len(log)} biểu đồ")
+        st.dataframe(log, hide_index=True)
+
+
+def plot_trends_interactive_line_charts(st, df, period_label='Ngày'):
     """
     Vẽ biểu đồ line chart xu hướng Lượt xem và Tương tác.
     Cho phép chọn kênh để xem và so sánh dễ dàng hơn.
+    `period_label`: tên trục thời gian (vd: 'Tuần', 'Tháng' khi dữ liệu đã gộp theo kỳ).
     """
     try:
         all_channels = df['Tên kênh'].unique()
@@ -32,38 +131,18 @@ def plot_trends_interactive_line_charts(st, df):
 
         # Biểu đồ cho Lượt xem (views)
         st.subheader("Xu Hướng Lượt Xem")
-        fig_views = px.line(
-            df_filtered,
-            x='Ngày Bắt Đầu',
-            y="Lượt xem (views)",
-            color='Tên kênh', # Giữ màu sắc để phân biệt các kênh trên cùng một biểu đồ
-            title='Xu Hướng Lượt Xem Theo Kênh Được Chọn',
-            labels={'value': 'Lượt xem', 'Ngày Bắt Đầu': 'Ngày'},
-            markers=True,
-            height=500 # Đặt chiều cao cố định để dễ nhìn
-        )
-        fig_views.update_layout(legend_title_text='Tên kênh')
-        st.plotly_chart(fig_views, use_container_width=True)
+        fig_views = build_views_trend_chart(df_filtered, period_label)
+        show_chart(st, fig_views, use_container_width=True)
 
         # Biểu đồ cho Engagement (like/ cmt/ share)
         st.subheader("Xu Hướng Tương Tác")
-        fig_engagement = px.line(
-            df_filtered,
-            x='Ngày Bắt Đầu',
-            y="Engagement (like/ cmt/ share)",
-            color='Tên kênh', # Giữ màu sắc để phân biệt các kênh trên cùng một biểu đồ
-            title='Xu Hướng Tương Tác Theo Kênh Được Chọn',
-            labels={'value': 'Tương tác', 'Ngày Bắt Đầu': 'Ngày'},
-            markers=True,
-            height=500 # Đặt chiều cao cố định để dễ nhìn
-        )
-        fig_engagement.update_layout(legend_title_text='Tên kênh')
-        st.plotly_chart(fig_engagement, use_container_width=True)
+        fig_engagement = build_engagement_trend_chart(df_filtered, period_label)
+        show_chart(st, fig_engagement, use_container_width=True)
 
     except Exception as e:
         st.error(f"Lỗi khi tạo biểu đồ xu hướng: {e}")
 
-def plot_follower_growth_interactive_line_chart(st, df):
+def plot_follower_growth_interactive_line_chart(st, df, period_label='Ngày'):
     """
     Vẽ biểu đồ line chart tăng trưởng Follower.
     Cho phép chọn kênh để xem và so sánh dễ dàng hơn.
@@ -89,46 +168,38 @@ def plot_follower_growth_interactive_line_chart(st, df):
 
         # Biểu đồ tăng trưởng Follower
         st.subheader("Tăng Trưởng Follower")
-        fig = px.line(
-            df_filtered,
-            x='Ngày Bắt Đầu',
-            y='Follower',
-            color='Tên kênh', # Giữ màu sắc để phân biệt các kênh trên cùng một biểu đồ
-            title='Tăng Trưởng Follower Theo Kênh Được Chọn',
-            labels={'Follower': 'Số lượng Follower', 'Ngày Bắt Đầu': 'Ngày'},
-            markers=True,
-            height=500 # Đặt chiều cao cố định để dễ nhìn
-        )
-        fig.update_layout(legend_title_text='Tên kênh')
-        st.plotly_chart(fig, use_container_width=True)
+        fig = build_follower_trend_chart(df_filtered, period_label)
+        show_chart(st, fig, use_container_width=True)
     except Exception as e:
         st.error(f"Lỗi khi tạo biểu đồ follower: {e}")
 
+def plot_week_over_week_chart(st, df, metrics, growth_cols):
+    """
+    Vẽ biểu đồ tăng trưởng (%) so với tuần trước theo kênh cho chỉ số được chọn,
+    kèm bảng số liệu của tuần mới nhất ở mỗi kênh.
+    """
+    metric = st.selectbox("Chỉ số:", options=metrics, key='growth_metric_select')
+    fig = build_growth_chart(df, metric, growth_cols[metric])
+    show_chart(st, fig, use_container_width=True)
+    with st.expander("📋 Tuần mới nhất của từng kênh"):
+        latest = df.groupby('Tên kênh', sort=False).tail(1)
+        st.dataframe(latest[['Tên kênh', 'Ngày Bắt Đầu'] + [c for m in metrics for c in (m, growth_cols[m])]],
+                     hide_index=True, use_container_width=True)
+
 def plot_comparison_bar_chart(st, df, x_col, y_col, title):
     """Vẽ biểu đồ cột để so sánh hiệu suất."""
     try:
-        fig = px.bar(
-            df.sort_values(y_col, ascending=False),
-            x=x_col, y=y_col, title=title, text_auto=True,
-            labels={y_col: 'Tổng giá trị', x_col: x_col}
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        fig = build_comparison_bar_chart(df, x_col, y_col, title)
+        show_chart(st, fig, use_container_width=True)
     except Exception as e:
         st.error(f"Lỗi khi tạo biểu đồ so sánh '{title}': {e}")
 
 def plot_content_pie_chart(st, df, content_metrics):
     """Vẽ biểu đồ tròn thể hiện cơ cấu nội dung."""
     try:
-        content_totals = df[content_metrics].sum()
-        content_totals = content_totals[content_totals > 0] 
-
-        if not content_totals.empty:
-            fig = px.pie(
-                names=content_totals.index, values=content_totals.values,
-                title='Tỷ Trọng Các Loại Nội Dung Đã Đăng', hole=0.3
-            )
-            fig.update_traces(textposition='inside', textinfo='percent+label')
-            st.plotly_chart(fig, use_container_width=True)
+        fig = build_content_pie_chart(df, content_metrics)
+        if fig is not None:
+            show_chart(st, fig, use_container_width=True)
         else:
             st.info("Không có dữ liệu về loại nội dung trong khoảng thời gian đã chọn.")
     except Exception as e:
@@ -136,44 +207,50 @@ def plot_content_pie_chart(st, df, content_metrics):
 
 def plot_performance_bar_chart(st, df_sheet_sum):
     """Vẽ biểu đồ Doanh số và Ngân sách theo người chạy."""
+    import plotly.express as px
     st.markdown("#### Doanh số và Ngân sách theo người chạy")
     fig = px.bar(
         df_sheet_sum, x='sheet', y=['Doanh số', 'Đầu tư ngân sách'], barmode='group',
         title="Tổng Doanh số và Ngân sách theo Người chạy", text_auto=True
     )
-    st.plotly_chart(fig, use_container_width=True)
+    show_chart(st, fig, use_container_width=True)
 
 def plot_roas_bar_chart(st, df_sheet_sum):
     """Vẽ biểu đồ ROAS theo người chạy."""
+    import plotly.express as px
     st.markdown("#### ROAS theo người chạy")
     fig = px.bar(
         df_sheet_sum, x='sheet', y='ROAS', title="So sánh ROAS giữa các Người chạy", text_auto='.2f'
     )
-    st.plotly_chart(fig, use_container_width=True)
+    show_chart(st, fig, use_container_width=True)
 
 def plot_cac_bar_chart(st, df_sheet_sum):
     """Vẽ biểu đồ Chi phí mỗi KH mới (CAC) theo người chạy."""
+    import plotly.express as px
     if 'CAC' in df_sheet_sum.columns:
         st.markdown("#### Chi phí mỗi Khách hàng mới (CAC)")
         fig = px.bar(
             df_sheet_sum, x='sheet', y='CAC', title="Chi phí mỗi KH mới (CAC)", text_auto=',.0f'
         )
-        st.plotly_chart(fig, use_container_width=True)
-
-def plot_campaign_performance_bar(st, df_camp_sum):
-    """Vẽ biểu đồ hiệu suất chiến dịch (Top ROAS và Doanh số)."""
-    st.markdown("##### Top 10 chiến dịch theo ROAS")
-    top_roas = df_camp_sum.sort_values('ROAS', ascending=False).head(10)
+        show_chart(st, fig, use_container_width=True)
+
+def plot_campaign_performance_bar(st, df_camp_sum, n=10):
+    """Vẽ biểu đồ hiệu suất chiến dịch (Top N theo ROAS và Doanh số)."""
+    import plotly.express as px
+    # nlargest chỉ chọn từng phần, không cần sắp xếp toàn bộ bảng chiến dịch
+    st.markdown(f"##### Top {n} chiến dịch theo ROAS")
+    top_roas = df_camp_sum.nlargest(n, 'ROAS')
     fig_roas = px.bar(top_roas, x='campaign', y='ROAS', color='sheet', text_auto='.2f')
-    st.plotly_chart(fig_roas, use_container_width=True)
+    show_chart(st, fig_roas, use_container_width=True)
 
-    st.markdown("##### Top 10 chiến dịch theo Doanh số")
-    top_sales = df_camp_sum.sort_values('Doanh số', ascending=False).head(10)
+    st.markdown(f"##### Top {n} chiến dịch theo Doanh số")
+    top_sales = df_camp_sum.nlargest(n, 'Doanh số')
     fig_sales = px.bar(top_sales, x='campaign', y='Doanh số', color='sheet', text_auto=True)
-    st.plotly_chart(fig_sales, use_container_width=True)
+    show_chart(st, fig_sales, use_container_width=True)
 
 def plot_performance_bubble_chart(st, df_camp_sum):
     """Vẽ biểu đồ bong bóng thể hiện hiệu suất chiến dịch."""
+    import plotly.express as px
     st.markdown("##### Biểu đồ Bong bóng (Ngân sách vs. Doanh số vs. ROAS)")
     df_plot = df_camp_sum[(df_camp_sum['Đầu tư ngân sách'] > 0) & (df_camp_sum['Doanh số'] > 0)]
     if not df_plot.empty:
@@ -182,49 +259,108 @@ def plot_performance_bubble_chart(st, df_camp_sum):
             color='sheet', hover_name='campaign',
             title="Phân nhóm hiệu suất chiến dịch", size_max=60
         )
-        st.plotly_chart(fig, use_container_width=True)
+        show_chart(st, fig, use_container_width=True)
     else:
         st.info("Không đủ dữ liệu để vẽ biểu đồ bong bóng.")
 
-def plot_time_series_line_chart(st, df, metric, group_by):
-    """Vẽ biểu đồ xu hướng theo thời gian cho các chỉ số quảng cáo."""
+def plot_time_series_line_chart(st, df, metric, group_by, level=None):
+    """
+    Vẽ biểu đồ xu hướng theo thời gian cho các chỉ số quảng cáo.
+    `level` ('Tuần', 'Tháng'...): gộp theo kỳ trước khi vẽ để giảm số điểm.
+    """
+    import plotly.express as px
+    if level is not None:
+        from utils.rollups import bucket_start
+        df = df.assign(date=bucket_start(df['date'], level)).groupby([group_by, 'date'], as_index=False)[metric].sum()
     fig = px.line(
         df.sort_values('date'), x='date', y=metric, color=group_by,
         title=f"Xu hướng {metric} theo thời gian", markers=True
     )
-    st.plotly_chart(fig, use_container_width=True)
-import streamlit as st
-import pandas as pd
-import plotly.express as px
-
+    show_chart(st, fig, use_container_width=True)
 # (Các hàm plot khác của bạn ở đây...)
 
-def plot_content_distribution_bar_chart(st, df, content_columns):
+def plot_content_distribution_bar_chart(st, df, content_columns, backend='pandas'):
     """
     Vẽ biểu đồ cột nhóm thể hiện tỷ trọng các loại nội dung trên từng kênh.
     df: DataFrame ở dạng wide, đã được lọc.
     content_columns: list các cột chứa số lượng của từng loại nội dung.
+    backend: engine truy vấn dùng để tính bảng tỷ lệ (xem utils/query_engine.py).
     """
     st.write("#### 📊 Tỷ Trọng Loại Nội Dung Theo Kênh")
+    fig = build_content_distribution_bar_chart(df, content_columns, backend)
+    show_chart(st, fig, use_container_width=True)
+
 
-    # 1. Chỉ chọn các cột cần thiết: Tên kênh và các cột nội dung, sau đó tính tổng cho mỗi kênh
-    df_content = df[['Tên kênh'] + content_columns].copy()
-    df_grouped = df_content.groupby('Tên kênh')[content_columns].sum().reset_index()
+# ========================== TẠO BIỂU ĐỒ (KHÔNG VẼ RA TRANG) ==========================
+# Các hàm build_* chỉ tạo figure, không dùng streamlit, để dùng chung cho trang dashboard
+# và cho báo cáo dựng sẵn (utils/snapshots.py, chạy trong process pool).
 
-    # 2. Chuyển từ định dạng wide sang long để dễ vẽ biểu đồ
-    df_melted = df_grouped.melt(
-        id_vars=['Tên kênh'], 
-        value_vars=content_columns, 
-        var_name='Loại nội dung', 
-        value_name='Số lượng'
+def _channel_trend_chart(df, y_col, title, labels):
+    import plotly.express as px
+    fig = px.line(
+        df,
+        x='Ngày Bắt Đầu',
+        y=y_col,
+        color='Tên kênh', # Giữ màu sắc để phân biệt các kênh trên cùng một biểu đồ
+        title=title,
+        labels=labels,
+        markers=True,
+        height=500 # Đặt chiều cao cố định để dễ nhìn
+    )
+    fig.update_layout(legend_title_text='Tên kênh')
+    return fig
+
+def build_views_trend_chart(df, period_label='Ngày'):
+    """Line chart xu hướng Lượt xem theo kênh."""
+    return _channel_trend_chart(df, "Lượt xem (views)", 'Xu Hướng Lượt Xem Theo Kênh Được Chọn',
+                                {'value': 'Lượt xem', 'Ngày Bắt Đầu': period_label})
+
+def build_engagement_trend_chart(df, period_label='Ngày'):
+    """Line chart xu hướng Tương tác theo kênh."""
+    return _channel_trend_chart(df, "Engagement (like/ cmt/ share)", 'Xu Hướng Tương Tác Theo Kênh Được Chọn',
+                                {'value': 'Tương tác', 'Ngày Bắt Đầu': period_label})
+
+def build_follower_trend_chart(df, period_label='Ngày'):
+    """Line chart tăng trưởng Follower theo kênh (giá trị cuối mỗi kỳ)."""
+    return _channel_trend_chart(df, 'Follower', 'Tăng Trưởng Follower Theo Kênh Được Chọn',
+                                {'Follower': 'Số lượng Follower', 'Ngày Bắt Đầu': period_label})
+
+def build_growth_chart(df, metric, growth_col):
+    """Line chart tăng trưởng (%) của `metric` so với tuần trước theo kênh."""
+    fig = _channel_trend_chart(df, growth_col, f'Tăng Trưởng {metric} So Với Tuần Trước',
+                               {growth_col: '% so với tuần trước', 'Ngày Bắt Đầu': 'Tuần'})
+    fig.add_hline(y=0, line_dash='dot', line_color='gray')
+    return fig
+
+def build_comparison_bar_chart(df, x_col, y_col, title):
+    """Biểu đồ cột so sánh hiệu suất, sắp xếp giảm dần."""
+    import plotly.express as px
+    return px.bar(
+        df.sort_values(y_col, ascending=False),
+        x=x_col, y=y_col, title=title, text_auto=True,
+        labels={y_col: 'Tổng giá trị', x_col: x_col}
     )
 
-    # 3. Tính tổng số bài đăng cho mỗi kênh để tính tỷ lệ phần trăm
-    # Dùng transform để broadcast tổng số bài đăng về lại cho mỗi dòng của kênh tương ứng
-    df_melted['Tổng bài đăng'] = df_melted.groupby('Tên kênh')['Số lượng'].transform('sum')
-    
-    # 4. Tính tỷ lệ phần trăm, tránh lỗi chia cho 0
-    df_melted['Tỷ lệ (%)'] = (df_melted['Số lượng'] / df_melted['Tổng bài đăng'].replace(0, 1)) * 100
+def build_content_pie_chart(df, content_metrics):
+    """Biểu đồ tròn cơ cấu nội dung; None nếu không có nội dung nào."""
+    import plotly.express as px
+    content_totals = df[content_metrics].sum()
+    content_totals = content_totals[content_totals > 0] 
+    if content_totals.empty:
+        return None
+    fig = px.pie(
+        names=content_totals.index, values=content_totals.values,
+        title='Tỷ Trọng Các Loại Nội Dung Đã Đăng', hole=0.3
+    )
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    return fig
+
+def build_content_distribution_bar_chart(df, content_columns, backend='pandas'):
+    """Biểu đồ cột nhóm tỷ trọng các loại nội dung trên từng kênh (`backend`: engine tính bảng tỷ lệ)."""
+    import plotly.express as px
+    from utils.query_engine import content_mix
+    # 1-4. Tổng từng loại nội dung theo kênh (dạng long) và tỷ lệ phần trăm trên tổng bài đăng của kênh
+    df_melted = content_mix(df, content_columns, backend=backend)
 
     # 5. Vẽ biểu đồ
     fig = px.bar(
@@ -260,5 +396,78 @@ def plot_content_distribution_bar_chart(st, df, content_columns):
     )
     fig.update_traces(textposition='outside')
 
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
+
+def build_runner_scatter(df_sheet_sum):
+    """Scatter CAC vs. ROAS theo người chạy."""
+    import plotly.express as px
+    fig = px.scatter(
+        df_sheet_sum, x='CAC', y='ROAS', size='Doanh số', color='sheet',
+        hover_name='sheet', size_max=50, title='Phân Tích Hiệu Quả Người Chạy (CAC vs. ROAS)',
+        labels={'CAC': 'Chi phí / Khách hàng mới (VNĐ)', 'ROAS': 'Lợi nhuận trên chi tiêu quảng cáo'}
+    )
+    fig.add_annotation(text="<b>Góc lý tưởng</b><br>(Chi phí thấp, Lợi nhuận cao)",
+        align='left', showarrow=False, xref='paper', yref='paper', x=0.05, y=0.95)
+    return fig
+
+def build_runner_bar(df_sheet_sum):
+    """Cột nhóm Doanh số và Ngân sách theo người chạy."""
+    import plotly.express as px
+    return px.bar(df_sheet_sum, x='sheet', y=['Doanh số', 'Đầu tư ngân sách'], barmode='group',
+                  title="Tổng Doanh số và Ngân sách theo Người chạy", text_auto=True)
+
+def build_revenue_treemap(df_camp_sum):
+    """Treemap cơ cấu Doanh số, tô màu theo ROAS (đầu vào đã gộp top N mỗi người chạy)."""
+    import plotly.express as px
+    fig = px.treemap(
+        df_camp_sum, path=[px.Constant("Tất cả chiến dịch"), 'sheet', 'campaign'],
+        values='Doanh số', color='ROAS', color_continuous_scale='RdYlGn',
+        hover_data={'ROAS': ':.2f', 'Đầu tư ngân sách': ':,.0f', 'Số chiến dịch': True},
+        title='Cơ Cấu Doanh Số & Hiệu Quả ROAS Theo Từng Chiến Dịch'
+    )
+    fig.update_traces(textinfo='label+value', textfont_size=14)
+    return fig
+
+def build_budget_treemap(df_camp_sum):
+    """Treemap cơ cấu phân bổ Ngân sách (đầu vào đã gộp top N mỗi người chạy)."""
+    import plotly.express as px
+    fig = px.treemap(
+        df_camp_sum, path=[px.Constant("Tất cả chiến dịch"), 'sheet', 'campaign'],
+        values='Đầu tư ngân sách', color='Đầu tư ngân sách',
+        color_continuous_scale='Oranges',
+        hover_data={'ROAS': ':.2f', 'Doanh số': ':,.0f', 'Số chiến dịch': True},
+        title='Cơ Cấu Phân Bổ Ngân Sách Theo Từng Chiến Dịch'
+    )
+    fig.update_traces(textinfo='label+value', textfont_size=14)
+    return fig
+
+def build_campaign_bubble(df_camp_sum):
+    """Bubble chart Ngân sách vs. Doanh số, kích thước theo ROAS."""
+    import plotly.express as px
+    return px.scatter(
+        df_camp_sum, x='Đầu tư ngân sách', y='Doanh số', size='ROAS',
+        color='sheet', hover_name='campaign', hover_data={'Số chiến dịch': True},
+        title="Phân Nhóm Hiệu Suất Chiến Dịch", size_max=60
+    )
 
+def build_ads_trend_chart(df_trend, period_label='Ngày'):
+    """Xu hướng Ngân sách (cột), Doanh số và ROAS (trục phụ) theo ngày (hoặc theo kỳ đã gộp)."""
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    fig.add_trace(go.Bar(x=df_trend['date'], y=df_trend['Đầu tư ngân sách'], name='Ngân sách', marker_color='lightsalmon'), secondary_y=False)
+    fig.add_trace(go.Scatter(x=df_trend['date'], y=df_trend['Doanh số'], name='Doanh số', mode='lines+markers', line=dict(color='royalblue', width=3)), secondary_y=False)
+    fig.add_trace(go.Scatter(x=df_trend['date'], y=df_trend['ROAS'], name='ROAS', mode='lines', line=dict(color='lightgreen', dash='dot')), secondary_y=True)
+    fig.update_layout(title_text='Xu Hướng Tổng Thể Theo Thời Gian', legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
+    fig.update_xaxes(title_text=period_label)
+    fig.update_yaxes(title_text="<b>Số tiền (VNĐ)</b>", secondary_y=False)
+    fig.update_yaxes(title_text="<b>ROAS</b>", secondary_y=True)
+    return fig
+
+def build_rolling_chart(df, metric, color_col, period_label='Ngày'):
+    """Line chart chỉ số trượt (vd: 'ROAS (7 ngày)') theo người chạy hoặc chiến dịch."""
+    import plotly.express as px
+    fig = px.line(df, x='date', y=metric, color=color_col, markers=True, title=f'{metric} theo thời gian',
+                  labels={'date': period_label, 'sheet': 'Người chạy', 'campaign': 'Chiến dịch'})
+    fig.update_layout(legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
+    return fig
@@ -0,0 +1,114 @@
+import importlib.util
+import os
+
+import numpy as np
+import pandas as pd
+
+# Engine Polars (tùy chọn, chạy đa luồng) cho các bước từ bảng long tới tổng hợp: mã hóa khóa của
+# pivot long -> wide, lọc, groupby và bảng cơ cấu nội dung. Dữ liệu vào / ra của mỗi bước vẫn là
+# pandas (chỉ chuyển sang Polars bên trong bước), nên biểu đồ Plotly và widget Streamlit không đổi
+# và kết quả giống hệt engine pandas. Bật bằng biến môi trường DASHBOARD_DATAFRAME_ENGINE=polars
+# (cần cài polars); không có polars thì mọi bước dùng pandas như cũ.
+#
+# Cố ý chuyển đổi theo từng bước thay vì giữ bảng ở dạng Polars suốt luồng: các trạng thái dùng
+# lại giữa các lần chạy lại trang (FilterIndex, rollups, ảnh chụp, bộ nhớ đệm theo bước của
+# StageGraph, bộ nhớ đệm Parquet) và đầu vào của Plotly / st.dataframe đều là pandas, giữ hai bản
+# của chúng sẽ tốn gấp đôi bộ nhớ. Cái giá là một lần chuyển pandas <-> Arrow mỗi bước: với dữ liệu
+# cỡ dashboard (vài trăm nghìn dòng) trên máy ít nhân, Polars thường chậm hơn pandas (xem
+# benchmarks/bench_reshape.py, bench_query_engine.py), nên pandas vẫn là mặc định; Polars chỉ có
+# lợi với bảng rất lớn trên máy nhiều nhân.
+ENGINE_ENV_VAR = "DASHBOARD_DATAFRAME_ENGINE"
+ENGINE_PANDAS = "pandas"
+ENGINE_POLARS = "polars"
+
+
+def available():
+    """Đã cài đặt polars."""
+    return importlib.util.find_spec("polars") is not None
+
+
+def enabled():
+    """Engine được chọn qua DASHBOARD_DATAFRAME_ENGINE là polars và polars đã được cài đặt."""
+    return os.environ.get(ENGINE_ENV_VAR, ENGINE_PANDAS).strip().lower() == ENGINE_POLARS and available()
+
+
+def _frame(df, columns):
+    import polars as pl
+    return pl.from_pandas(df[list(columns)], include_index=False)
+
+
+def encode_keys(data, index, columns):
+    """
+    Như phần mã hóa khóa của utils/reshape.pivot_wide: trả về (mã nhóm từng dòng theo thứ tự đã
+    sắp xếp của các cột `index`, vị trí dòng đại diện mỗi nhóm, mã cột từng dòng, nhãn cột đã
+    sắp xếp). Khóa không chuyển được sang Arrow (kiểu lẫn lộn) gây TypeError như pandas.
+    """
+    import polars as pl
+    try:
+        frame = _frame(data, index + [columns]).with_row_index("_row")
+    except Exception as e:  # pyarrow.ArrowInvalid / ArrowTypeError với cột object lẫn kiểu
+        raise TypeError(str(e)) from e
+    groups = frame.group_by(index).agg(pl.col("_row").min()).sort(index).with_row_index("_group")
+    labels = frame.group_by(columns).agg(pl.col("_row").min().alias("_label_row")).sort(columns) \
+        .with_row_index("_col")
+    coded = frame.join(groups.select(index + ["_group"]), on=index, how="left") \
+        .join(labels.select([columns, "_col"]), on=columns, how="left").sort("_row")
+    label_rows = labels["_label_row"].to_numpy()
+    col_labels = pd.Index(data[columns].to_numpy()[label_rows])
+    return (coded["_group"].to_numpy().astype(np.int64), groups["_row"].to_numpy().astype(np.int64),
+            coded["_col"].to_numpy().astype(np.int64), col_labels)
+
+
+def filter_positions(df, date_col, start_date, end_date, selections):
+    """Vị trí các dòng có ngày trong [start_date, end_date] và giá trị các chiều nằm trong `selections`."""
+    import polars as pl
+    frame = pl.from_pandas(
+        pd.DataFrame({date_col: pd.to_datetime(df[date_col]).to_numpy(),
+                      **{dim: df[dim].to_numpy() for dim in selections}}),
+        include_index=False,
+    )
+    condition = pl.col(date_col).dt.date().is_between(start_date, end_date)
+    for dim, values in selections.items():
+        condition &= pl.col(dim).is_in(list(values))
+    return frame.with_row_index("_pos").filter(condition)["_pos"].to_numpy()
+
+
+def totals(df, value_cols):
+    """Tổng của từng cột (float)."""
+    import polars as pl
+    row = _frame(df, value_cols).select(pl.col(c).sum().cast(pl.Float64) for c in value_cols).row(0)
+    return {c: float(v or 0) for c, v in zip(value_cols, row)}
+
+
+def group_sum(df, keys, value_cols):
+    """Tổng theo nhóm (float), sắp xếp theo khóa nhóm; cột khóa giữ kiểu dữ liệu của `df`."""
+    import polars as pl
+    out = _frame(df, keys + value_cols).group_by(keys) \
+        .agg(pl.col(c).sum().cast(pl.Float64) for c in value_cols).sort(keys).to_pandas()
+    for k in keys:
+        out[k] = out[k].astype(df[k].dtype)
+    return out
+
+
+def last_sum(df, group_col, order_col, value_col):
+    """Tổng giá trị `value_col` của dòng mới nhất (theo `order_col`, rồi thứ tự dòng) ở mỗi nhóm."""
+    import polars as pl
+    frame = _frame(df, [group_col, order_col, value_col]).with_row_index("_row").sort([order_col, "_row"])
+    last = frame.group_by(group_col).agg(pl.col(value_col).last())
+    return float(last[value_col].sum() or 0)
+
+
+def content_mix(df, group_col, content_columns):
+    """Bảng long (nhóm, loại nội dung, số lượng, tổng, tỷ lệ %) như query_engine.content_mix."""
+    import polars as pl
+    grouped = _frame(df, [group_col] + content_columns).group_by(group_col) \
+        .agg(pl.col(c).sum() for c in content_columns).sort(group_col)
+    total = pl.col('Số lượng').sum().over(group_col)
+    out = grouped.unpivot(index=group_col, on=content_columns, variable_name='Loại nội dung',
+                          value_name='Số lượng') \
+        .with_columns(total.alias('Tổng bài đăng')) \
+        .with_columns((pl.col('Số lượng') / pl.when(pl.col('Tổng bài đăng') == 0).then(1)
+                       .otherwise(pl.col('Tổng bài đăng')) * 100).alias('Tỷ lệ (%)')) \
+        .to_pandas()
+    out[group_col] = out[group_col].astype(df[group_col].dtype)
+    return out
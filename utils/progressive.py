@@ -0,0 +1,158 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.executor import pool_workers, run_jobs
+
+# Nạp dữ liệu theo từng giai đoạn cho file lớn: trang hiển thị ngay bản xem trước (chỉ các mốc
+# thời gian gần nhất) trong khi toàn bộ lịch sử được trích xuất nền trong process pool, chia
+# thành nhiều phần (nếu nguồn có nhiều phần, vd: nhiều sheet) để có thanh tiến độ. Khi xong, trang
+# tự chạy lại và dùng dữ liệu đầy đủ.
+PREVIEW_COLUMNS_ENV_VAR = "DASHBOARD_PREVIEW_COLUMNS"
+MIN_MB_ENV_VAR = "DASHBOARD_PROGRESSIVE_MIN_MB"
+DEFAULT_PREVIEW_COLUMNS = 30  # số cột thời gian gần nhất trong bản xem trước
+DEFAULT_MIN_MB = 5  # file nhỏ hơn mức này được nạp đầy đủ ngay (không cần xem trước)
+POLL_INTERVAL = 1.0  # giây giữa hai lần cập nhật thanh tiến độ
+
+
+def _env_number(name, default):
+    try:
+        return type(default)(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def preview_columns():
+    """Số cột thời gian của bản xem trước (đặt qua biến môi trường DASHBOARD_PREVIEW_COLUMNS)."""
+    return max(1, _env_number(PREVIEW_COLUMNS_ENV_VAR, DEFAULT_PREVIEW_COLUMNS))
+
+
+def should_preview(data):
+    """File (bytes) đủ lớn để nạp theo giai đoạn (ngưỡng DASHBOARD_PROGRESSIVE_MIN_MB)."""
+    return len(data) >= _env_number(MIN_MB_ENV_VAR, DEFAULT_MIN_MB) * 1024 * 1024
+
+
+def load_token(data, *params):
+    """Khóa của một lần nạp: nội dung file cùng các tham số đọc (sheet, key cell...)."""
+    h = hashlib.sha1(data)
+    h.update(repr(params).encode())
+    return h.hexdigest()
+
+
+class BackgroundLoad:
+    """
+    Chạy nền một danh sách job `(fn, args, kwargs)` (qua process pool, tối đa bằng số tiến trình
+    của pool cùng lúc) và theo dõi số job đã xong. Kết quả theo đúng thứ tự; job lỗi trả về
+    Exception. `preview` lưu kết quả xem trước để không phải tính lại ở mỗi lần chạy lại trang.
+    `cancel()` bỏ lần nạp: job chưa gửi đi hoặc còn chờ trong hàng đợi của pool bị hủy (kết quả là
+    CancelledError); job đã chạy trong tiến trình con thì không dừng được giữa chừng, kết quả của nó
+    chỉ bị bỏ đi.
+    """
+
+    def __init__(self, token, calls):
+        self.token = token
+        self.total = len(calls)
+        self.completed = 0
+        self.results = [None] * len(calls)
+        self.preview = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._cancelled = threading.Event()
+        self._futures = []
+        threading.Thread(target=self._run, args=(calls,), name="background-load", daemon=True).start()
+
+    def _track(self, future):
+        with self._lock:
+            self._futures.append(future)
+            cancelled = self._cancelled.is_set()
+        if cancelled:
+            future.cancel()
+
+    def _run_one(self, i, call):
+        if not self._cancelled.is_set():
+            self.results[i] = run_jobs([call], on_submit=self._track)[0]
+        with self._lock:
+            self.completed += 1
+
+    def _run(self, calls):
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, pool_workers())) as threads:
+                for i, call in enumerate(calls):
+                    threads.submit(self._run_one, i, call)
+        finally:
+            self._done.set()
+
+    def cancel(self):
+        with self._lock:
+            self._cancelled.set()
+            futures = list(self._futures)
+        for future in futures:
+            future.cancel()
+
+    def is_done(self):
+        return self._done.is_set()
+
+    @property
+    def fraction(self):
+        return self.completed / self.total if self.total else 1.0
+
+
+def background_load(st, key, token, make_calls):
+    """
+    Lần nạp nền của session ứng với `token` (lưu trong session_state[key]); tạo mới và bắt đầu
+    chạy nếu chưa có hoặc dữ liệu nguồn đã đổi (lần nạp cũ bị hủy). `make_calls()` trả về danh sách job.
+    """
+    load = st.session_state.get(key)
+    if load is None or load.token != token:
+        if load is not None:
+            load.cancel()
+        load = BackgroundLoad(token, make_calls())
+        st.session_state[key] = load
+    return load
+
+
+def _show_progress(st, load, label):
+    """
+    Thanh tiến độ theo số phần đã xong. Lần nạp chỉ có một job thì không đo được tiến độ thật
+    (thanh chỉ nhảy từ 0 lên 1): chỉ hiện trạng thái đang chạy.
+    """
+    if load.total > 1:
+        st.progress(load.fraction, text=f"{label}: {load.completed}/{load.total} phần")
+    else:
+        st.caption(f"⏳ {label}...")
+
+
+def watch_progress(st, load, label):
+    """
+    Tiến độ tự cập nhật (fragment chạy lại định kỳ); khi phần nạp nền xong thì chạy lại toàn trang
+    để thay bản xem trước bằng dữ liệu đầy đủ.
+    """
+    @st.fragment(run_every=POLL_INTERVAL)
+    def _watch():
+        if load.is_done():
+            st.rerun()
+        _show_progress(st, load, label)
+
+    _watch()
+
+
+def background_result(st, key, token, label, fn, args, render):
+    """
+    Tạo nền kết quả `fn(*args)` ứng với `token` rồi hiển thị nó bằng `render(kết quả)` (vd: nút tải
+    xuống), trong một fragment: lúc chờ chỉ thanh tiến độ tự cập nhật, khi xong chỉ fragment chạy lại
+    chứ không chạy lại cả trang. Job của token cũ (vd: bộ lọc đã đổi) bị hủy nếu còn chờ trong hàng
+    đợi (xem BackgroundLoad.cancel). Job lỗi: hiện thông báo lỗi.
+    """
+    load = background_load(st, key, token, lambda: [(fn, args, {})])
+
+    @st.fragment(run_every=None if load.is_done() else POLL_INTERVAL)
+    def _result():
+        if not load.is_done():
+            _show_progress(st, load, label)
+        elif isinstance(load.results[0], Exception):
+            st.error(f"{label} không thành công: {load.results[0]}")
+        else:
+            render(load.results[0])
+
+    _result()
@@ -0,0 +1,366 @@
+import importlib.util
+
+import numpy as np
+import pandas as pd
+
+from utils import polars_engine
+from utils.rollups import DAY, WEEK, MONTH, TimeRollups
+from utils.rolling import ROLLING_WINDOWS, window_col, rolling_sums, period_growth
+
+# Engine mặc định là pandas. DuckDB và Polars là phụ thuộc tùy chọn: chỉ dùng khi đã cài đặt
+# (Polars được chọn sẵn khi DASHBOARD_DATAFRAME_ENGINE=polars, xem utils/polars_engine.py).
+BACKEND_PANDAS = "pandas"
+BACKEND_DUCKDB = "duckdb"
+BACKEND_POLARS = polars_engine.ENGINE_POLARS
+
+AD_KPI_COLS = ['Doanh số', 'Đầu tư ngân sách', 'KH Tiềm Năng (Mess)', 'Số Lượng Khách Hàng']
+SOCIAL_KPI_COLS = ["Lượt xem (views)", "Engagement (like/ cmt/ share)", "Total content publish"]
+OTHER_LABEL = "Khác"  # nhãn của nhóm gộp các chiến dịch ngoài top N
+AD_TREND_LEVELS = [DAY, WEEK, MONTH]
+SOCIAL_TREND_LEVELS = [WEEK, MONTH]  # dữ liệu social chi tiết nhất là theo tuần
+SOCIAL_TREND_COLS = ["Lượt xem (views)", "Engagement (like/ cmt/ share)"]
+AD_ROLLING_COLS = ['Doanh số', 'Đầu tư ngân sách', 'Số Lượng Khách Hàng']
+SOCIAL_GROWTH_COLS = SOCIAL_TREND_COLS + ['Follower']
+
+_duckdb_conn = None
+
+
+def available_backends():
+    """Trả về danh sách engine truy vấn có thể dùng trong môi trường hiện tại."""
+    backends = [BACKEND_PANDAS]
+    if importlib.util.find_spec("duckdb") is not None:
+        backends.append(BACKEND_DUCKDB)
+    if polars_engine.available():
+        backends.append(BACKEND_POLARS)
+    return backends
+
+
+def default_backend():
+    """Engine được chọn sẵn trên các trang: Polars nếu đã bật qua DASHBOARD_DATAFRAME_ENGINE, ngược lại pandas."""
+    return BACKEND_POLARS if polars_engine.enabled() else BACKEND_PANDAS
+
+
+def _cursor():
+    """
+    Trả về một cursor DuckDB (in-memory) dùng chung cho cả tiến trình.
+    Mỗi lần gọi tạo cursor riêng để an toàn khi nhiều session chạy song song.
+    """
+    global _duckdb_conn
+    import duckdb
+    if _duckdb_conn is None:
+        _duckdb_conn = duckdb.connect(database=":memory:")
+    return _duckdb_conn.cursor()
+
+
+def _q(col):
+    """Đặt tên cột trong dấu nháy kép để dùng trong SQL (tên cột có dấu, khoảng trắng)."""
+    return '"' + col.replace('"', '""') + '"'
+
+
+def _run_sql(sql, tables, params=None):
+    """Đăng ký các DataFrame thành bảng rồi chạy câu SQL, trả về DataFrame kết quả."""
+    cur = _cursor()
+    try:
+        for name, frame in tables.items():
+            cur.register(name, frame)
+        return cur.execute(sql, params or []).df()
+    finally:
+        cur.close()
+
+
+def _ratio(num, den):
+    """Chia an toàn: trả về 0 khi mẫu số <= 0 (giống logic cũ trong các trang)."""
+    num = np.asarray(num, dtype='float64')
+    den = np.asarray(den, dtype='float64')
+    out = np.zeros(len(num), dtype='float64')
+    np.divide(num, den, out=out, where=den > 0)
+    return out
+
+
+def _filter_positions(df, conditions, params, columns):
+    """Chạy điều kiện lọc bằng DuckDB và trả về vị trí các dòng thỏa mãn."""
+    frame = pd.DataFrame({c: df[c].to_numpy() for c in columns})
+    frame['_pos'] = np.arange(len(df))
+    sql = f"SELECT _pos FROM t WHERE {' AND '.join(conditions)} ORDER BY _pos"
+    return _run_sql(sql, {"t": frame}, params)['_pos'].to_numpy()
+
+
+def _in_clause(col, values, params):
+    """Tạo mệnh đề IN với tham số; danh sách rỗng thì không dòng nào khớp."""
+    values = list(values)
+    if not values:
+        return "FALSE"
+    params.extend(values)
+    return f"{_q(col)} IN ({', '.join('?' for _ in values)})"
+
+
+# ========================== DASHBOARD QUẢNG CÁO ==========================
+
+def filter_ads(df, start_date, end_date, sheets, campaigns, backend=BACKEND_PANDAS, index=None):
+    """
+    Lọc dữ liệu quảng cáo (dạng wide) theo khoảng ngày, người chạy và chiến dịch.
+    `sheets` / `campaigns` là None (= tất cả) thì bỏ qua hẳn điều kiện lọc của chiều đó.
+    Nếu có `index` (FilterIndex dựng trên chính `df`), engine pandas dùng phép giao bitmap.
+    """
+    selections = {dim: values for dim, values in (('sheet', sheets), ('campaign', campaigns)) if values is not None}
+    if backend == BACKEND_DUCKDB:
+        params = [start_date, end_date]
+        conditions = ['CAST("date" AS DATE) BETWEEN ? AND ?']
+        for dim, values in selections.items():
+            conditions.append(_in_clause(dim, values, params))
+        positions = _filter_positions(df, conditions, params, ['date', *selections])
+        return df.iloc[positions]
+    if backend == BACKEND_POLARS:
+        return df.iloc[polars_engine.filter_positions(df, 'date', start_date, end_date, selections)]
+
+    if index is not None:
+        return df[index.mask(start_date, end_date, **selections)]
+
+    mask = (df['date'].dt.date >= start_date) & (df['date'].dt.date <= end_date)
+    for dim, values in selections.items():
+        mask &= df[dim].isin(values)
+    return df[mask]
+
+
+def ads_kpi_totals(df, backend=BACKEND_PANDAS):
+    """Tính tổng các chỉ số KPI chính của dữ liệu quảng cáo đã lọc."""
+    if backend == BACKEND_DUCKDB:
+        select = ", ".join(f"COALESCE(SUM({_q(c)}), 0)::DOUBLE AS {_q(c)}" for c in AD_KPI_COLS)
+        row = _run_sql(f"SELECT {select} FROM t", {"t": df[AD_KPI_COLS]}).iloc[0]
+        return {c: float(row[c]) for c in AD_KPI_COLS}
+    if backend == BACKEND_POLARS:
+        return polars_engine.totals(df, AD_KPI_COLS)
+    return {c: float(df[c].sum()) for c in AD_KPI_COLS}
+
+
+def _group_sum(df, keys, value_cols, backend):
+    """Tổng theo nhóm, kết quả sắp xếp theo khóa nhóm (như groupby của pandas)."""
+    if backend == BACKEND_DUCKDB:
+        key_sql = ", ".join(_q(k) for k in keys)
+        sums = ", ".join(f"SUM({_q(c)})::DOUBLE AS {_q(c)}" for c in value_cols)
+        sql = f"SELECT {key_sql}, {sums} FROM t GROUP BY {key_sql} ORDER BY {key_sql}"
+        out = _run_sql(sql, {"t": df[keys + value_cols]})
+        for k in keys:
+            out[k] = out[k].astype(df[k].dtype)
+        out.columns.name = df.columns.name  # giữ tên trục cột của bảng pivot như groupby của pandas
+        return out
+    if backend == BACKEND_POLARS:
+        out = polars_engine.group_sum(df, keys, value_cols)
+        out.columns.name = df.columns.name
+        return out
+    out = df.groupby(keys)[value_cols].sum().reset_index()
+    out[value_cols] = out[value_cols].astype('float64')
+    return out
+
+
+def ads_by_sheet(df, backend=BACKEND_PANDAS):
+    """Tổng hợp Doanh số, Ngân sách, Khách hàng theo người chạy, kèm ROAS và CAC."""
+    out = _group_sum(df, ['sheet'], ['Doanh số', 'Đầu tư ngân sách', 'Số Lượng Khách Hàng'], backend)
+    out['ROAS'] = _ratio(out['Doanh số'], out['Đầu tư ngân sách'])
+    out['CAC'] = _ratio(out['Đầu tư ngân sách'], out['Số Lượng Khách Hàng'])
+    return out
+
+
+def ads_by_campaign(df, backend=BACKEND_PANDAS):
+    """Tổng hợp Doanh số và Ngân sách theo (người chạy, chiến dịch), kèm ROAS."""
+    out = _group_sum(df, ['sheet', 'campaign'], ['Doanh số', 'Đầu tư ngân sách'], backend)
+    out['ROAS'] = _ratio(out['Doanh số'], out['Đầu tư ngân sách'])
+    return out
+
+
+def other_group_label(campaigns, other_label=OTHER_LABEL):
+    """
+    Nhãn của nhóm gộp: `other_label`, hoặc thêm hậu tố nếu đã có chiến dịch thật trùng tên (khi đó
+    treemap sẽ gộp nhầm hai ô cùng đường dẫn người chạy / chiến dịch).
+    """
+    taken = set(campaigns)
+    label, k = other_label, 1
+    while label in taken:
+        label = f"{other_label} (nhóm gộp)" if k == 1 else f"{other_label} (nhóm gộp {k})"
+        k += 1
+    return label
+
+
+def top_campaigns_per_sheet(df_camp_sum, by, n, other_label=OTHER_LABEL):
+    """
+    Giữ `n` chiến dịch có `by` lớn nhất của mỗi người chạy (chọn từng phần bằng nlargest, không
+    sắp xếp toàn bộ), các chiến dịch còn lại gộp thành một dòng cho mỗi người chạy, nhãn
+    `other_group_label(...)` (không trùng tên chiến dịch thật).
+    Trả về (bảng để vẽ biểu đồ, bảng các chiến dịch đã bị gộp để xem chi tiết).
+    Bảng vẽ có thêm cột 'Số chiến dịch' (số chiến dịch mà mỗi dòng đại diện) và cột 'is_other'
+    (True ở dòng gộp).
+    """
+    if n is None or n <= 0 or df_camp_sum.empty:
+        out = df_camp_sum.copy()
+        out['Số chiến dịch'] = 1
+        out['is_other'] = False
+        return out, df_camp_sum.iloc[:0]
+
+    top_idx = df_camp_sum.groupby('sheet', sort=False)[by].nlargest(n).index.get_level_values(-1)
+    is_top = df_camp_sum.index.isin(top_idx)
+    top = df_camp_sum[is_top].copy()
+    top['Số chiến dịch'] = 1
+    top['is_other'] = False
+    rest = df_camp_sum[~is_top]
+    if rest.empty:
+        return top, rest
+
+    value_cols = [c for c in ['Doanh số', 'Đầu tư ngân sách'] if c in rest.columns]
+    other = rest.groupby('sheet', sort=False)[value_cols].sum()
+    other['Số chiến dịch'] = rest.groupby('sheet', sort=False).size()
+    other = other.reset_index()
+    other.insert(1, 'campaign', other_group_label(df_camp_sum['campaign'].unique(), other_label))
+    other['is_other'] = True
+    if 'ROAS' in df_camp_sum.columns:
+        other['ROAS'] = _ratio(other['Doanh số'], other['Đầu tư ngân sách'])
+    out = pd.concat([top, other[top.columns]], ignore_index=True)
+    out = out.sort_values('sheet', kind='stable', ignore_index=True)
+    return out, rest.sort_values(['sheet', by], ascending=[True, False], kind='stable')
+
+
+def ads_by_date(df, backend=BACKEND_PANDAS):
+    """Tổng hợp Doanh số và Ngân sách theo ngày, kèm ROAS."""
+    out = _group_sum(df, ['date'], ['Doanh số', 'Đầu tư ngân sách'], backend)
+    out['ROAS'] = _ratio(out['Doanh số'], out['Đầu tư ngân sách'])
+    return out
+
+
+def ads_rollups(df):
+    """Tổng hợp sẵn các chỉ số quảng cáo theo ngày / tuần / tháng cho biểu đồ xu hướng."""
+    return TimeRollups(df, 'date', ['sheet', 'campaign'], AD_KPI_COLS, levels=AD_TREND_LEVELS)
+
+
+def ads_by_period(rollups, level, start_date, end_date, sheets=None, campaigns=None):
+    """Như ads_by_date nhưng theo kỳ `level` (ngày đầu kỳ ở cột 'date'), đọc từ bảng tổng hợp sẵn."""
+    out = rollups.query(level, start_date, end_date, sheet=sheets, campaign=campaigns)
+    out = out[['date', 'Doanh số', 'Đầu tư ngân sách']]
+    out['ROAS'] = _ratio(out['Doanh số'], out['Đầu tư ngân sách'])
+    return out
+
+
+def rolling_lookback(start_date, windows=ROLLING_WINDOWS):
+    """Ngày bắt đầu cần lọc để cửa sổ trượt dài nhất tại `start_date` đã đủ dữ liệu."""
+    return start_date - pd.Timedelta(days=max(windows) - 1)
+
+
+def ads_rolling(df, start_date, end_date, by, windows=ROLLING_WINDOWS):
+    """
+    ROAS và CAC trượt `windows` ngày theo `by` (['sheet'] hoặc ['sheet', 'campaign']), giữ các
+    ngày trong [start_date, end_date]. `df` nên được lọc từ `rolling_lookback(start_date)` để các
+    cửa sổ đầu khoảng không bị thiếu dữ liệu.
+    """
+    out = rolling_sums(df, 'date', by, AD_ROLLING_COLS, windows)
+    for w in windows:
+        revenue, budget, customers = (out[window_col(c, w)] for c in AD_ROLLING_COLS)
+        out[window_col('ROAS', w)] = _ratio(revenue, budget)
+        out[window_col('CAC', w)] = _ratio(budget, customers)
+    dates = out['date']
+    return out[((dates >= pd.Timestamp(start_date)) & (dates <= pd.Timestamp(end_date))).to_numpy()].reset_index(drop=True)
+
+
+# ========================== DASHBOARD SOCIAL ==========================
+
+def filter_social(df, channel_names, start_date, end_date, backend=BACKEND_PANDAS, index=None):
+    """
+    Lọc dữ liệu social (dạng wide) theo tên kênh và khoảng ngày bắt đầu.
+    Nếu có `index` (FilterIndex dựng trên chính `df`), engine pandas dùng phép giao bitmap.
+    """
+    if backend == BACKEND_DUCKDB:
+        params = []
+        conditions = [_in_clause('Tên kênh', channel_names, params)]
+        conditions.append('CAST("Ngày Bắt Đầu" AS DATE) BETWEEN ? AND ?')
+        params.extend([start_date, end_date])
+        positions = _filter_positions(df, conditions, params, ['Tên kênh', 'Ngày Bắt Đầu'])
+        return df.iloc[positions].copy()
+    if backend == BACKEND_POLARS:
+        positions = polars_engine.filter_positions(df, 'Ngày Bắt Đầu', start_date, end_date, {'Tên kênh': channel_names})
+        return df.iloc[positions].copy()
+
+    if index is not None:
+        return df[index.mask(start_date, end_date, **{'Tên kênh': channel_names})].copy()
+
+    start_dates = pd.to_datetime(df['Ngày Bắt Đầu']).dt.date
+    return df[
+        (df['Tên kênh'].isin(channel_names)) &
+        (start_dates >= start_date) &
+        (start_dates <= end_date)
+    ].copy()
+
+
+def social_kpi_totals(df, backend=BACKEND_PANDAS):
+    """
+    Tính tổng Lượt xem, Tương tác, Số bài đăng và tổng Follower cuối kỳ
+    (Follower của mốc thời gian mới nhất ở mỗi kênh).
+    """
+    if backend == BACKEND_DUCKDB:
+        frame = df[SOCIAL_KPI_COLS + ['Tên kênh', 'Ngày Bắt Đầu', 'Follower']].copy()
+        frame['_pos'] = np.arange(len(frame))
+        sums = ", ".join(f"COALESCE(SUM({_q(c)}), 0)::DOUBLE AS {_q(c)}" for c in SOCIAL_KPI_COLS)
+        row = _run_sql(f"SELECT {sums} FROM t", {"t": frame}).iloc[0]
+        followers = _run_sql(
+            'SELECT COALESCE(SUM(f), 0)::DOUBLE AS f FROM ('
+            '  SELECT arg_max("Follower", ("Ngày Bắt Đầu", _pos)) AS f FROM t GROUP BY "Tên kênh"'
+            ')',
+            {"t": frame},
+        ).iloc[0]['f']
+        totals = {c: float(row[c]) for c in SOCIAL_KPI_COLS}
+        totals['Follower'] = float(followers)
+        return totals
+    if backend == BACKEND_POLARS:
+        totals = polars_engine.totals(df, SOCIAL_KPI_COLS)
+        totals['Follower'] = polars_engine.last_sum(df, 'Tên kênh', 'Ngày Bắt Đầu', 'Follower')
+        return totals
+
+    totals = {c: float(df[c].sum()) for c in SOCIAL_KPI_COLS}
+    latest = df.sort_values(by='Ngày Bắt Đầu', kind='stable').groupby('Tên kênh').tail(1)
+    totals['Follower'] = float(latest['Follower'].sum())
+    return totals
+
+
+def social_by_channel(df, backend=BACKEND_PANDAS):
+    """Tổng Lượt xem và Tương tác theo tên kênh."""
+    return _group_sum(df, ['Tên kênh'], ["Lượt xem (views)", "Engagement (like/ cmt/ share)"], backend)
+
+
+def content_mix(df, content_columns, backend=BACKEND_PANDAS):
+    """
+    Số lượng từng loại nội dung theo tên kênh (dạng long) kèm tổng bài đăng của kênh và tỷ lệ (%)
+    của mỗi loại; kênh không có bài đăng nào có tỷ lệ 0.
+    """
+    if backend == BACKEND_POLARS:
+        return polars_engine.content_mix(df, 'Tên kênh', content_columns)
+    df_grouped = df.groupby('Tên kênh')[content_columns].sum().reset_index()
+    # Chuyển từ định dạng wide sang long, rồi broadcast tổng số bài đăng về lại cho mỗi dòng của kênh
+    df_melted = df_grouped.melt(
+        id_vars=['Tên kênh'], value_vars=content_columns, var_name='Loại nội dung', value_name='Số lượng'
+    )
+    df_melted['Tổng bài đăng'] = df_melted.groupby('Tên kênh')['Số lượng'].transform('sum')
+    df_melted['Tỷ lệ (%)'] = (df_melted['Số lượng'] / df_melted['Tổng bài đăng'].replace(0, 1)) * 100
+    return df_melted
+
+
+def social_rollups(df):
+    """
+    Tổng hợp sẵn các chỉ số social theo tuần / tháng cho biểu đồ xu hướng (Follower lấy giá trị
+    cuối kỳ). Bảng có cả cột tuần và cột tháng thì chỉ dùng các dòng tuần, để một kỳ không bị
+    cộng hai lần và mỗi đường chỉ có một loại mốc thời gian.
+    """
+    weekly = df['Loại thời gian'] == 'Tuần'
+    base = df[weekly.to_numpy()] if weekly.any() else df
+    return TimeRollups(base, 'Ngày Bắt Đầu', ['Kênh', 'Tên kênh'], SOCIAL_TREND_COLS,
+                       last_cols=['Follower'], levels=SOCIAL_TREND_LEVELS)
+
+
+def social_by_period(rollups, level, start_date, end_date, channel_names=None):
+    """Lượt xem, Tương tác (tổng) và Follower (cuối kỳ) theo tên kênh và kỳ `level`."""
+    return rollups.query(level, start_date, end_date, by=['Tên kênh'], **{'Tên kênh': channel_names})
+
+
+def social_growth(rollups, start_date, end_date, channel_names=None):
+    """
+    Lượt xem, Tương tác (tổng tuần), Follower (cuối tuần) theo kênh kèm tăng trưởng (%) so với
+    tuần trước. Tuần liền trước `start_date` cũng được đọc để tuần đầu khoảng có số so sánh.
+    """
+    weekly = social_by_period(rollups, WEEK, start_date - pd.Timedelta(days=7), end_date, channel_names)
+    out = period_growth(weekly, 'Ngày Bắt Đầu', ['Tên kênh'], SOCIAL_GROWTH_COLS, period_days=7)
+    return out[(out['Ngày Bắt Đầu'] >= pd.Timestamp(start_date)).to_numpy()].reset_index(drop=True)
@@ -0,0 +1,90 @@
+import importlib.util
+import os
+from io import BytesIO
+
+# Thứ tự ưu tiên engine đọc file Excel: calamine (Rust, nhanh hơn nhiều) rồi tới openpyxl.
+# Có thể ép dùng một engine cụ thể qua biến môi trường DASHBOARD_EXCEL_ENGINE.
+ENGINE_PREFERENCE = ("calamine", "openpyxl")
+ENGINE_ENV_VAR = "DASHBOARD_EXCEL_ENGINE"
+
+_ENGINE_MODULES = {"calamine": "python_calamine", "openpyxl": "openpyxl"}
+
+
+def available_engines():
+    """Trả về các engine đọc Excel đã được cài đặt, theo thứ tự ưu tiên."""
+    return [e for e in ENGINE_PREFERENCE if importlib.util.find_spec(_ENGINE_MODULES[e]) is not None]
+
+
+def _candidate_engines(engine=None):
+    """Danh sách engine sẽ thử lần lượt. `None` ở cuối là để pandas tự chọn (vd: xlrd cho .xls)."""
+    forced = engine or os.environ.get(ENGINE_ENV_VAR)
+    if forced:
+        return [forced]
+    return available_engines() + [None]
+
+
+def _as_buffer(source):
+    """
+    Đọc nguồn dữ liệu (URL, đường dẫn, file upload) vào bộ nhớ đúng một lần
+    để có thể thử lại với engine khác mà không phải tải lại.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        return BytesIO(source)
+    if isinstance(source, str) and source.startswith(("http://", "https://")):
+        # Dùng session của utils/gsheets (timeout + thử lại) thay vì urlopen không giới hạn thời gian
+        from utils.gsheets import download
+        return BytesIO(download(source))
+    if hasattr(source, "read"):
+        if hasattr(source, "getvalue"):
+            return BytesIO(source.getvalue())
+        source.seek(0)
+        return BytesIO(source.read())
+    return source
+
+
+def read_bytes(source):
+    """Đọc toàn bộ nội dung nguồn dữ liệu (URL, file upload, bytes) thành bytes."""
+    buffer = _as_buffer(source)
+    if hasattr(buffer, "getvalue"):
+        return buffer.getvalue()
+    with open(buffer, "rb") as f:
+        return f.read()
+
+
+def _try_engines(open_fn, source, engine):
+    """Gọi `open_fn(buffer, engine)` với từng engine cho tới khi thành công."""
+    buffer = _as_buffer(source)
+    last_error = None
+    for candidate in _candidate_engines(engine):
+        if hasattr(buffer, "seek"):
+            buffer.seek(0)
+        try:
+            return open_fn(buffer, candidate), candidate
+        except Exception as e:
+            last_error = e
+    raise last_error
+
+
+def open_excel(source, engine=None):
+    """
+    Mở workbook bằng engine nhanh nhất hiện có (fallback sang openpyxl).
+    Trả về `pd.ExcelFile`; engine thực sự được dùng nằm ở thuộc tính `.engine`.
+    """
+    import pandas as pd
+    xls, _ = _try_engines(lambda buf, eng: pd.ExcelFile(buf, engine=eng), source, engine)
+    return xls
+
+
+def read_excel(source, engine=None, **kwargs):
+    """
+    Đọc một sheet như `pd.read_excel` nhưng tự chọn engine nhanh nhất hiện có.
+    Trả về (DataFrame, tên engine đã dùng).
+    """
+    import pandas as pd
+
+    def _read(buf, eng):
+        with pd.ExcelFile(buf, engine=eng) as xls:
+            return xls.parse(**kwargs), xls.engine
+
+    (df, used), _ = _try_engines(_read, source, engine)
+    return df, used
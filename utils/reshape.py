@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+from utils import polars_engine
+
+# Chuyển dữ liệu dạng long sang wide bằng khóa mã hóa số nguyên và ghi trực tiếp vào mảng
+# cấp phát sẵn, thay cho `pivot_table` (vốn đi vào nhánh groupby-apply chậm với cột object).
+# Kết quả giống hệt `df.pivot_table(index=..., columns=..., values=..., aggfunc=...).reset_index()`.
+SUPPORTED_AGGFUNCS = ("first", "sum")
+
+
+def _first_positions(key, size):
+    """Vị trí dòng đầu tiên của mỗi giá trị khóa trong [0, size); bằng len(key) nếu khóa không xuất hiện."""
+    first = np.full(size, len(key), dtype=np.int64)
+    np.minimum.at(first, key, np.arange(len(key), dtype=np.int64))
+    return first
+
+
+def _group_codes(df, index):
+    """
+    Mã hóa các cột index thành một mã nhóm duy nhất cho mỗi dòng, theo thứ tự đã sắp xếp
+    (giống groupby sort=True). Trả về (mã nhóm từng dòng, vị trí dòng đại diện mỗi nhóm).
+    """
+    codes, sizes = [], []
+    for col in index:
+        c, uniques = pd.factorize(df[col], sort=True)
+        codes.append(c)
+        sizes.append(max(len(uniques), 1))
+
+    n_keys = float(np.prod(sizes, dtype='float64'))
+    if n_keys <= max(4 * len(df), 1 << 20):
+        # Không gian khóa nhỏ: đánh dấu trên mảng dày đặc, không cần sắp xếp
+        key = np.ravel_multi_index(codes, sizes)
+        first_of_key = _first_positions(key, int(n_keys))
+        present = first_of_key < len(key)
+        key_to_group = np.cumsum(present) - 1
+        return key_to_group[key], first_of_key[present]
+
+    if n_keys < 2 ** 62:
+        # Mã hóa bằng bảng băm (O(n)), chỉ sắp xếp danh sách khóa duy nhất (nhỏ hơn nhiều)
+        key = np.ravel_multi_index(codes, sizes)
+        appearance, uniq = pd.factorize(key)
+        rank = np.empty(len(uniq), dtype=np.int64)
+        rank[np.argsort(uniq, kind='stable')] = np.arange(len(uniq))
+        first_rows = _first_positions(appearance, len(uniq))
+        group = rank[appearance]
+        return group, first_rows[np.argsort(rank)]
+
+    # Quá nhiều tổ hợp để gộp thành một số nguyên: sắp xếp theo từng cột
+    order = np.lexsort(codes[::-1])
+    stacked = np.vstack([c[order] for c in codes])
+    new_group = np.ones(len(order), dtype=bool)
+    new_group[1:] = (stacked[:, 1:] != stacked[:, :-1]).any(axis=0)
+    group = np.empty(len(order), dtype=np.int64)
+    group[order] = np.cumsum(new_group) - 1
+    return group, order[new_group]
+
+
+def pivot_wide(df, index, columns, values, aggfunc="first", engine=None):
+    """
+    Chuyển long -> wide với aggfunc 'first' (giá trị khác rỗng đầu tiên của mỗi ô, theo thứ tự
+    dòng) hoặc 'sum' (tổng bỏ qua NaN). Ô không có dữ liệu là NaN. Các dòng có khóa index hoặc
+    khóa cột bị thiếu sẽ bị loại (giống `pivot_table`). `engine`: 'pandas' / 'polars' cho bước
+    mã hóa khóa (mặc định theo DASHBOARD_DATAFRAME_ENGINE, xem utils/polars_engine.py).
+    """
+    if aggfunc not in SUPPORTED_AGGFUNCS:
+        raise ValueError(f"aggfunc phải là một trong {SUPPORTED_AGGFUNCS}")
+
+    keep = df[index + [columns]].notna().all(axis=1).to_numpy().copy()
+    if aggfunc == "first":
+        keep &= df[values].notna().to_numpy()
+    data = df[keep]
+
+    use_polars = polars_engine.enabled() if engine is None else engine == polars_engine.ENGINE_POLARS
+    try:
+        if use_polars:
+            group, first_rows, col_codes, col_labels = polars_engine.encode_keys(data, index, columns)
+        else:
+            group, first_rows = _group_codes(data, index)
+            col_codes, col_labels = pd.factorize(data[columns], sort=True)
+    except TypeError:
+        # Cột chứa kiểu dữ liệu lẫn lộn không sắp xếp được: dùng lại pivot_table của pandas
+        return df.pivot_table(index=index, columns=columns, values=values, aggfunc=aggfunc).reset_index()
+
+    n_groups, n_cols = len(first_rows), len(col_labels)
+    cell = group * n_cols + col_codes
+    vals = data[values].to_numpy()
+    is_numeric = pd.api.types.is_numeric_dtype(data[values].dtype) and not pd.api.types.is_bool_dtype(data[values].dtype)
+
+    if aggfunc == "first":
+        first_of_cell = _first_positions(cell, n_groups * n_cols)
+        filled_cells = np.flatnonzero(first_of_cell < len(cell))
+        first_idx = first_of_cell[filled_cells]
+        complete = len(filled_cells) == n_groups * n_cols
+        if not is_numeric:
+            dtype = object
+        else:
+            dtype = vals.dtype if complete else np.float64
+        out = np.empty(n_groups * n_cols, dtype=dtype)
+        if not complete:
+            out[:] = np.nan
+        out[filled_cells] = vals[first_idx]
+    else:
+        weights = np.nan_to_num(vals.astype(np.float64))
+        out = np.bincount(cell, weights=weights, minlength=n_groups * n_cols)
+        counts = np.bincount(cell, minlength=n_groups * n_cols)
+        if (counts > 0).all() and pd.api.types.is_integer_dtype(data[values].dtype):
+            out = out.astype(data[values].dtype)
+        else:
+            out[counts == 0] = np.nan
+
+    # Giá trị không phải số giữ nguyên dtype gốc (object / str) như pivot_table
+    wide_dtype = None if is_numeric or aggfunc != "first" else data[values].dtype
+    wide = pd.DataFrame(out.reshape(n_groups, n_cols), columns=pd.Index(col_labels, name=columns), dtype=wide_dtype)
+    keys = data[index].iloc[first_rows].reset_index(drop=True)
+    result = pd.concat([keys, wide], axis=1)
+    result.columns.name = columns
+    return result
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+from utils.rollups import bucket_start
+
+# Chỉ số trượt theo thời gian cho phần phân tích xu hướng. Mọi chuỗi (người chạy, chiến dịch,
+# kênh...) được tính trong một lượt trên bảng đã sắp xếp theo (khóa, ngày): tổng trượt lấy
+# hiệu của tổng cộng dồn, đầu cửa sổ tìm bằng searchsorted; so sánh kỳ trước dùng phép dịch
+# một dòng có kiểm tra cùng chuỗi. Không có vòng lặp Python theo từng nhóm.
+ROLLING_WINDOWS = (7, 14, 30)  # số ngày của các cửa sổ trượt
+
+
+def window_col(col, window):
+    """Tên cột của chỉ số `col` trượt `window` ngày."""
+    return f"{col} ({window} ngày)"
+
+
+def growth_col(col):
+    """Tên cột tăng trưởng (%) của `col` so với kỳ trước."""
+    return f"{col} (% so với kỳ trước)"
+
+
+def _series_layout(frame, keys, date_col):
+    """Mã chuỗi (tăng dần theo thứ tự dòng) và số ngày của mỗi dòng trong bảng đã sắp xếp."""
+    groups = frame.groupby(keys, sort=False, observed=True, dropna=False).ngroup().to_numpy()
+    days = frame[date_col].to_numpy('datetime64[D]').astype('int64')
+    return groups, days
+
+
+def rolling_sums(df, date_col, keys, value_cols, windows=ROLLING_WINDOWS):
+    """
+    Tổng trượt theo lịch của `value_cols` cho từng chuỗi `keys`: giá trị tại mỗi ngày là tổng
+    `w` ngày tính đến hết ngày đó (ngày không có dữ liệu tính là 0). Trả về bảng gộp theo
+    (keys, ngày) gồm các cột gốc và các cột `window_col(col, w)`.
+    """
+    keys = list(keys)
+    daily = df.groupby(keys + [date_col], sort=True, observed=True)[value_cols].sum().reset_index()
+    if daily.empty:
+        for w in windows:
+            for col in value_cols:
+                daily[window_col(col, w)] = pd.Series(dtype='float64')
+        return daily
+
+    groups, days = _series_layout(daily, keys, date_col)
+    # Khóa ghép (chuỗi, ngày) tăng dần; khoảng cách giữa hai chuỗi lớn hơn mọi cửa sổ nên
+    # searchsorted không bao giờ lấn sang chuỗi trước
+    days = days - days.min()
+    stride = int(days.max()) + max(windows) + 1
+    position = groups.astype('int64') * stride + days
+    values = daily[value_cols].to_numpy('float64')
+    cumsum = np.vstack([np.zeros((1, len(value_cols))), np.cumsum(values, axis=0)])
+    end = np.arange(1, len(daily) + 1)
+    for w in windows:
+        start = np.searchsorted(position, position - (w - 1), side='left')
+        sums = cumsum[end] - cumsum[start]
+        for j, col in enumerate(value_cols):
+            daily[window_col(col, w)] = sums[:, j]
+    return daily
+
+
+def period_growth(df, date_col, keys, value_cols, period_days=7):
+    """
+    Tăng trưởng (%) của `value_cols` so với kỳ liền trước (cách đúng `period_days` ngày) trong
+    từng chuỗi `keys`; `df` có tối đa một dòng cho mỗi (khóa, ngày). Kỳ trước bị thiếu hoặc bằng
+    0 cho kết quả NaN. Trả về bảng đã sắp xếp kèm các cột `growth_col(col)`.
+    """
+    keys = list(keys)
+    frame = df.sort_values(keys + [date_col], kind='stable', ignore_index=True)
+    groups, days = _series_layout(frame, keys, date_col)
+    follows = np.zeros(len(frame), dtype=bool)
+    follows[1:] = (groups[1:] == groups[:-1]) & (days[1:] - days[:-1] == period_days)
+    for col in value_cols:
+        current = frame[col].to_numpy('float64')
+        previous = np.full(len(current), np.nan)
+        previous[1:] = current[:-1]
+        growth = np.full(len(current), np.nan)
+        np.divide(current - previous, previous, out=growth, where=follows & (previous > 0))
+        frame[growth_col(col)] = growth * 100
+    return frame
+
+
+def last_per_period(df, date_col, keys, level):
+    """Dòng cuối cùng của mỗi chuỗi trong từng kỳ `level` (để vẽ chỉ số trượt với ít điểm hơn)."""
+    periods = bucket_start(df[date_col], level)
+    return df.groupby([df[k] for k in keys] + [periods], sort=False, observed=True).tail(1)
@@ -0,0 +1,119 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Tổng hợp sẵn theo nhiều độ phân giải thời gian (ngày / tuần / tháng) cho các biểu đồ xu hướng.
+# Khoảng thời gian dài được vẽ ở độ phân giải thô hơn: ít dòng phải gộp và ít điểm phải gửi
+# xuống trình duyệt. Chế độ "Tự động" chọn độ phân giải chi tiết nhất mà mỗi đường vẫn nằm
+# trong ngân sách điểm (đặt qua biến môi trường DASHBOARD_CHART_POINT_BUDGET).
+POINT_BUDGET_ENV_VAR = "DASHBOARD_CHART_POINT_BUDGET"
+DEFAULT_POINT_BUDGET = 90  # số điểm tối đa trên mỗi đường của biểu đồ xu hướng
+
+AUTO = "Tự động"
+DAY, WEEK, MONTH = "Ngày", "Tuần", "Tháng"
+_PERIOD_FREQ = {WEEK: "W", MONTH: "M"}  # tuần bắt đầu từ thứ Hai
+_PERIOD_DAYS = {DAY: 1, WEEK: 7, MONTH: 30}
+
+
+def point_budget():
+    """Số điểm tối đa trên mỗi đường (đặt qua biến môi trường DASHBOARD_CHART_POINT_BUDGET)."""
+    try:
+        return max(1, int(os.environ.get(POINT_BUDGET_ENV_VAR, DEFAULT_POINT_BUDGET)))
+    except ValueError:
+        return DEFAULT_POINT_BUDGET
+
+
+def choose_level(start_date, end_date, levels, budget=None):
+    """Độ phân giải chi tiết nhất trong `levels` mà khoảng ngày không vượt ngân sách điểm."""
+    budget = budget or point_budget()
+    days = (end_date - start_date).days + 1
+    for level in levels:
+        if days / _PERIOD_DAYS[level] <= budget:
+            return level
+    return levels[-1]
+
+
+def resolve_level(choice, start_date, end_date, levels):
+    """Độ phân giải người dùng chọn; với "Tự động" thì chọn theo ngân sách điểm."""
+    return choose_level(start_date, end_date, levels) if choice == AUTO else choice
+
+
+def bucket_start(dates, level):
+    """Ngày đầu kỳ (đầu tuần thứ Hai / đầu tháng) của mỗi ngày; với DAY là chính ngày đó."""
+    dates = pd.to_datetime(dates, errors='coerce')
+    if level == DAY:
+        return dates.dt.normalize()
+    return dates.dt.to_period(_PERIOD_FREQ[level]).dt.start_time
+
+
+def bucket_end(starts, level):
+    """Ngày cuối kỳ ứng với ngày đầu kỳ `starts`."""
+    if level == DAY:
+        return starts
+    if level == WEEK:
+        return starts + pd.Timedelta(days=6)
+    return starts + pd.offsets.MonthEnd(0)
+
+
+class TimeRollups:
+    """
+    Bảng tổng hợp theo từng độ phân giải thời gian, dựng một lần khi nạp dữ liệu:
+    - mức đầu tiên của `levels` là dữ liệu gốc (gộp theo khóa + ngày, không đổi mốc thời gian),
+      các mức sau gộp theo kỳ (tuần bắt đầu thứ Hai / tháng);
+    - `sum_cols` được cộng dồn, `last_cols` (chỉ số tích lũy như Follower) lấy giá trị cuối kỳ.
+    Truy vấn chỉ đọc các dòng tổng hợp của những kỳ nằm trọn trong khoảng ngày; kỳ bị cắt ở hai
+    đầu khoảng được tính lại từ mức gốc nên kết quả khớp với việc gộp trực tiếp dữ liệu đã lọc.
+    """
+
+    def __init__(self, df, date_col, keys, sum_cols, last_cols=(), levels=(DAY, WEEK, MONTH)):
+        self.date_col = date_col
+        self.keys = list(keys)
+        self.sum_cols = list(sum_cols)
+        self.last_cols = list(last_cols)
+        self.levels = list(levels)
+        dates = pd.to_datetime(df[date_col], errors='coerce')
+        base = df[self.keys + self.sum_cols + self.last_cols].assign(**{date_col: dates})
+        # Sắp xếp theo ngày để "giá trị cuối kỳ" là giá trị của mốc thời gian mới nhất
+        base = base[dates.notna().to_numpy()].sort_values(date_col, kind='stable')
+        self._frames = {self.levels[0]: self._aggregate(base)}
+        for level in self.levels[1:]:
+            self._frames[level] = self._aggregate(base.assign(**{date_col: bucket_start(base[date_col], level)}))
+
+    def _aggregate(self, frame):
+        agg = {**dict.fromkeys(self.sum_cols, 'sum'), **dict.fromkeys(self.last_cols, 'last')}
+        return frame.groupby(self.keys + [self.date_col], sort=True, observed=True).agg(agg).reset_index()
+
+    def _select(self, frame, filters, start=None, end=None):
+        mask = np.ones(len(frame), dtype=bool)
+        if start is not None:
+            dates = frame[self.date_col]
+            mask &= ((dates >= start) & (dates <= end)).to_numpy()
+        for col, values in filters.items():
+            if values is not None:
+                mask &= frame[col].isin(values).to_numpy()
+        return frame[mask]
+
+    def query(self, level, start_date, end_date, by=(), **filters):
+        """
+        Tổng theo (`by` + ngày đầu kỳ) ở độ phân giải `level` trong khoảng [start_date, end_date].
+        `filters`: cột khóa -> danh sách giá trị được chọn (None = không lọc cột đó).
+        """
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        base = self._select(self._frames[self.levels[0]], filters, start, end)
+        if level == self.levels[0]:
+            combined = base
+        else:
+            frame = self._frames[level]
+            starts = frame[self.date_col]
+            full = self._select(frame[((starts >= start) & (bucket_end(starts, level) <= end)).to_numpy()], filters)
+            # Kỳ bị cắt ở hai đầu khoảng ngày: gộp lại từ các dòng gốc nằm trong khoảng
+            base_starts = bucket_start(base[self.date_col], level)
+            partial = ((base_starts < start) | (bucket_end(base_starts, level) > end)).to_numpy()
+            edges = base[partial].assign(**{self.date_col: base_starts[partial]})
+            combined = self._aggregate(pd.concat([full, edges], ignore_index=True)) if len(edges) else full
+
+        value_cols = self.sum_cols + self.last_cols
+        out = combined.groupby(list(by) + [self.date_col], sort=True, observed=True)[value_cols].sum().reset_index()
+        out[value_cols] = out[value_cols].astype('float64')
+        return out.sort_values(self.date_col, kind='stable', ignore_index=True)
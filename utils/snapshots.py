@@ -0,0 +1,310 @@
+import hashlib
+import html
+import json
+import logging
+import os
+import shutil
+import threading
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+from utils.executor import run_jobs
+from utils.helpers import ads_kpi_cards, social_kpi_cards, render_kpi_cards
+
+logger = logging.getLogger(__name__)
+
+# ========================== ẢNH CHỤP BÁO CÁO DỰNG SẴN ==========================
+# Các khoảng thời gian hay dùng (7/30/90 ngày gần nhất, tháng này) với toàn bộ người chạy / kênh
+# được dựng sẵn một lần cho mỗi bộ dữ liệu: KPI và biểu đồ (JSON đã thu gọn) cùng một file HTML
+# độc lập để tải về. Việc dựng chạy nền song song trong process pool ngay sau khi nạp dữ liệu;
+# các lần xem sau chỉ đọc lại file, không lọc / tổng hợp / vẽ lại.
+# Pandas và plotly chỉ được nạp bên trong các hàm dựng (chạy trong pool).
+SNAPSHOT_DIR_ENV_VAR = "DASHBOARD_SNAPSHOT_DIR"
+DEFAULT_SNAPSHOT_DIR = os.path.join(".cache", "snapshots")
+MAX_DATASETS_PER_PAGE = 4  # số bộ dữ liệu được dùng gần nhất được giữ ảnh chụp trên đĩa (mỗi trang)
+SNAPSHOT_VERSION = 3  # tăng khi nội dung ảnh chụp thay đổi để không dùng lại ảnh chụp cũ trên đĩa
+
+CUSTOM_PRESET = "Tùy chọn"
+PRESETS = {  # nhãn hiển thị -> tên file
+    "7 ngày gần nhất": "last_7_days",
+    "30 ngày gần nhất": "last_30_days",
+    "90 ngày gần nhất": "last_90_days",
+    "Tháng này": "month_to_date",
+}
+_PRESET_DAYS = {"7 ngày gần nhất": 7, "30 ngày gần nhất": 30, "90 ngày gần nhất": 90}
+
+_building = set()
+_building_lock = threading.Lock()
+
+
+def snapshot_dir():
+    """Thư mục lưu ảnh chụp (đặt qua biến môi trường DASHBOARD_SNAPSHOT_DIR)."""
+    return os.environ.get(SNAPSHOT_DIR_ENV_VAR, DEFAULT_SNAPSHOT_DIR)
+
+
+def preset_range(preset, min_date, max_date):
+    """
+    Khoảng ngày (bắt đầu, kết thúc) của một mốc nhanh, tính đến ngày mới nhất của dữ liệu
+    (không phải ngày hôm nay) và không sớm hơn ngày đầu tiên của dữ liệu.
+    """
+    if preset == "Tháng này":
+        start = max_date.replace(day=1)
+    else:
+        start = max_date - timedelta(days=_PRESET_DAYS[preset] - 1)
+    return max(start, min_date), max_date
+
+
+def data_fingerprint(df, *params):
+    """Mã băm nội dung của DataFrame (kèm các tham số dựng báo cáo), dùng làm khóa ảnh chụp."""
+    import pandas as pd
+    h = hashlib.sha1()
+    h.update(repr((SNAPSHOT_VERSION, list(df.columns), params)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:20]
+
+
+def _path(page, key, preset, ext):
+    return os.path.join(snapshot_dir(), page, key, f"{PRESETS[preset]}.{ext}")
+
+
+def _write_atomic(path, text):
+    tmp = f"{path}.tmp{threading.get_ident()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _touch(page, key):
+    """Ghi nhận bộ dữ liệu `key` vừa được dùng (thời điểm sửa đổi của thư mục), xem `_prune`."""
+    try:
+        os.utime(os.path.join(snapshot_dir(), page, key))
+    except OSError:
+        pass
+
+
+def _prune(page):
+    """
+    Chỉ giữ ảnh chụp của MAX_DATASETS_PER_PAGE bộ dữ liệu được dùng gần nhất (mỗi lần đọc hoặc kiểm
+    tra ảnh chụp đều cập nhật thời điểm của thư mục), không xóa bộ dữ liệu đang được dựng.
+    """
+    page_dir = os.path.join(snapshot_dir(), page)
+    try:
+        keys = [k for k in os.listdir(page_dir) if os.path.isdir(os.path.join(page_dir, k))]
+    except OSError:
+        return
+    keys.sort(key=lambda k: os.path.getmtime(os.path.join(page_dir, k)), reverse=True)
+    with _building_lock:
+        building = {k for p, k in _building if p == page}
+    for old in keys[MAX_DATASETS_PER_PAGE:]:
+        if old not in building:
+            shutil.rmtree(os.path.join(page_dir, old), ignore_errors=True)
+
+
+# ========================== DỰNG ẢNH CHỤP (CHẠY TRONG POOL) ==========================
+
+def _figure_entries(figures):
+    """[(mục, tên, figure)] -> danh sách dict JSON-được, biểu đồ đã thu gọn."""
+    from utils.plotting import compact_figure
+    return [
+        {"section": section, "name": name, "json": compact_figure(fig).to_json(validate=False)}
+        for section, name, fig in figures if fig is not None
+    ]
+
+
+def _to_html(title, subtitle, cards, figures):
+    """File HTML độc lập: bảng KPI và các biểu đồ, plotly.js được nhúng một lần."""
+    import plotly.io as pio
+    parts = [
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>",
+        f"<title>{html.escape(title)}</title>",
+        "<style>body{font-family:sans-serif;margin:24px}table{border-collapse:collapse}"
+        "td{border:1px solid #ddd;padding:6px 12px}</style></head><body>",
+        f"<h1>{html.escape(title)}</h1><p>{html.escape(subtitle)}</p><table>",
+    ]
+    for row in cards:
+        parts.append("<tr>" + "".join(
+            f"<td><small>{html.escape(label)}</small><br><b>{html.escape(value)}</b></td>" for label, value in row
+        ) + "</tr>")
+    parts.append("</table>")
+    section = None
+    for i, (fig_section, _, fig) in enumerate(f for f in figures if f[2] is not None):
+        if fig_section != section:
+            section = fig_section
+            parts.append(f"<h2>{html.escape(section)}</h2>")
+        parts.append(pio.to_html(fig, full_html=False, include_plotlyjs=(i == 0)))
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def _snapshot(title, preset, start, end, cards, figures):
+    subtitle = f"{preset}: {start:%d/%m/%Y} – {end:%d/%m/%Y}"
+    return {
+        "title": title,
+        "preset": preset,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "kpis": cards,
+        "figures": _figure_entries(figures),
+        "html": _to_html(title, subtitle, cards, figures),
+    }
+
+
+def build_ads_snapshot(df_pivot, preset, top_n):
+    """Ảnh chụp trang Quảng cáo cho một mốc nhanh, toàn bộ người chạy và chiến dịch."""
+    from utils import plotting
+    from utils.query_engine import (
+        filter_ads, ads_kpi_totals, ads_by_sheet, ads_by_campaign, ads_rollups, ads_by_period,
+        top_campaigns_per_sheet, AD_TREND_LEVELS
+    )
+    from utils.rollups import choose_level
+    start, end = preset_range(preset, df_pivot['date'].min().date(), df_pivot['date'].max().date())
+    df = filter_ads(df_pivot, start, end, None, None)
+    figures = []
+    if not df.empty:
+        df_sheet_sum = ads_by_sheet(df)
+        df_camp_sum = ads_by_campaign(df)
+        revenue, _ = top_campaigns_per_sheet(df_camp_sum[df_camp_sum['Doanh số'] > 0], 'Doanh số', top_n)
+        budget, _ = top_campaigns_per_sheet(df_camp_sum[df_camp_sum['Đầu tư ngân sách'] > 0], 'Đầu tư ngân sách', top_n)
+        bubble, _ = top_campaigns_per_sheet(df_camp_sum, 'Doanh số', top_n)
+        level = choose_level(start, end, AD_TREND_LEVELS)
+        trend = ads_by_period(ads_rollups(df), level, start, end)
+        figures = [
+            ("So sánh theo Người chạy Ads", "Hiệu quả người chạy", plotting.build_runner_scatter(df_sheet_sum)),
+            ("So sánh theo Người chạy Ads", "Doanh số & ngân sách", plotting.build_runner_bar(df_sheet_sum)),
+            ("So sánh theo Chiến dịch", "Treemap doanh số",
+             plotting.build_revenue_treemap(revenue) if not revenue.empty else None),
+            ("So sánh theo Chiến dịch", "Treemap ngân sách",
+             plotting.build_budget_treemap(budget) if not budget.empty else None),
+            ("So sánh theo Chiến dịch", "Phân nhóm chiến dịch", plotting.build_campaign_bubble(bubble)),
+            ("Phân tích Xu hướng theo thời gian", "Xu hướng", plotting.build_ads_trend_chart(trend, level)),
+        ]
+    cards = ads_kpi_cards(ads_kpi_totals(df))
+    return _snapshot("Báo cáo hiệu suất quảng cáo", preset, start, end, cards, figures)
+
+
+def build_social_snapshot(df_wide, preset, content_metrics):
+    """Ảnh chụp trang Social cho một mốc nhanh, toàn bộ kênh."""
+    import pandas as pd
+    from utils import plotting
+    from utils.query_engine import (
+        filter_social, social_kpi_totals, social_by_channel, social_rollups, social_by_period, SOCIAL_TREND_LEVELS
+    )
+    from utils.rollups import choose_level
+    dates = pd.to_datetime(df_wide['Ngày Bắt Đầu'], errors='coerce').dropna()
+    start, end = preset_range(preset, dates.min().date(), dates.max().date())
+    df = filter_social(df_wide, df_wide['Tên kênh'].dropna().unique(), start, end)
+    figures = []
+    if not df.empty:
+        df_grouped = social_by_channel(df)
+        level = choose_level(start, end, SOCIAL_TREND_LEVELS)
+        trend = social_by_period(social_rollups(df), level, start, end)
+        figures = [
+            ("Xu Hướng Theo Thời Gian", "Lượt xem", plotting.build_views_trend_chart(trend, level)),
+            ("Xu Hướng Theo Thời Gian", "Tương tác", plotting.build_engagement_trend_chart(trend, level)),
+            ("Xu Hướng Theo Thời Gian", "Follower", plotting.build_follower_trend_chart(trend, level)),
+            ("So Sánh Hiệu Suất Giữa Các Kênh", "Lượt xem theo kênh", plotting.build_comparison_bar_chart(
+                df_grouped, 'Tên kênh', "Lượt xem (views)", "Tổng Lượt Xem Theo Tên Kênh")),
+            ("So Sánh Hiệu Suất Giữa Các Kênh", "Tương tác theo kênh", plotting.build_comparison_bar_chart(
+                df_grouped, 'Tên kênh', "Engagement (like/ cmt/ share)", "Tổng Tương Tác Theo Tên Kênh")),
+            ("Phân Tích Cơ Cấu Nội Dung", "Cơ cấu nội dung", plotting.build_content_pie_chart(df, content_metrics)),
+            ("Phân Tích Cơ Cấu Nội Dung", "Nội dung theo kênh",
+             plotting.build_content_distribution_bar_chart(df, content_metrics)),
+        ]
+    cards = social_kpi_cards(social_kpi_totals(df))
+    return _snapshot("Báo cáo hiệu suất Social Media", preset, start, end, cards, figures)
+
+
+# ========================== LƯU & ĐỌC ẢNH CHỤP ==========================
+
+def _build_missing(page, key, builder, data, presets, kwargs):
+    try:
+        results = run_jobs([(builder, (data, preset), kwargs) for preset in presets])
+        for preset, result in zip(presets, results):
+            if isinstance(result, Exception):
+                logger.warning("Không dựng được ảnh chụp %s/%s: %s", page, preset, result)
+                continue
+            os.makedirs(os.path.dirname(_path(page, key, preset, "json")), exist_ok=True)
+            # File JSON được ghi sau cùng: có file JSON nghĩa là ảnh chụp đã đầy đủ
+            _write_atomic(_path(page, key, preset, "html"), result.pop("html"))
+            _write_atomic(_path(page, key, preset, "json"), json.dumps(result, ensure_ascii=False))
+        _prune(page)
+    except Exception:
+        logger.exception("Lỗi khi dựng ảnh chụp báo cáo cho trang %s", page)
+    finally:
+        with _building_lock:
+            _building.discard((page, key))
+
+
+def ensure_snapshots(page, key, builder, data, **kwargs):
+    """
+    Dựng nền (một thread, các mốc chạy song song trong pool) những ảnh chụp còn thiếu của bộ
+    dữ liệu `key`. Trả về True nếu còn ảnh chụp đang được dựng.
+    """
+    missing = [p for p in PRESETS if not os.path.exists(_path(page, key, p, "json"))]
+    if not missing:
+        _touch(page, key)
+        return False
+    with _building_lock:
+        if (page, key) in _building:
+            return True
+        _building.add((page, key))
+    threading.Thread(
+        target=_build_missing, args=(page, key, builder, data, missing, kwargs),
+        name=f"snapshots-{page}", daemon=True,
+    ).start()
+    return True
+
+
+@lru_cache(maxsize=16)
+def _read_json(path):
+    # Khóa đã gồm mã băm dữ liệu nên file không bao giờ bị ghi đè: ghi nhớ an toàn
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_snapshot(page, key, preset):
+    """Ảnh chụp đã dựng của một mốc nhanh, hoặc None nếu chưa có."""
+    path = _path(page, key, preset, "json")
+    if not os.path.exists(path):
+        return None
+    _touch(page, key)
+    try:
+        return _read_json(path)
+    except (OSError, ValueError):
+        return None
+
+
+def render_snapshot(st, page, key, snapshot):
+    """Hiển thị KPI và biểu đồ của một ảnh chụp, kèm nút tải báo cáo HTML."""
+    import plotly.io as pio
+    from utils.plotting import show_chart
+    start, end = date.fromisoformat(snapshot["start"]), date.fromisoformat(snapshot["end"])
+    st.caption(
+        f"⚡ Báo cáo dựng sẵn cho '{snapshot['preset']}' ({start:%d/%m/%Y} – {end:%d/%m/%Y}), "
+        f"tạo lúc {snapshot['created'].replace('T', ' ')}. Chọn '{CUSTOM_PRESET}' hoặc thu hẹp bộ lọc "
+        "để xem báo cáo tương tác đầy đủ."
+    )
+    st.subheader("KPI Tổng quan")
+    render_kpi_cards(st, snapshot["kpis"])
+    st.divider()
+    section = None
+    for entry in snapshot["figures"]:
+        if entry["section"] != section:
+            section = entry["section"]
+            st.subheader(section)
+        show_chart(st, pio.from_json(entry["json"], skip_invalid=True), name=entry["name"], use_container_width=True)
+
+    html_path = _path(page, key, snapshot["preset"], "html")
+
+    def read_html():
+        with open(html_path, "rb") as f:
+            return f.read()
+
+    if os.path.exists(html_path):
+        st.download_button(
+            label="📄 Tải báo cáo (HTML)",
+            data=read_html,
+            file_name=f"{page}_{PRESETS[snapshot['preset']]}_{end:%Y%m%d}.html",
+            mime="text/html",
+        )